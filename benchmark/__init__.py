@@ -0,0 +1,16 @@
+"""
+命令词法器的性能测试
+------------------------------
+python -m benchmark.parse_many_scaling : parse_many 随工作进程数量的吞吐量变化\n
+python -m benchmark.backtrack : 回溯分析与贪婪分析的耗时对比\n
+python -m benchmark.suite : 匹配类微基准、各类语料的端到端测试，并与 baseline.json 比较\n
+python -m benchmark.reorder : 按性能统计重排分支前后的吞吐量对比\n
+python -m benchmark.cold_start : 重新构建命令树与读取命令树缓存的冷启动耗时对比\n
+python -m benchmark.sub_command : execute ... run 之后直接连接命令与使用 Sub_Command(以及缓存)的耗时对比\n
+python -m benchmark.async_typing : 模拟多个文档连续输入时，同步分析、线程池与 Async_Parser 的事件循环延迟与结果延迟\n
+python -m benchmark.lsp_edit : 语言服务器打开大文件与逐字修改的延迟，与每次重新分析整个文件的对比\n
+python -m benchmark.fan_out : 同级分支共用单词扫描与各自扫描的耗时对比\n
+python -m benchmark.kernels : KeyWord 的字符串操作实现与原正则表达式实现的差异测试与耗时对比\n
+python -m benchmark.token_values : 分析之后用正则表达式重新分析 token 文本与使用 TokenValue 取值的耗时对比
+python -m benchmark.compiled : TreeCompiler 编译后的词法器与 Command_Parser.parser 的差异测试与耗时对比
+"""
@@ -0,0 +1,105 @@
+"""
+模拟连续输入时异步词法器的延迟测试
+------------------------------
+python -m benchmark.async_typing [文档数量] [重复次数]\n
+多个文档同时逐字输入较长的 execute 命令，每次按键都请求一次分析，按键成串出现(间隔 INTERVAL)，每串之后停顿 PAUSE\n
+blocking : 在事件循环中直接调用 Command_Parser.parse\n
+executor : 使用 loop.run_in_executor，每次按键的分析都会完成\n
+async_parser : 使用 AsyncParser.Async_Parser，同一文档的新请求取消旧请求\n
+loop_lag : 事件循环中每 1ms 唤醒一次的任务实际延后的时间\n
+settle : 每串按键的最后一次按键到得到分析结果的时间(编辑器最终显示的结果)
+"""
+
+from typing import Dict,Union,List,Tuple
+import asyncio,concurrent.futures,random,sys,time
+
+from command_parser import AsyncParser,ParserSystem
+from benchmark.corpus import _Generator
+from benchmark.grammar import build_parser
+
+INTERVAL = 0.002
+PAUSE = 0.03
+BURST = (5, 15)
+
+
+def _percentile(values:List[float], percent:float) -> float :
+    values = sorted(values)
+    if not values : return 0.0
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+def _typing_plan(text:str, rnd:random.Random) -> List[Tuple[int,bool]] :
+    #每次按键为 (输入后的长度, 是否为一串按键中的最后一次)
+    plan, length = [], 0
+    while length < len(text) :
+        burst = min(rnd.randint(*BURST), len(text) - length)
+        for i in range(burst) : plan.append((length + i + 1, i == burst - 1))
+        length += burst
+    return plan
+
+
+async def _heartbeat(lag:List[float], stop:asyncio.Event) :
+    while not stop.is_set() :
+        t1 = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lag.append(time.perf_counter() - t1 - 0.001)
+
+async def _session(mode:str, parser:ParserSystem.Command_Parser, texts:List[str], seed:int) -> Dict[str,float] :
+    loop = asyncio.get_running_loop()
+    lag, settle, tasks = [], [], []
+    counter = {"parses":0, "cancelled":0}
+    stop = asyncio.Event()
+    heartbeat = asyncio.ensure_future(_heartbeat(lag, stop))
+    executor = concurrent.futures.ThreadPoolExecutor(2) if mode == "executor" else None
+    async_parser = AsyncParser.Async_Parser(parser, 2) if mode == "async_parser" else None
+
+    async def request(document:int, command_str:str, last:bool, t1:float) :
+        try :
+            if mode == "blocking" : parser.parse(command_str)
+            elif mode == "executor" : await loop.run_in_executor(executor, parser.parse, command_str)
+            else : await async_parser.parse(document, command_str)
+        except ParserSystem.Parse_Cancelled :
+            counter["cancelled"] += 1
+            return
+        counter["parses"] += 1
+        if last : settle.append(time.perf_counter() - t1)
+
+    async def typist(document:int, text:str) :
+        rnd = random.Random(seed + document)
+        for length, last in _typing_plan(text, rnd) :
+            tasks.append(asyncio.ensure_future(request(document, text[0:length], last, time.perf_counter())))
+            await asyncio.sleep(PAUSE if last else INTERVAL)
+
+    t1 = time.perf_counter()
+    await asyncio.gather(*[typist(i, j) for i,j in enumerate(texts)])
+    await asyncio.gather(*tasks)
+    total = time.perf_counter() - t1
+    stop.set()
+    await heartbeat
+    if executor is not None : executor.shutdown()
+    if async_parser is not None : async_parser.close()
+    return {
+        "lag_p50_ms" : _percentile(lag, 50) * 1e3, "lag_p99_ms" : _percentile(lag, 99) * 1e3, "lag_max_ms" : max(lag) * 1e3,
+        "settle_p50_ms" : _percentile(settle, 50) * 1e3, "settle_p99_ms" : _percentile(settle, 99) * 1e3,
+        "parses" : counter["parses"], "cancelled" : counter["cancelled"], "total_s" : total,
+    }
+
+
+def _long_commands(count:int, seed:int=1) -> List[str] :
+    #多层 execute 且每层都是带有大量参数的选择器，完整分析一次约需要 1ms
+    gen = _Generator(seed)
+    return ["".join("execute %s %s " % (gen.selector(True), gen.position()) for _ in range(6)) + gen.command(True) for _ in range(count)]
+
+def main(documents:int=4, repeat:int=3) :
+    parser = build_parser()
+    texts = _long_commands(documents)
+    print("%d 个文档，命令长度 %s" % (documents, ", ".join(str(len(i)) for i in texts)))
+    columns = ("lag_p50_ms","lag_p99_ms","lag_max_ms","settle_p50_ms","settle_p99_ms","parses","cancelled")
+    print("%-14s" % "mode" + "".join("%15s" % i for i in columns))
+    for mode in ("blocking","executor","async_parser") :
+        #取 settle_p99 最小的一次
+        result = min((asyncio.run(_session(mode, parser, texts, i)) for i in range(repeat)), key=lambda i:i["settle_p99_ms"])
+        print("%-14s" % mode + "".join("%15.2f" % result[i] if isinstance(result[i], float) else "%15d" % result[i] for i in columns))
+
+
+if __name__ == "__main__" :
+    main(*[int(i) for i in sys.argv[1:3]])
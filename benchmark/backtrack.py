@@ -0,0 +1,55 @@
+"""
+回溯分析与贪婪分析的对比测试
+------------------------------
+python -m benchmark.backtrack [重复次数]\n
+1. 使用性能测试命令树分别以贪婪模式与回溯模式分析常见命令，输出每条命令的平均耗时\n
+2. 每层两个分支都能匹配成功且汇合到同一个匹配对象的命令树，命令在最后一层失败，\n
+   不记忆时需要尝试 2^n 条路径，记忆后每个 (匹配对象, 指针) 只展开一次
+"""
+
+import sys,time
+from command_parser import BaseMatch,SpecialMatch,ParserSystem
+from benchmark.grammar import build_parser
+from benchmark.parse_many_scaling import COMMANDS
+
+
+#贪婪模式下 dx 的整数分支先匹配 "1"，之后的 ".5" 无法继续
+BACKTRACK_COMMANDS = [
+    'ability @s[x=~1,y=2,z=~,dx=1.5,c=3,l=2,lm=1,type=!zombie,m=!creative] mute false',
+]
+
+
+def ambiguous_parser(depth:int) -> ParserSystem.Command_Parser :
+    """每一层都可以由 Enum 或 AnyString 匹配同一个单词的命令树"""
+    node = BaseMatch.End_Tag()
+    for _ in range(depth) :
+        branches = (BaseMatch.Enum("Word", "a").add_leaves(node), BaseMatch.AnyString("Any").add_leaves(node))
+        node = BaseMatch.KeyWord("Separator", ",").add_leaves(*branches)
+    return ParserSystem.Command_Parser(SpecialMatch.Command_Root().add_leaves(node))
+
+
+def _time(parser:ParserSystem.Command_Parser, command:str, backtrack:bool, repeat:int) -> float :
+    t1 = time.perf_counter()
+    for _ in range(repeat) : parser.parse(command, backtrack=backtrack)
+    return (time.perf_counter() - t1) / repeat
+
+
+def main(repeat:int=2000) :
+    parser = build_parser()
+    print("%-60s %12s %12s" % ("command", "greedy(us)", "packrat(us)"))
+    for command in COMMANDS + BACKTRACK_COMMANDS :
+        greedy = parser.parse(command).success
+        packrat = parser.parse(command, backtrack=True).success
+        print("%-60s %8.1f %-3s %8.1f %-3s" % (command[0:60], _time(parser, command, False, repeat) * 1e6, "ok" if greedy else "err",
+            _time(parser, command, True, repeat) * 1e6, "ok" if packrat else "err"))
+
+    print()
+    print("%-8s %12s %12s" % ("depth", "greedy(us)", "packrat(us)"))
+    for depth in (5, 10, 20, 40, 80) :
+        parser = ambiguous_parser(depth)
+        command = " ".join([", a"] * depth) + " !"
+        print("%-8s %12.1f %12.1f" % (depth, _time(parser, command, False, 50) * 1e6, _time(parser, command, True, 50) * 1e6))
+
+
+if __name__ == "__main__" :
+    main(*[int(i) for i in sys.argv[1:2]])
@@ -0,0 +1,57 @@
+"""
+命令树冷启动测试
+------------------------------
+python -m benchmark.cold_start [次数]\n
+在新的 Python 进程中分别测试重新构建命令树、构建选择器参数延迟生成的命令树与从 TreeCache 读取命令树的耗时，
+以及之后 Command_Parser 实例化的耗时，\n
+每个进程的正则表达式缓存都是空的，与命令行工具或工作进程启动时的情况相同
+"""
+
+from typing import Tuple
+import os,subprocess,sys,tempfile
+
+BUILD_CODE = """
+import time,sys
+t1 = time.perf_counter()
+from command_parser import ParserSystem
+from benchmark import grammar
+t2 = time.perf_counter()
+Tree = grammar.build_tree(sys.argv[1] == "lazy")
+t3 = time.perf_counter()
+ParserSystem.Command_Parser(Tree)
+print(t2 - t1, t3 - t2, time.perf_counter() - t2)
+"""
+
+LOAD_CODE = """
+import time,sys
+t1 = time.perf_counter()
+from command_parser import ParserSystem,TreeCache
+from benchmark import grammar
+t2 = time.perf_counter()
+Tree = TreeCache.load_tree(sys.argv[1], [grammar])
+t3 = time.perf_counter()
+ParserSystem.Command_Parser(Tree)
+print(t2 - t1, t3 - t2, time.perf_counter() - t2)
+"""
+
+
+def _run(code:str, *argv:str) -> Tuple :
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, "-c", code, *argv], cwd=root, capture_output=True, text=True, check=True).stdout
+    return tuple(float(i) for i in output.split())
+
+def main(repeat:int=5) :
+    from command_parser import TreeCache
+    from benchmark import grammar
+    with tempfile.TemporaryDirectory() as temp :
+        path = os.path.join(temp, "tree.bin")
+        TreeCache.save_tree(grammar.build_tree(), path, [grammar])
+        print("cache file : %s bytes" % os.path.getsize(path))
+        print("%-8s %12s %12s %20s" % ("", "import(ms)", "tree(ms)", "tree+parser(ms)"))
+        for name, code, argv in (("build", BUILD_CODE, ("eager",)), ("lazy", BUILD_CODE, ("lazy",)), ("load", LOAD_CODE, (path,))) :
+            result = [_run(code, *argv) for _ in range(repeat)]
+            print("%-8s %12.1f %12.1f %20.1f" % (name, *[min(i[j] for i in result) * 1e3 for j in range(3)]))
+
+
+if __name__ == "__main__" :
+    main(*[int(i) for i in sys.argv[1:2]])
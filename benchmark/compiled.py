@@ -0,0 +1,101 @@
+"""
+编译后的词法器与解释执行的词法器的对比测试
+------------------------------
+python -m benchmark.compiled [命令数量] [重复次数]\n
+每棵命令树分别用 TreeCompiler.compile_tree 编译，与 Command_Parser.parser 在相同的命令上比较\n
+成功时比较 token 的类型、范围与附加内容(Sub_Command 的 result 中的 tokens 与 error、Json_Match 的 json)，\n
+失败时比较异常类型、异常文本、pos 与自动补全\n
+grammar : benchmark.grammar 的命令树，语料为所有类型的命令以及部分命令的每个前缀\n
+sub_command : run 之后使用 Sub_Command 的命令树，包含超过嵌套层数的命令\n
+tellraw : 使用 JsonParser.Json_Match 的命令树，JSON 文本在每个位置截断或插入字符
+"""
+
+from typing import Dict,Union,List,Tuple,Callable
+import random,sys,time
+from command_parser import BaseMatch,SpecialMatch,JsonParser,ParserSystem,TreeCompiler
+from benchmark import corpus as Corpus
+from benchmark.grammar import build_tree
+from benchmark.sub_command import build_run_parser, generate as generate_run
+
+
+RAWTEXT = [
+    '{"rawtext":[{"text":"hello "},{"score":{"name":"@s","objective":"kills"}}]}',
+    '{"rawtext":[{"translate":"chat.type","with":["a","b"]}]}',
+    '{"rawtext":[{"selector":"@a[tag=vip]"},{"text":"\\u00e9\\n"}]}',
+]
+
+
+def build_tellraw_tree() -> SpecialMatch.Command_Root :
+    """tellraw 选择器 rawtext JSON"""
+    Rawtext = JsonParser.Json_Match("Rawtext", JsonParser.Rawtext_Schema()).add_leaves( BaseMatch.End_Tag() )
+    return SpecialMatch.Command_Root().add_leaves(
+        BaseMatch.Char("Command","tellraw").add_leaves( *SpecialMatch.BE_Selector_Tree( Rawtext ) )
+    )
+
+def _prefixes(commands:List[str], step:int) -> List[str] :
+    return [command[0:i] for command in commands[::step] for i in range(len(command) + 1)]
+
+def _tellraw_commands(count:int, seed:int=0) -> List[str] :
+    rnd = random.Random(seed)
+    commands = _prefixes(["tellraw @a %s" % i for i in RAWTEXT], 1)
+    for _ in range(count) :
+        text = rnd.choice(RAWTEXT)
+        i = rnd.randrange(len(text) + 1)
+        text = text[0:i] + rnd.choice(['', '"', ',', '}', ']', ' x', '1', ':']) + text[i:]
+        commands.append("tellraw %s %s" % (rnd.choice(["@a","@s","@p[r=3]"]), text))
+    return commands
+
+def cases(count:int=2000) -> Dict[str,Tuple[SpecialMatch.Command_Root,ParserSystem.Command_Parser,List[str]]] :
+    """返回 {名称 : (编译的命令树, 对照的词法器, 命令列表)}，两者使用分别构建的命令树"""
+    grammar = [j for i in Corpus.WORKLOADS for j in Corpus.generate(i, count // len(Corpus.WORKLOADS))]
+    run = generate_run(count, 20)
+    run += ["execute as @a run " * depth + "say hi" for depth in range(6, 12)]
+    return {
+        "grammar" : (build_tree(), ParserSystem.Command_Parser(build_tree()), grammar + _prefixes(grammar, 50)),
+        "sub_command" : (build_run_parser(True).Tree, build_run_parser(True), run + _prefixes(run, 50)),
+        "tellraw" : (build_tellraw_tree(), ParserSystem.Command_Parser(build_tellraw_tree()), _tellraw_commands(count)),
+    }
+
+
+def _key(result:Union[list,tuple]) :
+    if isinstance(result, tuple) :
+        error, auto_complete = result
+        return ("error", error.__class__.__name__, str(error), error.pos, list(auto_complete.items()))
+    #编译后的 Sub_Result 不带有匹配对象，只比较 tokens 与 error
+    return ("tokens", [(i["token"].span(), {j:(k[0:2] if isinstance(k, SpecialMatch.Sub_Result) else k) for j,k in i.items() if j != "token"}) for i in result])
+
+def differential(count:int=2000) -> Dict[str,Tuple[int,int]] :
+    """返回 {名称 : (命令数量, 不一致的数量)}"""
+    result = {}
+    for name, (Tree, parser, commands) in cases(count).items() :
+        module = TreeCompiler.load_compiled_tree(TreeCompiler.compile_tree(Tree))
+        result[name] = (len(commands), sum(_key(parser.parser(i)) != _key(module.parser(i)) for i in commands))
+    return result
+
+def timing(count:int=2000, repeat:int=5) -> Dict[str,Tuple[float,float]] :
+    """返回 {名称 : (解释执行每条命令的微秒数, 编译后每条命令的微秒数)}，取 repeat 次中最快的一次"""
+    result = {}
+    for name, (Tree, parser, commands) in cases(count).items() :
+        module = TreeCompiler.load_compiled_tree(TreeCompiler.compile_tree(Tree))
+        best = []
+        for function in (parser.parser, module.parser) :
+            t = None
+            for _ in range(repeat) :
+                t1 = time.perf_counter()
+                for command in commands : function(command)
+                t2 = time.perf_counter() - t1
+                t = t2 if t is None else min(t, t2)
+            best.append(t / len(commands) * 1e6)
+        result[name] = tuple(best)
+    return result
+
+
+def main(count:int=2000, repeat:int=5) :
+    print("%-14s %10s %10s" % ("differential", "commands", "mismatch"))
+    for name, (commands, mismatch) in differential(count).items() : print("%-14s %10d %10d" % (name, commands, mismatch))
+    print("%-14s %14s %14s" % ("timing (us)", "interpreted", "compiled"))
+    for name, (a, b) in timing(count, repeat).items() : print("%-14s %14.2f %14.2f" % (name, a, b))
+
+
+if __name__ == "__main__" :
+    main(*[int(i) for i in sys.argv[1:3]])
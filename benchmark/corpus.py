@@ -0,0 +1,141 @@
+"""
+性能测试使用的命令语料生成器
+------------------------------
+generate(workload, count, seed) 按照 benchmark.grammar 的命令树随机生成命令\n
+相同的参数总是生成相同的命令，不同版本之间的测试结果可以直接比较\n
+WORKLOADS : 可用的语料类型\n
+selector : 带有大量选择器参数(分数、物品、权限条件)的命令\n
+coordinate : 以坐标为主的命令(tp、setblock、summon)\n
+execute : 多层嵌套的 execute 命令\n
+invalid : 在合法命令上随机删除、插入、截断字符得到的命令\n
+mixed : 以上所有类型的混合
+"""
+
+from typing import Dict,Union,List,Tuple
+import random
+
+__all__ = ["WORKLOADS","generate"]
+
+WORKLOADS = ("selector","coordinate","execute","invalid","mixed")
+
+NAMES = ["Steve","Alex","builder","red_team","blue_team","vip","spawn","boss_bar","kills","deaths","money","level"]
+ENTITIES = ["zombie","skeleton","creeper","cow","pig","armor_stand","villager","minecraft:wolf"]
+ITEMS = ["diamond","iron_ingot","apple","stone","minecraft:diamond_sword","golden_apple","bread","torch"]
+EFFECTS = ["speed","slowness","regeneration","invisibility","night_vision","resistance"]
+GAMEMODES = ["0","1","2","s","c","a","survival","creative","adventure","spectator"]
+ABILITIES = ["worldbuilder","mayfly","mute"]
+INVALID_CHARS = ' ,@~^"![]{}=.-+0123456789abcmstx\\'
+
+
+class _Generator :
+
+    def __init__(self, seed:int) -> None :
+        self.rnd = random.Random(seed)
+
+    def choice(self, seq) :
+        return self.rnd.choice(seq)
+
+    def int_value(self, low:int=-64, high:int=320) -> str :
+        return str(self.rnd.randint(low, high))
+
+    def float_value(self) -> str :
+        if self.rnd.random() < 0.5 : return self.int_value()
+        return "%.1f" % self.rnd.uniform(-300, 300)
+
+    def range_value(self) -> str :
+        low, high = sorted((self.rnd.randint(-10, 100), self.rnd.randint(-10, 100)))
+        value = self.choice(["%s" % low, "%s.." % low, "..%s" % high, "%s..%s" % (low, high)])
+        return ("!" if self.rnd.random() < 0.2 else "") + value
+
+    def name(self) -> str :
+        if self.rnd.random() < 0.15 : return '"%s %s"' % (self.choice(NAMES), self.choice(NAMES))
+        return self.choice(NAMES)
+
+    def position(self) -> str :
+        mode = self.rnd.random()
+        if mode < 0.2 : return " ".join("^" + self.choice(["", self.float_value()]) for _ in range(3))
+        words = []
+        for _ in range(3) :
+            if self.rnd.random() < 0.6 : words.append("~" + self.choice(["", self.int_value(-10, 10), "%.1f" % self.rnd.uniform(-5, 5)]))
+            else : words.append(self.float_value())
+        return " ".join(words)
+
+    def selector_argument(self) -> str :
+        kind = self.rnd.randrange(10)
+        if kind == 0 : return "%s=%s" % (self.choice("xyz"), self.choice(["~" + self.int_value(-5, 5), self.float_value()]))
+        if kind == 1 : return "%s=%s" % (self.choice(["dx","dy","dz","r","rm","rx","rxm","ry","rym"]), self.int_value(0, 50))
+        if kind == 2 : return "%s=%s" % (self.choice(["l","lm","c"]), self.int_value(1, 30))
+        if kind == 3 : return "type=%s" % self.choice(ENTITIES)
+        if kind == 4 : return "m=%s%s" % (self.choice(["", "!"]), self.choice(GAMEMODES))
+        if kind == 5 : return "%s=%s%s" % (self.choice(["tag","name","family"]), self.choice(["", "!"]), self.name())
+        if kind == 6 :
+            return "scores={%s}" % ",".join("%s=%s" % (self.choice(NAMES), self.range_value()) for _ in range(self.rnd.randint(1, 4)))
+        if kind == 7 :
+            return "haspermission={%s}" % ",".join("%s=%s" % (i, self.choice(["enabled","disabled"])) for i in ["camera","movement"][0:self.rnd.randint(1, 2)])
+        item = lambda : "{item=%s%s}" % (self.choice(ITEMS), self.choice(["", ",quantity=%s" % self.range_value(), ",data=%s" % self.int_value(0, 15)]))
+        if kind == 8 : return "hasitem=%s" % item()
+        return "hasitem=[%s]" % ",".join(item() for _ in range(self.rnd.randint(1, 3)))
+
+    def selector(self, heavy:bool=False) -> str :
+        if (not heavy) and self.rnd.random() < 0.3 : return self.choice(["@a","@p","@s","@e","@r", self.name()])
+        count = self.rnd.randint(2, 7) if heavy else self.rnd.randint(1, 3)
+        return "%s[%s]" % (self.choice(["@a","@p","@s","@e","@r"]), ",".join(self.selector_argument() for _ in range(count)))
+
+    def command(self, heavy_selector:bool=False) -> str :
+        sel = lambda : self.selector(heavy_selector)
+        kind = self.rnd.randrange(12)
+        if kind == 0 : return "ability %s %s %s" % (sel(), self.choice(ABILITIES), self.choice(["true","false"]))
+        if kind == 1 : return "say %s" % " ".join(self.choice(NAMES) for _ in range(self.rnd.randint(1, 6)))
+        if kind == 2 : return "%s %s %s" % (self.choice(["tell","msg","w"]), sel(), " ".join(self.choice(NAMES) for _ in range(3)))
+        if kind == 3 : return "kill %s" % sel()
+        if kind == 4 : return "tp %s %s" % (sel(), self.position())
+        if kind == 5 : return "give %s %s %s" % (sel(), self.choice(ITEMS), self.int_value(1, 64))
+        if kind == 6 : return "tag %s %s %s" % (sel(), self.choice(["add","remove"]), self.name())
+        if kind == 7 : return "scoreboard players %s %s %s %s" % (self.choice(["set","add","remove"]), sel(), self.choice(NAMES), self.int_value())
+        if kind == 8 : return "setblock %s %s" % (self.position(), self.choice(ITEMS))
+        if kind == 9 : return "summon %s %s" % (self.choice(ENTITIES), self.position())
+        if kind == 10 : return "gamemode %s %s" % (self.choice(GAMEMODES), sel())
+        return "effect %s %s %s %s" % (sel(), self.choice(EFFECTS), self.int_value(1, 600), self.int_value(0, 5))
+
+    def coordinate_command(self) -> str :
+        kind = self.rnd.randrange(3)
+        if kind == 0 : return "tp %s %s" % (self.choice(["@s","@p","@a[r=5]"]), self.position())
+        if kind == 1 : return "setblock %s %s" % (self.position(), self.choice(ITEMS))
+        return "summon %s %s" % (self.choice(ENTITIES), self.position())
+
+    def execute_command(self) -> str :
+        depth = self.rnd.randint(2, 8)
+        prefix = "".join("execute %s %s " % (self.selector(), self.position()) for _ in range(depth))
+        return prefix + self.command()
+
+    def invalid_command(self) -> str :
+        command = self.command(self.rnd.random() < 0.5)
+        for _ in range(self.rnd.randint(1, 3)) :
+            if not command : break
+            i = self.rnd.randrange(len(command))
+            op = self.rnd.random()
+            if op < 0.3 : command = command[0:i] + command[i+1:]
+            elif op < 0.6 : command = command[0:i] + self.choice(INVALID_CHARS) + command[i:]
+            elif op < 0.8 : command = command[0:i]
+            else : command = command[0:i] + self.choice(INVALID_CHARS) + command[i+1:]
+        return command
+
+
+def generate(workload:str, count:int, seed:int=0) -> List[str] :
+    """
+    生成命令语料
+    ------------------------------
+    workload : WORKLOADS 中的语料类型\n
+    count : 命令数量\n
+    seed : 随机数种子
+    """
+    if workload not in WORKLOADS : raise ValueError("workload 参数只能为 %s" % "、".join(WORKLOADS))
+    gen = _Generator(seed)
+    make = {
+        "selector" : lambda : gen.command(True),
+        "coordinate" : gen.coordinate_command,
+        "execute" : gen.execute_command,
+        "invalid" : gen.invalid_command,
+    }
+    if workload == "mixed" : return [make[gen.choice(WORKLOADS[0:4])]() for _ in range(count)]
+    return [make[workload]() for _ in range(count)]
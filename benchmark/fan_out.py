@@ -0,0 +1,61 @@
+"""
+同级分支共用单词扫描的对比测试
+------------------------------
+python -m benchmark.fan_out [命令数量] [重复次数]\n
+shared : 默认行为，只有同一个分支元组中有多个匹配对象使用相同 re_match 的节点才共用单词扫描\n
+always : 所有节点都共用单词扫描\n
+per_matcher : 所有节点都由每个匹配对象各自扫描单词\n
+wide N : 根节点下 N 个首字符相同的 Enum 以及 Int、AnyString，首字符分派无法缩小需要尝试的分支\n
+另外测试 benchmark.grammar 的各类语料，其中首字符分派之后通常只剩一个扫描单词的分支
+"""
+
+import sys,time
+from command_parser import BaseMatch,SpecialMatch,ParserSystem
+from benchmark.corpus import generate
+from benchmark.grammar import build_parser
+
+
+def build_wide_parser(width:int) -> ParserSystem.Command_Parser :
+    Tree = SpecialMatch.Command_Root()
+    Tree.add_leaves( *[BaseMatch.Enum("Word_%s" % i, "w%s" % i) for i in range(width)], BaseMatch.Int("Number"), BaseMatch.AnyString("Any") )
+    for i in Tree.tree_leaves : i.add_leaves( BaseMatch.End_Tag() )
+    return ParserSystem.Command_Parser(Tree)
+
+def set_word_scan(parser:ParserSystem.Command_Parser, mode:str) :
+    #改写分派表中的 shared_word，shared 模式重新生成分派表
+    for node in BaseMatch.walk_tree(parser.Tree, False) :
+        if type(node.tree_leaves) is BaseMatch.Lazy_Leaves : continue
+        table, fallback, shared_word = node._build_dispatch()
+        if mode != "shared" : node._dispatch = (table, fallback, mode == "always")
+
+def _time(parser:ParserSystem.Command_Parser, commands:list) -> float :
+    t1 = time.perf_counter()
+    for command in commands : parser.parse(command)
+    return (time.perf_counter() - t1) / len(commands)
+
+
+def main(count:int=500, repeat:int=15) :
+    grammar = build_parser()
+    workloads = {i:(grammar, generate(i, count)) for i in ("selector","execute","mixed")}
+    for width in (4, 16, 64) :
+        commands = ["w%s" % (width - 1), "word", "123"] * (count // 3)
+        workloads["wide %s" % width] = (build_wide_parser(width), commands)
+
+    parsers = {id(i[0]):i[0] for i in workloads.values()}
+    #各个模式交替运行，取每种模式最快的一次
+    modes = ("shared","always","per_matcher")
+    best = {}
+    for _ in range(repeat) :
+        for mode in modes :
+            for parser in parsers.values() : set_word_scan(parser, mode)
+            for name,(parser,commands) in workloads.items() :
+                best[(name,mode)] = min(best.get((name,mode), float("inf")), _time(parser, commands))
+    print("%-12s %12s %12s %12s %8s %8s" % ("workload", *modes, "vs always", "vs per"))
+    for name in workloads :
+        shared, always, per_matcher = [best[(name,i)] for i in modes]
+        print("%-12s %12.2f %12.2f %12.2f %+7.1f%% %+7.1f%%" % (name, shared * 1e6, always * 1e6, per_matcher * 1e6,
+            (shared / always - 1) * 100, (shared / per_matcher - 1) * 100))
+
+
+if __name__ == "__main__" :
+    main(*[int(i) for i in sys.argv[1:3]])
@@ -0,0 +1,104 @@
+"""
+性能测试使用的 MCBE 命令树
+------------------------------
+覆盖选择器、坐标、范围值以及 execute 循环等常见结构
+"""
+
+from command_parser import BaseMatch,SpecialMatch,ParserSystem
+
+
+def build_tree(lazy:bool=False) -> SpecialMatch.Command_Root :
+    """
+    构建性能测试使用的命令树\n
+    lazy : 选择器参数部分是否延迟生成
+    """
+    End = BaseMatch.End_Tag
+    BE_Selector_Tree = lambda *end_node : SpecialMatch.BE_Selector_Tree(*end_node, lazy=lazy)
+    Tree = SpecialMatch.Command_Root().add_leaves(
+        BaseMatch.Char("Command","ability").add_leaves(
+            *BE_Selector_Tree(
+                BaseMatch.Enum("Ability_Argument","worldbuilder","mayfly","mute").add_leaves(
+                    BaseMatch.Enum("Value","true","false").add_leaves( End() ),
+                    End()
+                )
+            )
+        ),
+        BaseMatch.Char("Command","say").add_leaves( BaseMatch.AnyMsg("Say_Msg") ),
+        BaseMatch.Enum("Command","tell","msg","w").add_leaves(
+            *BE_Selector_Tree( BaseMatch.AnyMsg("Msg") )
+        ),
+        BaseMatch.Char("Command","kill").add_leaves( *BE_Selector_Tree( End() ), End() ),
+        BaseMatch.Char("Command","tp").add_leaves(
+            *SpecialMatch.Pos_Tree( End() ),
+            *BE_Selector_Tree( *SpecialMatch.Pos_Tree( End() ), End() )
+        ),
+        BaseMatch.Char("Command","give").add_leaves(
+            *BE_Selector_Tree(
+                BaseMatch.AnyString("Item_ID").add_leaves(
+                    BaseMatch.Int("Amount").add_leaves(
+                        BaseMatch.Int("Data").add_leaves( End() ),
+                        End()
+                    ),
+                    End()
+                )
+            )
+        ),
+        BaseMatch.Char("Command","tag").add_leaves(
+            *BE_Selector_Tree(
+                BaseMatch.Enum("Tag_Mode","add","remove").add_leaves(
+                    SpecialMatch.BE_String("Tag_Name").add_leaves( End() ),
+                    SpecialMatch.BE_Quotation_String("Tag_Name").add_leaves( End() )
+                ),
+                BaseMatch.Char("Tag_Mode","list").add_leaves( End() )
+            )
+        ),
+        BaseMatch.Char("Command","scoreboard").add_leaves(
+            BaseMatch.Char("Scoreboard_Mode","players").add_leaves(
+                BaseMatch.Enum("Players_Mode","set","add","remove").add_leaves(
+                    *BE_Selector_Tree(
+                        SpecialMatch.BE_String("Objective").add_leaves(
+                            BaseMatch.Int("Score").add_leaves( End() )
+                        )
+                    )
+                )
+            )
+        ),
+        BaseMatch.Char("Command","setblock").add_leaves(
+            *SpecialMatch.Pos_Tree(
+                BaseMatch.AnyString("Block_ID").add_leaves( BaseMatch.Int("Data").add_leaves( End() ), End() )
+            )
+        ),
+        BaseMatch.Char("Command","summon").add_leaves(
+            BaseMatch.AnyString("Entity_ID").add_leaves( *SpecialMatch.Pos_Tree( End() ), End() )
+        ),
+        BaseMatch.Char("Command","gamemode").add_leaves(
+            BaseMatch.Enum("Gamemode","0","1","2","s","c","a","survival","creative","adventure","spectator").add_leaves(
+                *BE_Selector_Tree( End() ), End()
+            )
+        ),
+        BaseMatch.Char("Command","effect").add_leaves(
+            *BE_Selector_Tree(
+                BaseMatch.AnyString("Effect_ID").add_leaves(
+                    BaseMatch.Int("Seconds").add_leaves(
+                        BaseMatch.Int("Amplifier").add_leaves(
+                            BaseMatch.Enum("Hide_Particles","true","false").add_leaves( End() ), End()
+                        ),
+                        End()
+                    ),
+                    End()
+                ),
+                BaseMatch.Char("Clear","clear").add_leaves( End() )
+            )
+        ),
+        BaseMatch.Char("Command","execute"),
+    )
+    Tree.tree_leaves[-1].add_leaves(
+        *BE_Selector_Tree(
+            *SpecialMatch.Pos_Tree( *Tree.tree_leaves )
+        )
+    )
+    return Tree
+
+def build_parser(lazy:bool=False) -> ParserSystem.Command_Parser :
+    """构建性能测试使用的词法器"""
+    return ParserSystem.Command_Parser(build_tree(lazy))
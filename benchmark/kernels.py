@@ -0,0 +1,109 @@
+"""
+KeyWord 字符串操作实现与正则表达式实现的对比测试
+------------------------------
+python -m benchmark.kernels [随机输入数量] [重复次数]\n
+KeyWord 的匹配改为使用集合查表与 str.find，本测试保留原来基于 re_match 与 re_test 的实现作为参照\n
+Enum、Char 与 BE_Quotation_String 的同类改写没有可测量的收益(短字符串与带转义的引号字符串更慢)，仍然使用正则表达式\n
+differential : 在随机生成的输入(包含换行符、反斜杠、引号等边界字符)的每个位置上比较两种实现的 _try_match 与 _match_string\n
+timing : benchmark.matchers 中对应匹配类的成功与失败输入，两种实现每次调用的平均纳秒数
+"""
+
+from typing import Dict,Union,List,Tuple,Callable
+import random,sys,time
+from command_parser import BaseMatch
+from benchmark.matchers import CASES
+
+
+#参照实现为修改前 KeyWord 的 _try_match
+def _keyword_reference(matcher:BaseMatch.KeyWord, s:str, s_pointer:int) :
+    _match = [i.match(s, pos=s_pointer) for i in matcher.re_match]
+    if (not _match) or (_match[0] is None) : return BaseMatch.MATCH_FAIL
+    a = [matcher.re_test.search(i.group()) for i in _match]
+    if not any(a) : return BaseMatch.MATCH_FAIL
+    b = [i.group().__len__() for i in a if (i)]
+    return {"type":matcher.token_type, "token":_match[b.index(max(b))]}
+
+REFERENCE : Dict[type,Callable] = {
+    BaseMatch.KeyWord : _keyword_reference,
+}
+
+#差异测试使用的匹配对象，包含没有参数、长度不同、相互重叠与包含换行符的关键字等边界情况
+MATCHERS : List[BaseMatch.Match_Base] = [
+    BaseMatch.KeyWord("KeyWord", ".."),
+    BaseMatch.KeyWord("KeyWord_Uniform", "[", "=", "!"),
+    BaseMatch.KeyWord("KeyWord_Mixed", "=", "..", "!="),
+    BaseMatch.KeyWord("KeyWord_Overlap", "a", "ab", "ba", "b.a"),
+    BaseMatch.KeyWord("KeyWord_Long", "ab", "a"),
+    BaseMatch.KeyWord("KeyWord_Newline", "a\nb", "\n", "b"),
+    BaseMatch.KeyWord("KeyWord_None"),
+]
+
+ALPHABET = ["a", "b", "x", ".", "=", "!", "[", " ", "\n", "\"", "\\", "\\\"", "\\\\", "ab", "b.a", "..", "!="]
+
+
+def _span(a:Union[dict,BaseMatch.Match_Fail]) -> Union[Tuple[int,int],None] :
+    return None if a is BaseMatch.MATCH_FAIL else a["token"].span()
+
+def _result(matcher:BaseMatch.Match_Base, s:str, s_pointer:int) -> Tuple[object,object] :
+    a = _span(matcher._try_match(s, s_pointer))
+    try : b = matcher._match_string(s, s_pointer)["token"].span()
+    except Exception as e : b = (e.__class__.__name__, getattr(e, "pos", None))
+    return a, b
+
+def differential(count:int=20000, seed:int=0) -> Dict[str,int] :
+    """
+    在随机输入的每个位置比较两种实现，返回 {匹配对象 token_type : 不一致的次数}\\n
+    _try_match 与参照实现比较匹配范围，_match_string 与修改前的类比较匹配范围或异常类型与位置
+    """
+    rnd = random.Random(seed)
+    mismatch = {i.token_type:0 for i in MATCHERS}
+    for _ in range(count) :
+        s = "".join(rnd.choice(ALPHABET) for _ in range(rnd.randint(0, 8)))
+        for matcher in MATCHERS :
+            reference = REFERENCE[type(matcher)]
+            for s_pointer in range(len(s) + 1) :
+                a, b = _result(matcher, s, s_pointer)
+                expected = _span(reference(matcher, s, s_pointer))
+                #匹配成功时 _match_string 与 _try_match 的结果相同，失败时只要求抛出异常
+                if a != expected or (expected is not None and b != expected) or (expected is None and not isinstance(b[0], str)) :
+                    mismatch[matcher.token_type] += 1
+    return mismatch
+
+
+def _time(function:Callable, matcher:BaseMatch.Match_Base, inputs:List[str], number:int) -> Union[float,None] :
+    if not inputs : return None
+    inputs = [i + " " for i in inputs]
+    best = None
+    for _ in range(5) :
+        t1 = time.perf_counter_ns()
+        for _ in range(number) :
+            for s in inputs : function(matcher, s, 0)
+        t2 = (time.perf_counter_ns() - t1) / (number * len(inputs))
+        best = t2 if best is None else min(best, t2)
+    return best
+
+def timing(number:int=2000) -> Dict[str,Dict[str,float]] :
+    """返回 {名称 : {"regex_match_ns", "kernel_match_ns", "regex_fail_ns", "kernel_fail_ns"}}"""
+    kernel = lambda matcher, s, s_pointer : matcher._try_match(s, s_pointer)
+    result = {}
+    for name, matcher, success, fail in CASES :
+        if type(matcher) not in REFERENCE : continue
+        reference = REFERENCE[type(matcher)]
+        result[name] = {
+            "regex_match_ns" : _time(reference, matcher, success, number), "kernel_match_ns" : _time(kernel, matcher, success, number),
+            "regex_fail_ns" : _time(reference, matcher, fail, number), "kernel_fail_ns" : _time(kernel, matcher, fail, number),
+        }
+    return result
+
+
+def main(count:int=20000, number:int=2000) :
+    mismatch = differential(count)
+    print("differential : %d 个随机输入" % count)
+    for name, value in mismatch.items() : print("  %-20s mismatch %d" % (name, value))
+    print("%-22s %14s %14s %14s %14s" % ("timing (ns/call)", "regex match", "kernel match", "regex fail", "kernel fail"))
+    for name, value in timing(number).items() :
+        print("%-22s" % name + "".join("%14.1f" % value[i] for i in ("regex_match_ns","kernel_match_ns","regex_fail_ns","kernel_fail_ns")))
+
+
+if __name__ == "__main__" :
+    main(*[int(i) for i in sys.argv[1:3]])
@@ -0,0 +1,63 @@
+"""
+语言服务器编辑延迟测试
+------------------------------
+python -m benchmark.lsp_edit [行数] [编辑次数]\n
+生成一个很大的 .mcfunction 文档(语料中的命令会重复出现)，比较\n
+full : 每次修改后逐行重新分析整个文件(与修改前编辑器保存时调用 parse_functions 相同)\n
+open : 语言服务器打开文档，相同的行只分析一次\n
+edit : 在随机的行中逐字输入，每次按键为一个 didChange，只重新分析被修改的行，并重新生成整个文档的诊断列表
+"""
+
+from typing import Dict,Union,List,Tuple
+import random,sys,time
+
+from command_parser import LspServer
+from benchmark.corpus import generate
+from benchmark.grammar import build_parser
+
+
+def build_document(lines:int, seed:int=0) -> str :
+    #真实的行为包中大量的行完全相同，语料只生成一半数量的不同命令
+    commands = generate("mixed", max(1, lines // 2), seed)
+    rnd = random.Random(seed)
+    return "\n".join(rnd.choice(commands) for _ in range(lines))
+
+
+def main(lines:int=20000, edits:int=300) :
+    text = build_document(lines)
+    parser = build_parser()
+
+    t1 = time.perf_counter()
+    for line in text.split("\n") : parser.parse(line, recover=True)
+    full = time.perf_counter() - t1
+
+    server = LspServer.Language_Server(build_parser())
+    t1 = time.perf_counter()
+    document = server.open_document("file:///bench.mcfunction", text)
+    server.document_diagnostics(document)
+    opened = time.perf_counter() - t1
+    parsed_on_open = server.parsed_lines
+
+    rnd = random.Random(1)
+    latency = []
+    for _ in range(edits // 10) :
+        line = rnd.randrange(len(document.lines))
+        for i in range(10) :
+            character = len(document.lines[line])
+            change = {"range":{"start":{"line":line, "character":character}, "end":{"line":line, "character":character}},
+                "text":rnd.choice([" ", "a", "@", "1", "["])}
+            t1 = time.perf_counter()
+            server.change_document(document.uri, [change])
+            server.document_diagnostics(document)
+            latency.append(time.perf_counter() - t1)
+    latency.sort()
+
+    print("%d 行，%d 行不同" % (lines, len(set(text.split("\n")))))
+    print("full  : %10.1f ms" % (full * 1e3))
+    print("open  : %10.1f ms  (分析 %d 行)" % (opened * 1e3, parsed_on_open))
+    print("edit  : p50 %.2f ms  p99 %.2f ms  (%d 次修改，分析 %d 行，缓存命中 %d 行)" % (latency[len(latency) // 2] * 1e3,
+        latency[min(len(latency) - 1, len(latency) * 99 // 100)] * 1e3, len(latency), server.parsed_lines - parsed_on_open, server.cache_hits))
+
+
+if __name__ == "__main__" :
+    main(*[int(i) for i in sys.argv[1:3]])
@@ -0,0 +1,62 @@
+"""
+匹配类的微基准测试
+------------------------------
+对每个内建匹配类分别测试匹配成功与匹配失败的输入\n
+测试的是词法器实际调用的 _try_match，结果为每次调用的平均纳秒数
+"""
+
+from typing import Dict,Union,List,Tuple,Callable
+import time
+from command_parser import BaseMatch,SpecialMatch,JsonParser
+
+__all__ = ["CASES","run"]
+
+
+#(名称, 匹配对象, 匹配成功的输入, 匹配失败的输入)，AnyString 与 AnyMsg 不会匹配失败
+CASES : List[Tuple[str,BaseMatch.Match_Base,List[str],List[str]]] = [
+    ("Enum", BaseMatch.Enum("Gamemode","0","1","2","s","c","a","survival","creative","adventure","spectator"),
+        ["survival", "c", "spectator"], ["hardcore", "@a", "3"]),
+    ("Char", BaseMatch.Char("Command","scoreboard"), ["scoreboard"], ["scoreboards", "tp"]),
+    ("KeyWord", BaseMatch.KeyWord("Range_Sign",".."), ["..5", ".."], ["5..", "~"]),
+    ("KeyWord_Mixed", BaseMatch.KeyWord("Symbol","=","..","!="), ["=5", "..3", "!=2"], ["<5", "~"]),
+    ("Int", BaseMatch.Int("Score"), ["42", "-17", "2147483647"], ["4.5", "abc", "~"]),
+    ("Float", BaseMatch.Float("Value"), ["1.5", "-20", ".5", "3."], ["1.2.3", "abc", "^"]),
+    ("AnyString", BaseMatch.AnyString("Item_ID"), ["minecraft:diamond_sword", "apple"], []),
+    ("AnyMsg", BaseMatch.AnyMsg("Msg"), ["hello world, this is a message"], []),
+    ("BE_Range_Int", SpecialMatch.BE_Range_Int("Range_Min"), ["5..", "-10"], ["..5", "a"]),
+    ("BE_String", SpecialMatch.BE_String("Tag_Name"), ["builder", "red_team"], ['"quoted"', ""]),
+    ("BE_Quotation_String", SpecialMatch.BE_Quotation_String("Name"),
+        ['"Steve"', '"a \\"quoted\\" name"'], ["Steve", '"unterminated']),
+    ("Relative_Offset_Float", SpecialMatch.Relative_Offset_Float("Relative_Pos"), ["~", "~1.5", "~-3"], ["1", "~1.2.3", "^"]),
+    ("Local_Offset_Float", SpecialMatch.Local_Offset_Float("Local_Pos"), ["^", "^2.5", "^-1"], ["~", "^1.2.3"]),
+    ("Json_Rawtext", JsonParser.Json_Match("Rawtext", JsonParser.Rawtext_Schema()),
+        ['{"rawtext":[{"text":"hello "},{"score":{"name":"@s","objective":"kills"}}]}'], ['{"rawtext":[{"text":"hello "}', "hello"]),
+]
+
+
+def _time_calls(matcher:BaseMatch.Match_Base, inputs:List[str], number:int) -> Union[float,None] :
+    if not inputs : return None
+    #每个输入后面追加分隔符，与词法器中的调用方式相同
+    inputs = [i + " " for i in inputs]
+    try_match = matcher._try_match
+    best = None
+    for _ in range(3) :
+        t1 = time.perf_counter_ns()
+        for _ in range(number) :
+            for s in inputs : try_match(s, 0)
+        t2 = (time.perf_counter_ns() - t1) / (number * len(inputs))
+        best = t2 if best is None else min(best, t2)
+    return best
+
+
+def run(number:int=2000) -> Dict[str,Dict[str,float]] :
+    """
+    运行所有匹配类的微基准测试
+    ------------------------------
+    number : 每个输入重复调用的次数\n
+    返回 {名称 : {"match_ns":..., "fail_ns":...}}，没有对应输入的项为None
+    """
+    result = {}
+    for name, matcher, success, fail in CASES :
+        result[name] = {"match_ns":_time_calls(matcher, success, number), "fail_ns":_time_calls(matcher, fail, number)}
+    return result
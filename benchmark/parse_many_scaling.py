@@ -0,0 +1,38 @@
+"""
+parse_many 吞吐量测试
+------------------------------
+python -m benchmark.parse_many_scaling [命令数量]\n
+分别使用 1 至 CPU核心数 个工作进程分析同一批命令，输出每秒分析的命令数量
+"""
+
+import os,sys,time
+from benchmark.grammar import build_parser
+
+
+COMMANDS = [
+    'ability @a[tag=!builder,scores={level=5..,money=!..0}] mayfly true',
+    'execute @e[type=zombie,r=10] ~ ~1 ~ execute @p[rm=2] ~ ~ ~ tp @s ~ ~5 ~',
+    'tp @s[x=~1,y=64,z=~-3,dx=5,dy=5,dz=5] 100 64.5 -20',
+    'give @p[hasitem={item=diamond,quantity=1..}] iron_ingot 16 0',
+    'scoreboard players add @a[m=!spectator] kills 1',
+    'say hello world',
+    'tag @e[family=monster,c=5] add "marked target"',
+    'effect @a speed 30 1 true',
+    'setblock ~ ~-1 ~ stone 0',
+    'ability @e[tag=] mayfly true extra',
+]
+
+
+def main(count:int=200000) :
+    commands = [COMMANDS[i % len(COMMANDS)] for i in range(count)]
+    parser = build_parser()
+    print("commands : %s" % count)
+    for workers in range(1, (os.cpu_count() or 1) + 1) :
+        t1 = time.perf_counter()
+        for _ in parser.parse_many(commands, workers=workers, chunksize=512) : pass
+        t2 = time.perf_counter() - t1
+        print("workers %2s : %8.0f commands/s  (%.2fs)" % (workers, count / t2, t2))
+
+
+if __name__ == "__main__" :
+    main(*[int(i) for i in sys.argv[1:2]])
@@ -0,0 +1,51 @@
+"""
+分支重排的前后对比测试
+------------------------------
+python -m benchmark.reorder [命令数量]\n
+在一批语料上收集性能统计并生成重排方案，再用另一批语料(不同的随机数种子)比较重排前后的吞吐量\n
+同时检查重排前后所有命令的分析结果完全相同
+"""
+
+import sys,time
+from command_parser import TreeOptimizer
+from benchmark.corpus import generate
+from benchmark.grammar import build_parser
+
+
+def _result_key(result) :
+    tokens = [(i["type"], i["token"].span()) for i in result.tokens]
+    error = None if result.error is None else (str(result.error), result.error.pos)
+    return tokens, result.pointer, error, list((result.auto_complete or {}).items())
+
+def _throughput(parser, commands, repeat:int=5) -> float :
+    best = None
+    for _ in range(repeat) :
+        t1 = time.perf_counter()
+        for command in commands : parser.parse(command)
+        t2 = time.perf_counter() - t1
+        best = t2 if best is None else min(best, t2)
+    return len(commands) / best
+
+
+def main(count:int=2000) :
+    parser = build_parser()
+    profile = parser.enable_profile()
+    for command in generate("mixed", count, seed=1) : parser.parse(command)
+    parser.disable_profile()
+    plan = TreeOptimizer.reorder_plan(parser.Tree, profile)
+    print("reordered nodes : %s / %s" % (len(plan["order"]), plan["nodes"]))
+
+    reordered = build_parser()
+    TreeOptimizer.apply_reorder_plan(reordered.Tree, plan)
+    print("%-12s %14s %14s" % ("workload", "before(cmd/s)", "after(cmd/s)"))
+    for workload in ("selector", "execute", "mixed") :
+        commands = generate(workload, count)
+        baseline = build_parser()
+        for command in commands :
+            if _result_key(baseline.parse(command)) != _result_key(reordered.parse(command)) :
+                raise AssertionError("重排后分析结果不同 : %r" % command)
+        print("%-12s %14.0f %14.0f" % (workload, _throughput(baseline, commands), _throughput(reordered, commands)))
+
+
+if __name__ == "__main__" :
+    main(*[int(i) for i in sys.argv[1:2]])
@@ -0,0 +1,72 @@
+"""
+嵌套命令的对比测试
+------------------------------
+python -m benchmark.sub_command [命令数量] [内层命令种类]\n
+execute ... run 之后的命令分别以两种方式分析\n
+inline : run 之后直接连接命令树的所有命令(与 benchmark.grammar 中的 execute 相同的写法)\n
+sub_command : run 之后使用 SpecialMatch.Sub_Command，分别测试不使用缓存与使用缓存\n
+语料中的外层命令各不相同，内层命令只从少量命令中选择，使用缓存时内层命令可以命中缓存
+"""
+
+import sys,time
+from command_parser import BaseMatch,SpecialMatch,ParserSystem
+from benchmark.corpus import ENTITIES,NAMES,_Generator
+from benchmark.grammar import build_tree
+
+
+def build_run_parser(sub_command:bool, cache_size:int=0) -> ParserSystem.Command_Parser :
+    """
+    构建带有 execute (as|at) 选择器 ... run 命令 的词法器\n
+    sub_command : run 之后是否使用 SpecialMatch.Sub_Command
+    """
+    Tree = SpecialMatch.Command_Root()
+    Mode = BaseMatch.Enum("Execute_Mode","as","at")
+    Run = BaseMatch.Char("Run","run")
+    Mode.add_leaves( *SpecialMatch.BE_Selector_Tree( Mode, Run ) )
+    Tree.add_leaves( *build_tree().tree_leaves[0:-1], BaseMatch.Char("Command","execute").add_leaves( Mode ) )
+    if sub_command : Run.add_leaves( SpecialMatch.Sub_Command("Run_Command") )
+    else : Run.add_leaves( *Tree.tree_leaves )
+    return ParserSystem.Command_Parser(Tree, cache_size=cache_size)
+
+def generate(count:int, payloads:int, seed:int=0) -> list :
+    """外层命令随机生成(选择器较简单)，run 之后从 payloads 种带有大量选择器参数的命令中选择，部分命令带有两层 run"""
+    gen = _Generator(seed)
+    inner = [gen.command(True) for _ in range(payloads)]
+    selector = lambda : gen.choice(["@a","@p","@s","@e[type=%s]" % gen.choice(ENTITIES),"@a[tag=%s]" % gen.choice(NAMES)])
+    prefix = lambda : "execute %s run " % " ".join("%s %s" % (gen.choice(["as","at"]), selector()) for _ in range(gen.rnd.randint(1, 3)))
+    commands = []
+    for _ in range(count) :
+        command = prefix() + gen.choice(inner)
+        if gen.rnd.random() < 0.3 : command = prefix() + command
+        commands.append(command)
+    return commands
+
+
+def _time(parser:ParserSystem.Command_Parser, commands:list) -> float :
+    if parser.cache is not None : parser.cache.clear()
+    t1 = time.perf_counter()
+    for command in commands : parser.parse(command)
+    return (time.perf_counter() - t1) / len(commands)
+
+
+def main(count:int=2000, payloads:int=50, repeat:int=7) :
+    commands = generate(count, payloads)
+    parsers = {
+        "inline" : build_run_parser(False),
+        "sub_command" : build_run_parser(True),
+        "sub_command+cache" : build_run_parser(True, cache_size=count * 4),
+    }
+    expected = [parsers["inline"].parse(i).success for i in commands]
+    mismatch = {name:sum(parser.parse(i).success != j for i,j in zip(commands, expected)) for name, parser in parsers.items()}
+    #各模式交替运行，取每种模式最快的一次，减少机器负载波动的影响
+    best = {}
+    for _ in range(repeat) :
+        for name, parser in parsers.items() : best[name] = min(best.get(name, float("inf")), _time(parser, commands))
+    print("%d 条命令，内层命令 %d 种，成功 %d 条" % (count, payloads, sum(expected)))
+    print("%-20s %12s %10s" % ("mode", "us/command", "mismatch"))
+    for name in parsers : print("%-20s %12.2f %10d" % (name, best[name] * 1e6, mismatch[name]))
+    print("cache", parsers["sub_command+cache"].cache.info())
+
+
+if __name__ == "__main__" :
+    main(*[int(i) for i in sys.argv[1:3]])
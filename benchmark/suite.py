@@ -0,0 +1,150 @@
+"""
+完整的性能测试
+------------------------------
+python -m benchmark.suite [--count N] [--repeat N] [--baseline PATH] [--save] [--tolerance T]\n
+1. 每个匹配类的微基准测试(benchmark.matchers)\n
+2. 使用 Command_Parser.parser 分析 benchmark.corpus 生成的各类语料，
+   输出吞吐量、单条命令的 p50/p99 延迟与分析过程中的内存分配\n
+3. 与保存的基准结果比较，延迟变长或吞吐量下降超过 tolerance 时视为性能退化，以状态码1退出\n
+--save 将本次结果写入基准文件，基准结果与机器相关，更换机器后应该重新保存
+"""
+
+from typing import Dict,Union,List,Tuple
+import argparse,json,os,platform,sys,time,tracemalloc
+
+from benchmark import matchers as Matchers
+from benchmark.corpus import WORKLOADS,generate
+from benchmark.grammar import build_parser
+
+__all__ = ["run_workloads","compare","main"]
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+#越小越好的指标，其余指标越大越好
+LOWER_IS_BETTER = ("p50_us","p99_us","peak_kib","retained_blocks","match_ns","fail_ns")
+
+
+def _percentile(sorted_values:List[float], percent:float) -> float :
+    index = min(len(sorted_values) - 1, max(0, int(round(percent / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def _measure(parse, commands:List[str], repeat:int) -> Dict[str,float] :
+    latency = []
+    best = None
+    perf_counter_ns = time.perf_counter_ns
+    for _ in range(repeat) :
+        t1 = perf_counter_ns()
+        for command in commands :
+            t2 = perf_counter_ns()
+            parse(command)
+            latency.append(perf_counter_ns() - t2)
+        total = perf_counter_ns() - t1
+        best = total if best is None else min(best, total)
+    latency.sort()
+
+    #单独运行一次统计内存分配，tracemalloc 会拖慢分析，不与计时混在一起
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for command in commands : parse(command)
+    after = tracemalloc.take_snapshot()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    retained = sum(i.count_diff for i in after.compare_to(before, "filename") if i.count_diff > 0)
+
+    return {
+        "commands_per_s" : len(commands) / (best / 1e9),
+        "p50_us" : _percentile(latency, 50) / 1e3,
+        "p99_us" : _percentile(latency, 99) / 1e3,
+        "peak_kib" : peak / 1024,
+        "retained_blocks" : retained,
+    }
+
+def run_workloads(count:int=2000, repeat:int=5) -> Dict[str,Dict[str,float]] :
+    """
+    端到端测试
+    ------------------------------
+    count : 每类语料的命令数量\n
+    repeat : 重复分析的次数，吞吐量取最快的一次，延迟统计所有次数\n
+    返回 {语料类型 : 指标字典}\n
+    peak_kib : 分析全部命令时 tracemalloc 统计的内存峰值\n
+    retained_blocks : 分析结束后仍未释放的内存块数量(缓存、补全索引等)
+    """
+    parser = build_parser()
+    result = {}
+    for workload in WORKLOADS :
+        commands = generate(workload, count)
+        result[workload] = _measure(parser.parser, commands, repeat)
+    commands = generate("mixed", count)
+    result["mixed_backtrack"] = _measure(lambda i : parser.parse(i, backtrack=True), commands, repeat)
+    return result
+
+
+def compare(current:Dict[str,Dict[str,Dict[str,float]]], baseline:Dict[str,Dict[str,Dict[str,float]]], tolerance:float) -> List[str] :
+    """
+    比较本次结果与基准结果
+    ------------------------------
+    返回所有退化超过 tolerance(比例) 的指标说明
+    """
+    regressions = []
+    for section, items in baseline.items() :
+        if section not in current : continue
+        for name, metrics in items.items() :
+            for metric, old in metrics.items() :
+                new = current[section].get(name, {}).get(metric)
+                if not old or new is None : continue
+                #残留内存块数量很小，比例没有意义
+                if metric == "retained_blocks" : continue
+                ratio = new / old if metric in LOWER_IS_BETTER else old / new
+                if ratio > 1 + tolerance :
+                    regressions.append("%s.%s.%s : %.4g -> %.4g (退化 %.0f%%)" % (section, name, metric, old, new, (ratio - 1) * 100))
+    return regressions
+
+
+def _print_table(title:str, items:Dict[str,Dict[str,float]]) :
+    columns = []
+    for metrics in items.values() :
+        for i in metrics :
+            if i not in columns : columns.append(i)
+    print(title)
+    print("%-24s" % "" + "".join("%16s" % i for i in columns))
+    for name, metrics in items.items() :
+        print("%-24s" % name + "".join("%16s" % ("-" if metrics.get(i) is None else "%.2f" % metrics[i]) for i in columns))
+    print()
+
+def main(argv:List[str]=None) -> int :
+    arg = argparse.ArgumentParser(prog="python -m benchmark.suite", description="命令词法器性能测试")
+    arg.add_argument("--count", type=int, default=2000, help="每类语料的命令数量")
+    arg.add_argument("--repeat", type=int, default=5, help="重复分析的次数")
+    arg.add_argument("--number", type=int, default=2000, help="微基准测试中每个输入的调用次数")
+    arg.add_argument("--baseline", default=BASELINE_PATH, help="基准结果文件")
+    arg.add_argument("--save", action="store_true", help="将本次结果保存为基准结果")
+    arg.add_argument("--tolerance", type=float, default=0.25, help="允许的退化比例")
+    args = arg.parse_args(argv)
+
+    current = {"matchers":Matchers.run(args.number), "workloads":run_workloads(args.count, args.repeat)}
+    _print_table("匹配类 (ns/次)", current["matchers"])
+    _print_table("端到端", current["workloads"])
+
+    if args.save :
+        with open(args.baseline, "w", encoding="utf-8") as f :
+            json.dump({"python":platform.python_version(), "machine":platform.machine(), **current}, f, indent=2, sort_keys=True)
+        print("已保存基准结果 %s" % args.baseline)
+        return 0
+
+    if not os.path.isfile(args.baseline) :
+        print("没有基准结果 %s，使用 --save 生成" % args.baseline)
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as f : baseline = json.load(f)
+    if (baseline.get("python"), baseline.get("machine")) != (platform.python_version(), platform.machine()) :
+        print("注意 : 基准结果来自 Python %s / %s，与当前环境不同" % (baseline.get("python"), baseline.get("machine")))
+    regressions = compare(current, {i:j for i,j in baseline.items() if isinstance(j, dict)}, args.tolerance)
+    if not regressions :
+        print("与基准结果相比没有超过 %.0f%% 的退化" % (args.tolerance * 100))
+        return 0
+    print("性能退化 :")
+    for i in regressions : print("  " + i)
+    return 1
+
+
+if __name__ == "__main__" :
+    sys.exit(main())
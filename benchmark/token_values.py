@@ -0,0 +1,143 @@
+"""
+token 类型化取值的对比测试
+------------------------------
+python -m benchmark.token_values [命令数量] [重复次数]\n
+parse : 分析的耗时\n
+reparse : 分析之后按照 token 类型用正则表达式重新分析坐标、数值与范围的文本(修改前下游代码的做法)，不包含分析的耗时\n
+token_value : 分析之后使用 TokenValue.values 生成的 Token_Values 取值，不包含分析的耗时\n
+每种方式每次处理 BATCH 条命令，取 repeat 次中最快的一次后累加，减少单次测量的波动\n
+mismatch : token_value 与独立参照不一致的数量，参照按照词法器的顺序逐个重新匹配 token，使用第一个匹配成功的分支的转换函数\n
+reparse 只按照 token 类型判断，同一类型可能是不同的匹配类(例如选择器参数的 Value)，只用于耗时对比
+"""
+
+from typing import Dict,Union,List,Tuple
+import re,sys,time,operator
+from command_parser import BaseMatch,ParserSystem,TokenValue
+from benchmark.corpus import generate
+from benchmark.grammar import build_parser
+
+_NUMBER = re.compile("^([~^]?)([-+]?[0-9]*\\.?[0-9]*)$")
+_QUOTED = re.compile('^"((\\\\.|[^\\\\"])*)"$')
+_ESCAPE = re.compile("\\\\(.)")
+_RANGE_TYPES = ("Not","Range_Min","Range_Sign","Range_Max")
+_RANGE_SET = frozenset(_RANGE_TYPES)
+_TYPE = operator.itemgetter("type")
+
+def _is_range(tokens:List[dict], i:int) -> bool :
+    #"!" 同样用于名称等条件的取反，之后是范围时才属于范围值
+    if tokens[i]["type"] == "Not" : i += 1
+    return i < len(tokens) and tokens[i]["type"] in _RANGE_TYPES[1:]
+
+def _converter(matcher:BaseMatch.Match_Base) :
+    for i in type(matcher).__mro__ :
+        if i in TokenValue.CONVERTERS : return TokenValue.CONVERTERS[i]
+    return None
+
+def _reference(parser:ParserSystem.Command_Parser, result:ParserSystem.Parse_Result) -> list :
+    command, tokens, node = result.command, result.tokens, parser.Tree
+    raw = []
+    for token in tokens :
+        for i in node.tree_leaves :
+            a = i._try_match(command, token["token"].start())
+            if a is not BaseMatch.MATCH_FAIL and a is not None : break
+        convert = _converter(i)
+        raw.append(token["token"].group() if convert is None else convert(token["token"].group(), i))
+        node = i
+    values = []
+    i = 0
+    while i < len(tokens) :
+        if not _is_range(tokens, i) :
+            values.append(raw[i])
+            i += 1
+            continue
+        negated = tokens[i]["type"] == "Not"
+        i += negated
+        low = high = None
+        if tokens[i]["type"] == "Range_Min" :
+            low = high = raw[i]
+            i += 1
+        if i < len(tokens) and tokens[i]["type"] == "Range_Sign" :
+            high = None
+            i += 1
+            if i < len(tokens) and tokens[i]["type"] == "Range_Max" :
+                high = raw[i]
+                i += 1
+        values.append(TokenValue.Range_Value(low, high, negated))
+    return values
+
+def _typed_types(parser:ParserSystem.Command_Parser) -> frozenset :
+    #下游代码按照 token 类型决定是否重新分析文本，这里取使用了有转换函数的匹配类的 token 类型
+    return frozenset(j.token_type for i in BaseMatch.walk_tree(parser.Tree, True) for j in i.tree_leaves if _converter(j))
+
+
+def _reparse(command:str, tokens:List[dict], typed:frozenset) -> list :
+    values = []
+    i = 0
+    while i < len(tokens) :
+        token = tokens[i]
+        if _is_range(tokens, i) :
+            #重新拼接范围的文本后再次分析
+            start = i
+            i += 1
+            while i < len(tokens) and tokens[i]["type"] in _RANGE_TYPES[1:] : i += 1
+            text = command[tokens[start]["token"].start():tokens[i-1]["token"].end()]
+            negated = text.startswith("!")
+            low, sign, high = text.lstrip("!").partition("..")
+            low = int(low) if low else None
+            values.append(TokenValue.Range_Value(low, (int(high) if high else None) if sign else low, negated))
+            continue
+        text = token["token"].group()
+        _match = _NUMBER.match(text) if token["type"] in typed else None
+        if _match is None :
+            quoted = _QUOTED.match(text) if token["type"] in typed else None
+            values.append(text if quoted is None else _ESCAPE.sub("\\1", quoted.group(1)))
+        elif _match.group(1) : values.append(TokenValue.Offset_Value(_match.group(1), float(_match.group(2) or 0)))
+        elif "." in _match.group(2) : values.append(float(_match.group(2)))
+        else : values.append(int(_match.group(2)))
+        i += 1
+    return values
+
+def _token_value(result:ParserSystem.Parse_Result) -> list :
+    #先遍历转换全部 token，再把每个范围值的 token 替换为 range 组合的结果，从后向前替换不影响前面的下标
+    tokens, token_values = result.tokens, TokenValue.values(result)
+    values = list(token_values)
+    if _RANGE_SET.isdisjoint(map(_TYPE, tokens)) : return values
+    types = list(map(_TYPE, tokens))
+    starts = [i for i,j in enumerate(types) if j in _RANGE_SET and (i == 0 or types[i-1] not in _RANGE_SET) and _is_range(tokens, i)]
+    for i in reversed(starts) :
+        value, end = token_values.range(i)
+        values[i:end] = [value]
+    return values
+
+
+BATCH = 100
+
+def main(count:int=2000, repeat:int=15) :
+    parser = build_parser()
+    typed = _typed_types(parser)
+    modes = {
+        "parse" : lambda result : parser.parse(result.command),
+        "reparse" : lambda result : _reparse(result.command, result.tokens, typed),
+        "token_value" : _token_value,
+    }
+    print("%-12s %12s %12s %12s %10s" % ("workload", "parse", "reparse", "token_value", "mismatch"))
+    for workload in ("coordinate","selector") :
+        results = [parser.parse(i) for i in generate(workload, count)]
+        results = [i for i in results if i.success]
+        mismatch = sum(_reference(parser, i) != _token_value(i) for i in results)
+        total = dict.fromkeys(modes, 0.0)
+        for start in range(0, len(results), BATCH) :
+            batch = results[start:start+BATCH]
+            best = dict.fromkeys(modes, float("inf"))
+            for _ in range(repeat) :
+                for mode, function in modes.items() :
+                    t1 = time.perf_counter()
+                    for result in batch : function(result)
+                    best[mode] = min(best[mode], time.perf_counter() - t1)
+            for mode in modes : total[mode] += best[mode]
+        print("%-12s %12.2f %12.2f %12.2f %10d" % (workload, *[total[i] / len(results) * 1e6 for i in modes], mismatch))
+    print("单位 us/command")
+
+
+if __name__ == "__main__" :
+    main(*[int(i) for i in sys.argv[1:3]])
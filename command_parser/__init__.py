@@ -1,4 +1,14 @@
-
 from . import base_match_class as BaseMatch
 from . import special_match as SpecialMatch
-from . import parser_system as ParserSystem
\ No newline at end of file
+from . import json_paser as JsonParser
+from . import parser_system as ParserSystem
+from . import async_parser as AsyncParser
+from . import tree_compiler as TreeCompiler
+from . import tree_optimizer as TreeOptimizer
+from . import mcfunction as McFunction
+from . import lsp_server as LspServer
+from . import token_stream as TokenStream
+from . import token_value as TokenValue
+from . import completion as Completion
+from . import profiler as Profiler
+from . import tree_cache as TreeCache
\ No newline at end of file
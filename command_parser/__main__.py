@@ -0,0 +1,9 @@
+"""
+python -m command_parser 模块:对象\n
+启动 .mcfunction 语言服务器，见 command_parser.lsp_server
+"""
+
+import sys
+from .lsp_server import main
+
+sys.exit(main())
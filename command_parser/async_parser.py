@@ -0,0 +1,90 @@
+"""
+异步词法器
+------------------------------
+Async_Parser : 在有上限的线程池中运行 Command_Parser.parse，不阻塞 asyncio 事件循环\n
+同一个文档的新请求会取消该文档尚未完成的旧请求，\n
+尚未开始的旧请求直接从线程池中移除，正在分析的旧请求在下一步检查取消标志后停止
+"""
+
+from . import parser_system as ParserSystem
+
+from typing import Dict,Tuple,Hashable
+import asyncio,concurrent.futures,threading
+
+__all__ = ["Async_Parser"]
+
+
+class Async_Parser :
+    """
+    异步词法器
+    ------------------------
+    实例化参数\n
+    parser : 使用的 ParserSystem.Command_Parser\n
+    max_workers : 线程池中的最大线程数量\n
+    ------------------------
+    parse 的 document 参数为任意可哈希的文档标识(例如编辑器中的文件路径)，\n
+    同一个 document 同时只保留最新的一次请求，被取代的请求抛出 ParserSystem.Parse_Cancelled\n
+    自动补全字典也在工作线程中生成，事件循环中读取 auto_complete 不需要再等待\n
+    分析在线程中进行，受全局解释器锁限制不会更快完成，但事件循环在分析期间可以继续处理其他任务
+    """
+
+    def __init__(self, parser:ParserSystem.Command_Parser, max_workers:int=2) -> None :
+        if not isinstance(parser, ParserSystem.Command_Parser) : raise TypeError("parser 参数只能为 Command_Parser 类")
+        if not isinstance(max_workers,int) or max_workers < 1 : raise Exception("max_workers 参数应该为正整数")
+        self.parser = parser
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers, thread_name_prefix="Async_Parser")
+        #document -> (取消标志, 线程池中的任务)
+        self._pending : Dict[Hashable,Tuple[threading.Event,concurrent.futures.Future]] = {}
+        self.completed = 0
+        self.cancelled = 0
+
+    async def __aenter__(self) -> "Async_Parser" :
+        return self
+
+    async def __aexit__(self, *args) :
+        self.close()
+
+    def _run(self, command_str:str, cancel:threading.Event, options:dict) -> ParserSystem.Parse_Result :
+        if cancel.is_set() : raise ParserSystem.Parse_Cancelled("分析已取消")
+        result = self.parser.parse(command_str, cancel=cancel, **options)
+        #在工作线程中生成自动补全字典
+        result.auto_complete
+        return result
+
+    def cancel(self, document:Hashable) -> bool :
+        """取消 document 尚未完成的请求，存在这样的请求时返回True"""
+        entry = self._pending.pop(document, None)
+        if entry is None : return False
+        entry[0].set()
+        entry[1].cancel()
+        self.cancelled += 1
+        return True
+
+    async def parse(self, document:Hashable, command_str:str, **options) -> ParserSystem.Parse_Result :
+        """
+        在线程池中分析 command_str，返回 ParserSystem.Parse_Result\n
+        options 为 Command_Parser.parse 的其他参数(compact、backtrack、recover)\n
+        同一个 document 之后又有新的请求时抛出 ParserSystem.Parse_Cancelled
+        """
+        self.cancel(document)
+        cancel = threading.Event()
+        future = self._executor.submit(self._run, command_str, cancel, options)
+        self._pending[document] = (cancel, future)
+        try : result = await asyncio.wrap_future(future)
+        except asyncio.CancelledError :
+            #被新的请求取代时线程池中的任务被取消，否则是调用者所在的任务被取消
+            if not cancel.is_set() :
+                cancel.set()
+                raise
+            raise ParserSystem.Parse_Cancelled("分析已被同一文档的新请求取代") from None
+        finally :
+            if self._pending.get(document, (None, None))[1] is future : del self._pending[document]
+        #分析已经完成但结果送回事件循环之前被取代
+        if cancel.is_set() : raise ParserSystem.Parse_Cancelled("分析已被同一文档的新请求取代")
+        self.completed += 1
+        return result
+
+    def close(self) :
+        """取消所有请求并关闭线程池"""
+        for document in list(self._pending) : self.cancel(document)
+        self._executor.shutdown(wait=False)
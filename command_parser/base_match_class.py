@@ -2,10 +2,10 @@
 最原始的匹配类
 """
 
+from . import completion as Completion
 
-
-import re,abc
-from typing import Dict,Union,List,Tuple
+import re,abc,threading
+from typing import Dict,Union,List,Tuple,FrozenSet,Iterator,Callable
 
 __all__ = ["Match_Base","Enum","Char","KeyWord","Int","Float"]
 
@@ -24,8 +24,32 @@ def string_to_rematch(s:str) -> str :
     s_list = [ "\\u" + ("000%s" % hex( ord(i)).replace("0x","",1) )[-4:] for i in s]
     return "".join(s_list)
 
+_RE_POOL : Dict[Tuple[str,int],re.Pattern] = {}
+
+def re_compile(pattern:str, flags:int=0) -> re.Pattern :
+    """
+    从共享的正则表达式池中获取编译后的正则表达式\n
+    相同的表达式与标志只会编译一次，所有匹配类都应该通过此函数获取正则表达式
+    """
+    key = (pattern, flags)
+    if key not in _RE_POOL : _RE_POOL[key] = re.compile(pattern, flags)
+    return _RE_POOL[key]
+
+#span_match(s, start, end) 返回 s[start:end] 范围的 re.Match
+#匹配类用字符串操作确定匹配范围后，使用此函数生成 token 需要的 re.Match
+span_match : Callable[[str,int,int],re.Match] = re_compile(".{0,}", re.S).match
+
 TERMINATOR_RE = string_to_rematch(' ,@~^$&"!#%+*/=[{]}\|<>`')
 
+#首字符集合中代表"字符串已结束"的键
+END_OF_STRING = ""
+
+class Match_Fail :
+    """_try_match 匹配失败时返回的标记类，请直接使用 MATCH_FAIL"""
+    def __repr__(self) -> str : return "MATCH_FAIL"
+
+MATCH_FAIL = Match_Fail()
+
 
 class Match_Base(metaclass=abc.ABCMeta) :
     '''
@@ -42,12 +66,20 @@ class Match_Base(metaclass=abc.ABCMeta) :
     ------------------------------------
     所有从此基类继承的类都有以下公用方法\n
     add_leaves : 添加同级的命令分支\n
+    add_lazy_leaves : 添加第一次使用时才生成的命令分支\n
     ------------------------------------
     提供给开发者重写的方法\n
     _match_string : 提供自动补全的字符串列表，必须写明传参s、s_pointer，s是源字符串，s_pointer是源字符串当前匹配停止的位置
     _auto_complete : 提供自动补全的字符串列表
+    _try_match : 与 _match_string 相同，但匹配失败时返回 MATCH_FAIL 而不是抛出异常，词法器只使用此方法
+    _scan_end : 返回从 s_pointer 开始匹配时检查过的字符范围的结束位置(不包含)，增量分析使用
+    _first_char_set : 返回能够匹配成功的所有首字符(字符串结束记为 END_OF_STRING)，无法确定时返回None
+    _try_word : _word_scan 为True的匹配类使用，参数为 re_match 从当前位置匹配得到的单词，只进行验证并返回 token 或 MATCH_FAIL\n
+    同一位置的单词由词法器扫描一次后交给所有使用相同 re_match 的同级匹配对象
     '''
 
+    _word_scan = False
+
     def __init__(self,token_type:str) -> None :
         if not isinstance(token_type,str) : raise TypeError("token_type 提供字符串以外的参数")
         token_type1 = token_type.split(":",1)
@@ -55,6 +87,8 @@ class Match_Base(metaclass=abc.ABCMeta) :
         self.tree_leaves : List[Match_Base] = []
         if len(token_type1) > 1 : self.argument_dimension = token_type1[1].split(";")
         else : self.argument_dimension = []
+        self._dispatch = None
+        self._completion = None
 
     def __repr__(self) -> str:
         return self.__class__.__name__
@@ -64,14 +98,169 @@ class Match_Base(metaclass=abc.ABCMeta) :
             if not isinstance(i,Match_Base) : 
                 raise Not_Match_Object("%s 为非匹配对象" % i)
             self.tree_leaves.append(i)
+        self._dispatch = None
+        self._completion = None
+        return self
+
+    def add_lazy_leaves(self, builder:Callable[...,List["Match_Base"]], *args) :
+        """
+        添加延迟生成的命令分支
+        ------------------------------
+        builder(*args) 返回分支列表，词法器第一次到达该匹配对象时才会调用，结果会被保存\n
+        只能在没有其他分支时使用，生成后仍然可以继续 add_leaves\n
+        builder 应该是模块级函数，args 应该是匹配对象或者可以 pickle 的值，否则命令树无法缓存或传递给工作进程
+        """
+        if isinstance(self.tree_leaves, Lazy_Leaves) or len(self.tree_leaves) : 
+            raise ValueError("%s 已经存在分支，不能添加延迟生成的分支" % self)
+        self.tree_leaves = Lazy_Leaves(self, builder, args)
+        self._dispatch = None
+        self._completion = None
         return self
 
+    def _try_match(self,s:str,s_pointer:int) : 
+        try : return self._match_string(s,s_pointer)
+        except Exception : return MATCH_FAIL
+
+    def _first_char_set(self) -> Union[FrozenSet[str],None] : 
+        return None
+
+    def _scan_end(self,s:str,s_pointer:int) -> int : 
+        #无法确定时视为检查了整个字符串
+        return len(s) + 1
+
+    def _build_dispatch(self) :
+        """
+        生成首字符分派表
+        ------------------------------
+        返回 (table, fallback, shared_word)\n
+        table : 首字符 -> 需要尝试的分支元组(保持 tree_leaves 中的顺序)\n
+        fallback : 首字符不在 table 中时需要尝试的分支元组(首字符集合无法确定的分支)\n
+        shared_word : 是否存在同一个分支元组中有多个 _word_scan 匹配对象使用相同的 re_match，\n
+        为False时词法器不需要在同级分支之间共享单词扫描\n
+        直接修改 tree_leaves 后需要将 _dispatch 置为None
+        """
+        first_set = [(i, i._first_char_set()) for i in self.tree_leaves]
+        all_char = set()
+        for i,f in first_set :
+            if f is not None : all_char.update(f)
+        table = {c:tuple(i for i,f in first_set if (f is None) or (c in f)) for c in all_char}
+        fallback = tuple(i for i,f in first_set if f is None)
+        shared_word = False
+        for leaves in (fallback, *table.values()) :
+            patterns = [i.re_match for i in leaves if i._word_scan]
+            if len(set(patterns)) < len(patterns) : 
+                shared_word = True
+                break
+        self._dispatch = (table, fallback, shared_word)
+        return self._dispatch
+
+    def _build_completion(self) -> Completion.Completion_Index :
+        """
+        生成自动补全索引
+        ------------------------------
+        合并所有分支的 _auto_complete 结果，同名候选使用较后分支的提示文本\n
+        直接修改 tree_leaves 或分支的补全列表后需要将 _completion 置为None
+        """
+        self._completion = Completion.Completion_Index(self._completion_candidates())
+        return self._completion
+
+    def _completion_candidates(self) -> Dict[str,str] :
+        _str = {}
+        for i in self.tree_leaves : _str.update(i._auto_complete())
+        return _str
+
     @abc.abstractmethod
     def _match_string(self,s:str,s_pointer:int) -> re.Match : pass
     
     @abc.abstractmethod
     def _auto_complete(self) -> Dict[str,str] : pass
 
+
+_LAZY_LOCK = threading.RLock()
+
+class Lazy_Leaves(list) :
+    """
+    延迟生成的分支列表
+    ------------------------------
+    由 Match_Base.add_lazy_leaves 创建，第一次读取时调用 builder(*args) 生成分支\n
+    生成后所属匹配对象的 tree_leaves 替换为普通列表，之后的读取与普通匹配对象没有区别\n
+    pickle 时只保存 builder 与 args，不会生成分支
+    """
+
+    def __init__(self, owner:Match_Base, builder:Callable[...,List[Match_Base]], args:tuple) -> None :
+        super().__init__()
+        self.owner = owner
+        self.builder = builder
+        self.args = tuple(args)
+
+    def __repr__(self) -> str :
+        return "Lazy_Leaves(%s)" % getattr(self.builder, "__qualname__", self.builder)
+
+    def __reduce_ex__(self, protocol) :
+        return (Lazy_Leaves, (self.owner, self.builder, self.args))
+
+    def load(self) -> List[Match_Base] :
+        """生成分支并返回所属匹配对象新的 tree_leaves，多个线程同时读取时只会生成一次"""
+        with _LAZY_LOCK :
+            if self.owner.tree_leaves is self :
+                leaves = list(self.builder(*self.args))
+                for i in leaves :
+                    if not isinstance(i,Match_Base) : raise Not_Match_Object("%s 为非匹配对象" % i)
+                list.extend(self, leaves)
+                self.owner.tree_leaves = leaves
+                self.owner._dispatch = None
+                self.owner._completion = None
+            return self.owner.tree_leaves
+
+    def __len__(self) : return len(self.load())
+    def __iter__(self) : return iter(self.load())
+    def __getitem__(self, index) : return self.load()[index]
+    def __contains__(self, obj) : return obj in self.load()
+    def index(self, *args) : return self.load().index(*args)
+    def append(self, obj) : self.load().append(obj)
+
+
+def walk_tree(root:Match_Base, expand:bool=False) -> Iterator[Match_Base] :
+    """
+    遍历命令树
+    ------------------------------
+    按广度优先顺序返回所有可达的匹配对象，每个对象只返回一次(命令树中可能存在环)\n
+    expand : 为True时生成遍历到的所有延迟分支，为False时不生成延迟分支，改为继续遍历 builder 参数中的匹配对象
+    """
+    visited = {id(root)}
+    queue = [root]
+    for node in queue :
+        yield node
+        leaves = node.tree_leaves
+        if (not expand) and type(leaves) is Lazy_Leaves : leaves = [i for i in leaves.args if isinstance(i,Match_Base)]
+        for i in leaves :
+            if id(i) in visited : continue
+            visited.add(id(i))
+            queue.append(i)
+
+def finalize_tree(root:Match_Base) -> Match_Base :
+    """
+    完成命令树的构建
+    ------------------------------
+    为所有可达的匹配对象预先生成首字符分派表与自动补全索引，已经生成的不会重复生成\n
+    分支完全相同(同一批对象、同样顺序)的匹配对象共享同一份分派表，补全候选相同的匹配对象共享同一份补全索引\n
+    延迟分支不会被生成，它们的分派表与补全索引在第一次使用时生成\n
+    Command_Parser 实例化时会自动调用
+    """
+    shared_dispatch, shared_completion = {}, {}
+    for node in walk_tree(root) : 
+        if type(node.tree_leaves) is Lazy_Leaves : continue
+        if node._dispatch is None :
+            key = tuple([id(i) for i in node.tree_leaves])
+            if key in shared_dispatch : node._dispatch = shared_dispatch[key]
+            else : shared_dispatch[key] = node._build_dispatch()
+        if node.tree_leaves and node._completion is None :
+            candidates = node._completion_candidates()
+            key = tuple(candidates.items())
+            if key not in shared_completion : shared_completion[key] = Completion.Completion_Index(candidates)
+            node._completion = shared_completion[key]
+    return root
+
 class End_Tag(Match_Base) :
     """
     命令结束标志
@@ -84,15 +273,26 @@ class End_Tag(Match_Base) :
     
     def __init__(self) -> None :
         super().__init__("END")
-        self.re_match = re.compile(".{0,}")
+        self.re_match = re_compile(".{0,}")
 
     def _match_string(self, s:str, s_pointer:int): 
         _match = self.re_match.match(s, pos=s_pointer)
         if _match and _match.group().__len__() > 0 : 
             raise To_Many_Args(">>%s<< 多余的参数" % _match.group(), pos=(_match.start(),_match.end()), word=_match.group())
 
+    def _try_match(self, s:str, s_pointer:int): 
+        _match = self.re_match.match(s, pos=s_pointer)
+        if _match and _match.group().__len__() > 0 : return MATCH_FAIL
+
     def _auto_complete(self) -> Dict[str,str] : return {}
 
+    def _scan_end(self,s:str,s_pointer:int) -> int : 
+        return s_pointer + 1
+
+    def _first_char_set(self) : 
+        #"."不匹配换行符，换行符前同样视为命令结束
+        return frozenset((END_OF_STRING, "\n"))
+
 
 class Enum(Match_Base) :
     """
@@ -116,8 +316,8 @@ class Enum(Match_Base) :
         if not isinstance(terminator,str) : raise TypeError("terminator 提供字符串以外的参数")
         super().__init__(token_type)
         self.base_input = s
-        self.re_match = re.compile("[^%s]{0,}" % terminator)
-        self.re_test  = re.compile("^(%s)$" % "|".join([string_to_rematch(i) for i in s])) 
+        self.re_match = re_compile("[^%s]{0,}" % terminator)
+        self.re_test  = re_compile("^(%s)$" % "|".join([string_to_rematch(i) for i in s])) 
 
     def _match_string(self,s:str,s_pointer:int): 
         _match = self.re_match.match(s,pos=s_pointer)
@@ -125,6 +325,15 @@ class Enum(Match_Base) :
             raise Not_Match(">>%s<< 并不是有效字符" % _match.group(), pos=(_match.start(),_match.end()), word=_match.group())
         return {"type":self.token_type, "token":_match}
 
+    _word_scan = True
+
+    def _try_match(self,s:str,s_pointer:int): 
+        return self._try_word(self.re_match.match(s,pos=s_pointer))
+
+    def _try_word(self,_match:re.Match): 
+        if not self.re_test.search(_match.group()) : return MATCH_FAIL
+        return {"type":self.token_type, "token":_match}
+
     def _auto_complete(self) -> Dict[str,str]: 
         a = {}
         for i in range(len(self.base_input)) :
@@ -133,6 +342,13 @@ class Enum(Match_Base) :
             else : a[self.base_input[i]] = ""
         return a
 
+    def _first_char_set(self) : 
+        if (not self.base_input) or ("" in self.base_input) : return None
+        return frozenset(i[0] for i in self.base_input)
+
+    def _scan_end(self,s:str,s_pointer:int) -> int : 
+        return self.re_match.match(s,s_pointer).end() + 1
+
 class Char(Match_Base) :
     """
     字符串
@@ -153,8 +369,8 @@ class Char(Match_Base) :
         if not isinstance(terminator,str) : raise TypeError("terminator 提供字符串以外的参数")
         super().__init__(token_type)
         self.base_input = s
-        self.re_match = re.compile("[^%s]{0,}" % terminator)
-        self.re_test  = re.compile("^(%s)$" % string_to_rematch(s)) 
+        self.re_match = re_compile("[^%s]{0,}" % terminator)
+        self.re_test  = re_compile("^(%s)$" % string_to_rematch(s)) 
 
     def _match_string(self,s:str,s_pointer:int): 
         _match = self.re_match.match(s,pos=s_pointer)
@@ -162,6 +378,15 @@ class Char(Match_Base) :
             raise Not_Match(">>%s<< 并不是有效字符" % _match.group(), pos=(_match.start(),_match.end()), word=_match.group())
         return {"type":self.token_type, "token":_match}
 
+    _word_scan = True
+
+    def _try_match(self,s:str,s_pointer:int): 
+        return self._try_word(self.re_match.match(s,pos=s_pointer))
+
+    def _try_word(self,_match:re.Match): 
+        if not self.re_test.search(_match.group()) : return MATCH_FAIL
+        return {"type":self.token_type, "token":_match}
+
     def _auto_complete(self) -> Dict[str,str] : 
         a = {}
         if len(self.argument_dimension) > 0 : 
@@ -169,6 +394,13 @@ class Char(Match_Base) :
         else : a[self.base_input] = ""
         return a
 
+    def _first_char_set(self) : 
+        if not self.base_input : return None
+        return frozenset(self.base_input[0])
+
+    def _scan_end(self,s:str,s_pointer:int) -> int : 
+        return self.re_match.match(s,s_pointer).end() + 1
+
 class KeyWord(Match_Base) :
     """
     关键字符
@@ -190,16 +422,52 @@ class KeyWord(Match_Base) :
             if not isinstance(i,str) : raise TypeError("s 提供字符串以外的参数")
         super().__init__(token_type)
         self.base_input = s
-        self.re_match   = [re.compile(".{1,%s}" % len(i)) for i in s]
-        self.re_test    = re.compile( "|".join( [string_to_rematch(i) for i in s] ) )
+        self.re_match   = [re_compile(".{1,%s}" % len(i)) for i in s]
+        self.re_test    = re_compile( "|".join( [string_to_rematch(i) for i in s] ) )
+        self.lengths    = tuple(len(i) for i in s)
+        self.max_length = max(self.lengths, default=0)
+        #所有关键字长度相同且不含换行符时，匹配窗口就是等长的子串，直接查表
+        if len(set(self.lengths)) == 1 and not any("\n" in i for i in s) : self.words = frozenset(s)
+        else : self.words = None
+
+    def _match_end(self,s:str,s_pointer:int) -> int :
+        """
+        返回匹配成功时 token 的结束位置，失败时返回-1\n
+        与依次使用 re_match 截取窗口、在每个窗口中 re_test.search 的结果相同
+        """
+        if self.words is not None :
+            end = s_pointer + self.lengths[0]
+            return end if s[s_pointer:end] in self.words else -1
+        #.{1,n} 的窗口在换行符或字符串结束处截断
+        limit = s_pointer + self.max_length
+        newline = s.find("\n", s_pointer, limit)
+        window = s[s_pointer:limit if newline == -1 else newline]
+        if not window : return -1
+        #关键字在窗口中最左侧的出现位置放不进较短的窗口时，之后的出现位置同样放不进
+        finds = [window.find(i) for i in self.base_input]
+        if max(finds) == -1 : return -1
+        #每个窗口中最左侧位置上按顺序第一个匹配的关键字长度，窗口中没有关键字的不记录
+        found = []
+        for length in self.lengths :
+            hit_pos, hit = length, 0
+            for pos, i_length in zip(finds, self.lengths) :
+                if -1 < pos < hit_pos and pos + i_length <= length : hit_pos, hit = pos, i_length
+            if hit : found.append(hit)
+        if not found : return -1
+        #与原实现相同，以 found 中的序号选择窗口
+        return s_pointer + min(self.lengths[found.index(max(found))], len(window))
 
     def _match_string(self,s:str,s_pointer:int) : 
-        _match = [i.match(s,pos=s_pointer) for i in self.re_match]
-        a = [self.re_test.search(i.group()) for i in _match]
-        if not any(a) : raise Not_Match(">>%s<< 并不是有效的字符" % _match[0].group(), 
-            pos=(_match[0].start(),_match[0].end()), word=_match[0].group())
-        b = [i.group().__len__() for i in a if (i)]
-        return {"type":self.token_type, "token":_match[b.index(max(b))]}
+        end = self._match_end(s,s_pointer)
+        if end == -1 :
+            _match = self.re_match[0].match(s,pos=s_pointer)
+            raise Not_Match(">>%s<< 并不是有效的字符" % _match.group(), pos=(_match.start(),_match.end()), word=_match.group())
+        return {"type":self.token_type, "token":span_match(s, s_pointer, end)}
+
+    def _try_match(self,s:str,s_pointer:int) : 
+        end = self._match_end(s,s_pointer)
+        if end == -1 : return MATCH_FAIL
+        return {"type":self.token_type, "token":span_match(s, s_pointer, end)}
 
     def _auto_complete(self) -> Dict[str,str] : 
         a = {}
@@ -209,6 +477,14 @@ class KeyWord(Match_Base) :
             else : a[self.base_input[i]] = ""
         return a
 
+    def _first_char_set(self) : 
+        #各关键字长度不一致时，较短的关键字可能在较长的匹配窗口中间被搜索到
+        if len(set(len(i) for i in self.base_input)) != 1 : return None
+        return frozenset(i[0] for i in self.base_input)
+
+    def _scan_end(self,s:str,s_pointer:int) -> int : 
+        return s_pointer + max([len(i) for i in self.base_input], default=0) + 1
+
 class Int(Match_Base) :
     """
     整数
@@ -227,10 +503,10 @@ class Int(Match_Base) :
         for i in unit_word :
             if not isinstance(i,str) : raise TypeError("unit_word 提供字符串以外的参数")
         super().__init__(token_type)
-        self.re_match = re.compile("[^%s]{0,}" % terminator)
-        self.re_test  = re.compile("^(-+)?[0-9]{1,}$")
+        self.re_match = re_compile("[^%s]{0,}" % terminator)
+        self.re_test  = re_compile("^(-+)?[0-9]{1,}$")
         self.unit_word = unit_word
-        self.unit_word_test  = re.compile("(%s)$" % "|".join([string_to_rematch(i) for i in unit_word])) if unit_word else None
+        self.unit_word_test  = re_compile("(%s)$" % "|".join([string_to_rematch(i) for i in unit_word])) if unit_word else None
 
     def _match_string(self,s:str,s_pointer:int) : 
         _match = self.re_match.match(s,pos=s_pointer)
@@ -242,12 +518,32 @@ class Int(Match_Base) :
         if not a : raise Not_Match(">>%s<< 并不是有效的整数" % _match.group(), pos=(_match.start(),_match.end()), word=_match.group())
         return {"type":self.token_type, "token":_match}
 
+    _word_scan = True
+
+    def _try_match(self,s:str,s_pointer:int) : 
+        return self._try_word(self.re_match.match(s,pos=s_pointer))
+
+    def _try_word(self,_match:re.Match) : 
+        if self.unit_word_test : 
+            b = self.unit_word_test.search(_match.group())
+            if not b : return MATCH_FAIL
+            a = self.re_test.search(_match.group()[0:b.start()])
+        else : a = self.re_test.search(_match.group())
+        if not a : return MATCH_FAIL
+        return {"type":self.token_type, "token":_match}
+
     def _auto_complete(self) -> Dict[str,str]:
         aaaa = ""
         if len(self.argument_dimension) : aaaa = self.argument_dimension[0]
         if self.unit_word : return {(str("0" + i)):aaaa for i in self.unit_word}
         else : return {"0":aaaa}
 
+    def _first_char_set(self) : 
+        return frozenset("-0123456789")
+
+    def _scan_end(self,s:str,s_pointer:int) -> int : 
+        return self.re_match.match(s,s_pointer).end() + 1
+
 class Float(Match_Base) :
     """
     浮点数
@@ -266,10 +562,10 @@ class Float(Match_Base) :
         for i in unit_word :
             if not isinstance(i,str) : raise TypeError("unit_word 提供字符串以外的参数")
         super().__init__(token_type)
-        self.re_match = re.compile("[^%s]{0,}" % terminator)
-        self.re_test  = re.compile("^[-+]?([0-9]{0,}\\.[0-9]{1,}|[0-9]{1,}\\.[0-9]{0,}|[0-9]{1,})$") 
+        self.re_match = re_compile("[^%s]{0,}" % terminator)
+        self.re_test  = re_compile("^[-+]?([0-9]{0,}\\.[0-9]{1,}|[0-9]{1,}\\.[0-9]{0,}|[0-9]{1,})$") 
         self.unit_word = unit_word
-        self.unit_word_test  = re.compile("(%s)$" % "|".join([string_to_rematch(i) for i in unit_word])) if unit_word else None
+        self.unit_word_test  = re_compile("(%s)$" % "|".join([string_to_rematch(i) for i in unit_word])) if unit_word else None
 
     def _match_string(self,s:str,s_pointer:int): 
         _match = self.re_match.match(s,pos=s_pointer)
@@ -281,12 +577,32 @@ class Float(Match_Base) :
         if not a : raise Not_Match(">>%s<< 并不是有效的浮点数" % _match.group(), pos=(_match.start(),_match.end()), word=_match.group())
         return {"type":self.token_type, "token":_match}
 
+    _word_scan = True
+
+    def _try_match(self,s:str,s_pointer:int): 
+        return self._try_word(self.re_match.match(s,pos=s_pointer))
+
+    def _try_word(self,_match:re.Match): 
+        if self.unit_word_test : 
+            b = self.unit_word_test.search(_match.group())
+            if not b : return MATCH_FAIL
+            a = self.re_test.search(_match.group()[0:b.start()])
+        else : a = self.re_test.search(_match.group())
+        if not a : return MATCH_FAIL
+        return {"type":self.token_type, "token":_match}
+
     def _auto_complete(self) -> Dict[str,str] : 
         aaaa = ""
         if len(self.argument_dimension) : aaaa = self.argument_dimension[0]
         if self.unit_word : return {("0" + i):aaaa for i in self.unit_word}
         else : return {"0":aaaa}
 
+    def _first_char_set(self) : 
+        return frozenset("+-.0123456789")
+
+    def _scan_end(self,s:str,s_pointer:int) -> int : 
+        return self.re_match.match(s,s_pointer).end() + 1
+
 
 class AnyString(Match_Base) :
     """
@@ -305,16 +621,24 @@ class AnyString(Match_Base) :
     def __init__(self, token_type:str, atuo_complete:Dict[str,str]={}, terminator:str=TERMINATOR_RE) -> None :
         if not isinstance(terminator,str) : raise TypeError("terminator 提供字符串以外的参数")
         super().__init__(token_type)
-        self.re_match = re.compile("[^%s]{0,}" % terminator)
+        self.re_match = re_compile("[^%s]{0,}" % terminator)
         self.atuo_complete = atuo_complete
 
+    _word_scan = True
+
     def _match_string(self, s:str, s_pointer:int): 
         _match = self.re_match.match(s, pos=s_pointer)
         return {"type":self.token_type, "token":_match}
 
+    def _try_word(self, _match:re.Match): 
+        return {"type":self.token_type, "token":_match}
+
     def _auto_complete(self) -> Dict[str,str] : 
         return self.atuo_complete
 
+    def _scan_end(self,s:str,s_pointer:int) -> int : 
+        return self.re_match.match(s,s_pointer).end() + 1
+
 class AnyMsg(Match_Base) :
     """
     任意消息
@@ -331,7 +655,7 @@ class AnyMsg(Match_Base) :
     
     def __init__(self, token_type:str) -> None :
         super().__init__(token_type)
-        self.re_match = re.compile(".{0,}")
+        self.re_match = re_compile(".{0,}")
 
     def _match_string(self, s:str, s_pointer:int): 
         _match = self.re_match.match(s, pos=s_pointer)
@@ -340,6 +664,9 @@ class AnyMsg(Match_Base) :
     def _auto_complete(self) -> Dict[str,str] : 
         return {}
 
+    def _scan_end(self,s:str,s_pointer:int) -> int : 
+        return self.re_match.match(s,s_pointer).end() + 1
+
 
 
 
@@ -0,0 +1,111 @@
+"""
+自动补全索引
+------------------------------
+Completion_Index : 预先排序并建立字符索引的补全候选集合\n
+每个匹配对象在命令树完成构建时生成一个索引，包含其所有分支的 _auto_complete 候选\n
+match : 与旧版自动补全相同的子串查询\n
+prefix : 前缀查询，二分查找排序后的候选\n
+fuzzy : 模糊查询，按照匹配质量排序
+"""
+
+from typing import Dict,Union,List,Tuple
+import bisect,heapq
+
+__all__ = ["Completion_Index"]
+
+
+def _shortest(postings:List[List[int]]) -> List[int] :
+    #只使用最短的索引缩小范围，其余条件由调用者逐个验证
+    return min(postings, key=len)
+
+def _fuzzy_score(word:str, candidate:str) -> Union[Tuple[int,int,int],None] :
+    #word 必须是 candidate 的子序列，分数越小越好 (非前缀, 间隔字符数, 候选长度)
+    pos = candidate.find(word[0])
+    if pos < 0 : return None
+    start = last = pos
+    gaps = 0
+    for c in word[1:] :
+        pos = candidate.find(c, last + 1)
+        if pos < 0 : return None
+        gaps += pos - last - 1
+        last = pos
+    return (0 if start == 0 else 1, gaps, len(candidate))
+
+
+class Completion_Index :
+    """
+    自动补全索引
+    ------------------------
+    实例化参数\n
+    candidates : 候选字符串 -> 提示文本 的字典\n
+    ------------------------
+    所有查询的 limit 参数为返回结果的最大数量，None代表不限制\n
+    候选与提示文本在实例化后不会再改变，修改匹配对象的补全列表后需要重新生成索引
+    """
+
+    __slots__ = ("items","_lower","_sorted","_sorted_order","_chars","_grams")
+
+    def __init__(self, candidates:Dict[str,str]) -> None :
+        self.items : List[Tuple[str,str]] = list(candidates.items())
+        self._lower : List[str] = [i.lower() for i,_ in self.items]
+        order = sorted(range(len(self.items)), key=lambda i:self.items[i][0])
+        self._sorted : List[str] = [self.items[i][0] for i in order]
+        self._sorted_order : List[int] = order
+        #字符(小写) -> 候选序号，二元组 -> 候选序号，序号递增
+        self._chars : Dict[str,List[int]] = {}
+        self._grams : Dict[str,List[int]] = {}
+        for index,(candidate,_) in enumerate(self.items) :
+            for c in set(self._lower[index]) : self._chars.setdefault(c, []).append(index)
+            for g in set(candidate[i:i+2] for i in range(len(candidate)-1)) : self._grams.setdefault(g, []).append(index)
+
+    def __repr__(self) -> str :
+        return "<Completion_Index candidates=%s>" % len(self.items)
+
+    def __len__(self) -> int :
+        return len(self.items)
+
+    def _result(self, index_list, limit:int=None) -> Dict[str,str] :
+        if limit is not None : index_list = index_list[0:limit]
+        return {self.items[i][0]:self.items[i][1] for i in index_list}
+
+    def match(self, word:str, limit:int=None) -> Dict[str,str] :
+        """返回包含 word 的候选，保持候选的原始顺序"""
+        if not word : return self._result(range(len(self.items)), limit)
+        if len(word) == 1 :
+            index_list = self._chars.get(word.lower(), [])
+        else :
+            postings = [self._grams.get(word[i:i+2]) for i in range(len(word)-1)]
+            if not all(postings) : return {}
+            index_list = _shortest(postings)
+        items, result = self.items, {}
+        for i in index_list :
+            if len(result) == limit : break
+            if word in items[i][0] : result[items[i][0]] = items[i][1]
+        return result
+
+    def prefix(self, word:str, limit:int=None) -> Dict[str,str] :
+        """返回以 word 开头的候选，按照字符串顺序排列"""
+        start = bisect.bisect_left(self._sorted, word)
+        end = len(self._sorted) if limit is None else min(len(self._sorted), start + limit)
+        result = {}
+        for i in range(start, end) :
+            if not self._sorted[i].startswith(word) : break
+            result[self._sorted[i]] = self.items[self._sorted_order[i]][1]
+        return result
+
+    def fuzzy(self, word:str, limit:int=10) -> Dict[str,str] :
+        """
+        返回按顺序包含 word 中所有字符的候选(不区分大小写)\n
+        前缀匹配优先，其次是字符间隔较少、长度较短的候选
+        """
+        if not word : return self._result(range(len(self.items)), limit)
+        word = word.lower()
+        postings = [self._chars.get(c) for c in set(word)]
+        if not all(postings) : return {}
+        scored = []
+        for i in _shortest(postings) :
+            score = _fuzzy_score(word, self._lower[i])
+            if score is not None : scored.append((score, i))
+        if limit is None : scored.sort()
+        else : scored = heapq.nsmallest(limit, scored)
+        return {self.items[i][0]:self.items[i][1] for _,i in scored}
@@ -1,63 +1,362 @@
+"""
+JSON 参数的匹配类
+------------------------------
+Json_Match 可以直接加入命令树，从 s_pointer 开始一次扫描完整个 JSON 值，并在 JSON 结束的位置继续分析后续参数\n
+扫描使用显式栈而不是递归，不会复制子字符串，除匹配到的 token 外还返回 JSON 内部的结构 token\n
+Json_Match_Base 的子类用于描述 JSON 的结构(模式)，匹配时按照模式检查值的类型，并提供键名与值的自动补全\n
+Rawtext_Schema 返回 tellraw、titleraw 等命令使用的 rawtext 模式
+"""
+
 import re,abc
-from typing import Dict,Union,List,Tuple
+from typing import Dict,Union,List,Tuple,FrozenSet
 
 from . import base_match_class as BaseMatch
 from . import special_match as SpecialMatch
 
+__all__ = ["Json_Value_Tag","Json_Object","Json_Key","Json_Array","Json_String","Json_Number","Json_Bool",
+    "Json_Match","Rawtext_Schema"]
+
 class Not_Parser_Object(Exception) : pass
 
 class Json_Error(BaseMatch.Command_Match_Exception) : pass
 
 
+JSON_WHITESPACE = BaseMatch.re_compile("[ \\t\\n\\r]{0,}")
+JSON_STRING = BaseMatch.re_compile('"(?:[^"\\\\\\x00-\\x1f]|\\\\["\\\\/bfnrt]|\\\\u[0-9a-fA-F]{4}){0,}"')
+#字符串不合法时用于确定出错单词的范围
+JSON_STRING_LOOSE = BaseMatch.re_compile('"(?:[^"\\\\]|\\\\.){0,}"?', re.S)
+JSON_NUMBER = BaseMatch.re_compile("-?(?:0|[1-9][0-9]{0,})(?:\\.[0-9]{1,})?(?:[eE][+-]?[0-9]{1,})?")
+JSON_WORD = BaseMatch.re_compile("[^ \\t\\n\\r,:\\[\\]{}\"]{1,}")
+JSON_SPAN = BaseMatch.re_compile(".{0,}", re.S)
+#顶层的字符串、数字、true、false、null 之后只能是空白或者字符串结束
+SCALAR_END = frozenset(("", " ", "\t", "\n", "\r"))
+#一次匹配一个结构 token(包括之前的空白)，lastindex 为下面的 TOKEN_ 常量
+JSON_TOKEN = BaseMatch.re_compile('[ \\t\\n\\r]{0,}(?:(\\{)|(\\})|(\\[)|(\\])|(:)|(,)|(%s)|(%s)|(true|false|null))' % (JSON_STRING.pattern, JSON_NUMBER.pattern))
+TOKEN_OBJECT_START, TOKEN_OBJECT_END, TOKEN_ARRAY_START, TOKEN_ARRAY_END, TOKEN_COLON, TOKEN_COMMA, TOKEN_STRING, TOKEN_NUMBER, TOKEN_LITERAL = range(1, 10)
+TOKEN_NAME = (None, "Object_Start", "Object_End", "Array_Start", "Array_End", "Colon", "Comma", "String", "Number", "Literal")
+TOKEN_VALUE_KIND = {TOKEN_OBJECT_START:"object", TOKEN_ARRAY_START:"array", TOKEN_STRING:"string", TOKEN_NUMBER:"number", TOKEN_LITERAL:"literal"}
+EXPECT_VALUE, EXPECT_FIRST_ITEM, EXPECT_FIRST_KEY, EXPECT_KEY, EXPECT_AFTER = range(5)
+
+#值的种类，以及能够作为该种类开头的字符
+VALUE_FIRST_CHAR : Dict[str,FrozenSet[str]] = {
+    "object" : frozenset("{"),
+    "array" : frozenset("["),
+    "string" : frozenset('"'),
+    "number" : frozenset("-0123456789"),
+    "bool" : frozenset("tf"),
+    "null" : frozenset("n"),
+}
+
+
 
 class Json_Match_Base(metaclass=abc.ABCMeta) :
     '''
-    匹配对象基类
+    JSON 模式基类
     ------------------
     你不应该直接使用这个类\n
     ------------------------------------
     所有从此基类继承的类都有以下公用方法\n
-    add_leaves : 添加同级的命令分支\n
+    add_leaves : 添加下一级的模式(对象的键、键的值、数组的元素)\n
     ------------------------------------
-    提供给开发者重写的方法\n
-    _match_string : 提供自动补全的字符串列表，必须写明传参s、s_pointer，s是源字符串，s_pointer是源字符串当前匹配停止的位置
-    _auto_complete : 提供自动补全的字符串列表
+    提供给开发者重写的属性与方法\n
+    kind : 能够接受的值的种类(object、array、string、number、bool、null)，None代表任意种类\n
+    _auto_complete : 该模式作为值时提供的自动补全
     '''
 
+    kind : Union[str,None] = None
+
     def __init__(self) -> None :
         self.tree_leaves : List[Json_Match_Base] = []
 
     def __repr__(self) -> str:
         return self.__class__.__name__
-        
+
     def add_leaves(self,*obj) :
         for i in obj :
-            if not isinstance(i,Json_Match_Base) : 
+            if not isinstance(i,Json_Match_Base) :
                 raise Not_Parser_Object("%s 为非JSON匹配对象" % i)
             self.tree_leaves.append(i)
         return self
 
+    def _accept(self, kind:str) -> bool :
+        return self.kind is None or self.kind == kind
+
     @abc.abstractmethod
-    def _match_string(self,s:str,s_pointer:int) -> re.Match : pass
-    
-    @abc.abstractmethod
-    def _auto_complete(self) -> List[str] : pass
+    def _auto_complete(self) -> Dict[str,str] : pass
 
 class Json_Value_Tag(Json_Match_Base) :
-    def _match_string(self) : pass
-    def _auto_complete(self) : pass
+    """
+    任意 JSON 值
+    ------------------------------
+    其中的对象可以有任意键，数组可以有任意元素
+    """
+    def _auto_complete(self) -> Dict[str,str] : return {}
+
+class Json_Object(Json_Match_Base) :
+    """
+    JSON 对象
+    ------------------------------
+    通过 add_leaves 添加 Json_Key 描述可以使用的键\n
+    strict : 为True时不允许出现没有描述的键，为False时没有描述的键的值可以为任意值
+    """
+    kind = "object"
+
+    def __init__(self, strict:bool=False) -> None :
+        super().__init__()
+        self.strict = strict
+
+    def add_leaves(self,*obj) :
+        for i in obj :
+            if not isinstance(i,Json_Key) : raise Not_Parser_Object("%s 为非 Json_Key 对象" % i)
+        return super().add_leaves(*obj)
+
+    def _find_key(self, s:str, start:int, end:int) -> Union["Json_Key",None] :
+        #直接在源字符串上比较键名，不复制子字符串
+        for i in self.tree_leaves :
+            if len(i.key) == end - start and s.startswith(i.key, start) : return i
+        return None
+
+    def _key_complete(self, used:List["Json_Key"]) -> Dict[str,str] :
+        return {'"%s"' % i.key:i.description for i in self.tree_leaves if i not in used}
+
+    def _auto_complete(self) -> Dict[str,str] : return {"{":"JSON对象"}
+
+class Json_Key(Json_Match_Base) :
+    """
+    JSON 对象的键
+    ------------------------------
+    key : 键名(不能包含需要转义的字符)\n
+    description : 自动补全时的提示文本\n
+    通过 add_leaves 添加该键可以使用的值的模式，没有添加时可以为任意值
+    """
+
+    def __init__(self, key:str, description:str="") -> None :
+        super().__init__()
+        self.key = key
+        self.description = description
+
+    def _auto_complete(self) -> Dict[str,str] : return {'"%s"' % self.key:self.description}
+
+class Json_Array(Json_Match_Base) :
+    """
+    JSON 数组
+    ------------------------------
+    通过 add_leaves 添加元素可以使用的模式，没有添加时元素可以为任意值
+    """
+    kind = "array"
+    def _auto_complete(self) -> Dict[str,str] : return {"[":"JSON数组"}
+
+class Json_String(Json_Match_Base) :
+    """JSON 字符串"""
+    kind = "string"
+    def _auto_complete(self) -> Dict[str,str] : return {'"':"字符串"}
+
+class Json_Number(Json_Match_Base) :
+    """JSON 数字"""
+    kind = "number"
+    def _auto_complete(self) -> Dict[str,str] : return {}
+
+class Json_Bool(Json_Match_Base) :
+    """JSON 布尔值"""
+    kind = "bool"
+    def _auto_complete(self) -> Dict[str,str] : return {"true":"","false":""}
+
+
+def Rawtext_Schema() -> Json_Object :
+    """
+    生成 rawtext 的 JSON 模式
+    ------------------------------
+    {"rawtext":[组件, ...]}，组件可以使用 text、selector、score、translate、with\n
+    with 的值可以为字符串数组或者另一个 rawtext 对象
+    """
+    rawtext = Json_Object()
+    component = Json_Object()
+    rawtext.add_leaves( Json_Key("rawtext","文本组件列表").add_leaves( Json_Array().add_leaves(component) ) )
+    component.add_leaves(
+        Json_Key("text","纯文本").add_leaves( Json_String() ),
+        Json_Key("selector","目标选择器").add_leaves( Json_String() ),
+        Json_Key("score","分数").add_leaves( Json_Object().add_leaves(
+            Json_Key("name","分数持有者").add_leaves( Json_String() ),
+            Json_Key("objective","计分板名称").add_leaves( Json_String() )
+        )),
+        Json_Key("translate","翻译键名").add_leaves( Json_String() ),
+        Json_Key("with","翻译参数").add_leaves( Json_Array().add_leaves( Json_String() ), rawtext )
+    )
+    return rawtext
+
+
+ANY_VALUE = Json_Value_Tag()
+
+def _pick_schema(schemas:List[Json_Match_Base], kind:str) -> Union[Json_Match_Base,None] :
+    if not schemas : return ANY_VALUE
+    for i in schemas :
+        if i._accept(kind) : return i
+    return None
+
+def _value_complete(schemas:List[Json_Match_Base]) -> Dict[str,str] :
+    a = {}
+    for i in (schemas or [ANY_VALUE]) : a.update(i._auto_complete())
+    return a
+
+
+class Json_Match(BaseMatch.Match_Base) :
+    """
+    JSON 值
+    ------------------------------
+    在下一次匹配中，匹配一个完整的 JSON 值(对象、数组、字符串、数字、true、false、null)\n
+    匹配成功时返回的 token 额外包含 "json" : ((结构类型, 开始位置, 结束位置), ...)，为元组，词法器缓存命中时可以安全地共享\n
+    结构类型为 Object_Start、Object_End、Array_Start、Array_End、Colon、Comma、Key、String、Number、Literal\n
+    顶层的字符串、数字、true、false、null 之后必须是空白或者字符串结束\n
+    匹配失败时抛出的 Json_Error 带有 pos、word 与 expect(出错位置可以使用的补全)，\n
+    所有分支都匹配失败时 Command_Parser 报告这个异常，自动补全也使用它的 expect\n
+    ------------------------------
+    实例化参数\n
+    token_type : 定义该匹配的参数含义\n
+    schema : JSON 模式，默认为任意 JSON 值\n
+    >>> Json_Match("Json", Rawtext_Schema())
+    """
 
+    def __init__(self, token_type:str, schema:Json_Match_Base=None) -> None :
+        if schema is not None and not isinstance(schema, Json_Match_Base) : raise Not_Parser_Object("schema 为非JSON匹配对象")
+        super().__init__(token_type)
+        self.schema = ANY_VALUE if schema is None else schema
 
+    def _scan(self, s:str, s_pointer:int, json_tokens:list) -> Union[int,Json_Error] :
+        """
+        扫描从 s_pointer 开始的 JSON 值，结构 token 添加至 json_tokens\n
+        成功时返回 JSON 结束的位置，失败时返回(而不是抛出) Json_Error
+        """
+        #每一层为 [是否为对象, 模式, 已经出现的键]
+        stack = []
+        expect = EXPECT_VALUE
+        schemas = [self.schema]
+        pos = s_pointer
+        token_match = JSON_TOKEN.match
+        append = json_tokens.append
 
+        while 1 :
+            if expect == EXPECT_AFTER and not stack : return pos
+            _match = token_match(s, pos)
+            if _match is None : 
+                pos = JSON_WHITESPACE.match(s, pos).end()
+                if expect == EXPECT_KEY or expect == EXPECT_FIRST_KEY : 
+                    key_complete = stack[-1][1]._key_complete(stack[-1][2]) if stack[-1][1].kind == "object" else {}
+                    if s[pos:pos+1] == '"' : return self._string_error(s, pos, key_complete)
+                    return self._error(s, pos, "期望键名", key_complete)
+                if expect == EXPECT_AFTER : return self._after_error(s, pos, stack[-1][0])
+                if s[pos:pos+1] == '"' : return self._string_error(s, pos, {})
+                return self._error(s, pos, "期望JSON值", _value_complete(schemas))
+            kind = _match.lastindex
+            start, pos = _match.start(kind), _match.end()
 
+            if expect == EXPECT_VALUE or expect == EXPECT_FIRST_ITEM :
+                if kind == TOKEN_ARRAY_END and expect == EXPECT_FIRST_ITEM :
+                    append(("Array_End", start, pos))
+                    stack.pop()
+                    expect = EXPECT_AFTER
+                    continue
+                value_kind = TOKEN_VALUE_KIND.get(kind)
+                if value_kind is None : return self._error(s, start, "期望JSON值", _value_complete(schemas))
+                if value_kind == "literal" : value_kind = "null" if s[start] == "n" else "bool"
+                schema = schemas[0] if len(schemas) == 1 and schemas[0].kind == value_kind else _pick_schema(schemas, value_kind)
+                if schema is None : return self._error(s, start, "此处不能使用%s" % value_kind, _value_complete(schemas))
+                append((TOKEN_NAME[kind], start, pos))
+                if kind == TOKEN_OBJECT_START :
+                    stack.append([True, schema, []])
+                    expect = EXPECT_FIRST_KEY
+                elif kind == TOKEN_ARRAY_START :
+                    stack.append([False, schema, None])
+                    schemas = schema.tree_leaves if schema.kind == "array" else []
+                    expect = EXPECT_FIRST_ITEM
+                elif not stack and s[pos:pos+1] not in SCALAR_END : 
+                    #123abc 不能只匹配 123，出错的单词包括标量之后的字符
+                    _match = JSON_WORD.match(s, pos)
+                    end = _match.end() if _match else pos + 1
+                    word = s[start:end]
+                    return Json_Error(">>%s<< 不是有效的JSON值" % word, pos=(start, end), word=word, expect=_value_complete(schemas))
+                else : expect = EXPECT_AFTER
 
+            elif expect == EXPECT_FIRST_KEY or expect == EXPECT_KEY :
+                frame = stack[-1]
+                if kind == TOKEN_OBJECT_END and expect == EXPECT_FIRST_KEY :
+                    append(("Object_End", start, pos))
+                    stack.pop()
+                    expect = EXPECT_AFTER
+                    continue
+                object_schema = frame[1] if frame[1].kind == "object" else None
+                if kind != TOKEN_STRING : 
+                    return self._error(s, start, "期望键名", object_schema._key_complete(frame[2]) if object_schema else {})
+                append(("Key", start, pos))
+                key = object_schema._find_key(s, start+1, pos-1) if object_schema else None
+                if key is None and object_schema is not None and object_schema.strict :
+                    return self._error(s, start, "不能使用的键名", object_schema._key_complete(frame[2]))
+                if key is not None : frame[2].append(key)
+                schemas = key.tree_leaves if key is not None else []
+                _match = token_match(s, pos)
+                if _match is None or _match.lastindex != TOKEN_COLON : 
+                    return self._error(s, JSON_WHITESPACE.match(s, pos).end(), "期望冒号", {":":""})
+                append(("Colon", _match.start(TOKEN_COLON), _match.end()))
+                pos = _match.end()
+                expect = EXPECT_VALUE
 
+            else :
+                frame = stack[-1]
+                if kind == TOKEN_COMMA :
+                    append(("Comma", start, pos))
+                    if frame[0] : expect = EXPECT_KEY
+                    else :
+                        expect = EXPECT_VALUE
+                        schemas = frame[1].tree_leaves if frame[1].kind == "array" else []
+                elif kind == (TOKEN_OBJECT_END if frame[0] else TOKEN_ARRAY_END) :
+                    append((TOKEN_NAME[kind], start, pos))
+                    stack.pop()
+                else : return self._after_error(s, start, frame[0])
 
+    def _after_error(self, s:str, pos:int, is_object:bool) -> Json_Error :
+        end_char = "}" if is_object else "]"
+        return self._error(s, pos, "期望逗号或%s" % end_char, {",":"", end_char:""})
 
+    def _error(self, s:str, pos:int, msg:str, expect:Dict[str,str]) -> Json_Error :
+        _match = JSON_WORD.match(s, pos)
+        end = _match.end() if _match else min(pos + 1, len(s))
+        word = s[pos:end]
+        return Json_Error(">>%s<< %s" % (word, msg), pos=(pos, end), word=word, expect=expect)
 
+    def _string_error(self, s:str, pos:int, expect:Dict[str,str]) -> Json_Error :
+        _match = JSON_STRING_LOOSE.match(s, pos)
+        word = _match.group()
+        msg = "字符串没有结束" if len(word) < 2 or not word.endswith('"') or word.endswith('\\"') else "字符串中存在无效的字符"
+        return Json_Error(">>%s<< %s" % (word, msg), pos=(pos, _match.end()), word=word, expect=expect)
 
+    def _match_string(self, s:str, s_pointer:int) :
+        json_tokens = []
+        end = self._scan(s, s_pointer, json_tokens)
+        if isinstance(end, Json_Error) : raise end
+        return {"type":self.token_type, "token":JSON_SPAN.match(s, s_pointer, end), "json":tuple(json_tokens)}
 
+    def _try_match(self, s:str, s_pointer:int) :
+        json_tokens = []
+        end = self._scan(s, s_pointer, json_tokens)
+        if isinstance(end, Json_Error) : return BaseMatch.MATCH_FAIL
+        return {"type":self.token_type, "token":JSON_SPAN.match(s, s_pointer, end), "json":tuple(json_tokens)}
 
+    def _auto_complete(self) -> Dict[str,str] :
+        return self.schema._auto_complete()
 
+    def _first_char_set(self) :
+        if self.schema.kind is None : return frozenset().union(*VALUE_FIRST_CHAR.values())
+        return VALUE_FIRST_CHAR[self.schema.kind]
 
+    def _scan_end(self,s:str,s_pointer:int) -> int :
+        end = self._scan(s, s_pointer, [])
+        if isinstance(end, Json_Error) : return len(s) + 1
+        return end + 1
 
+    def complete(self, s:str, s_pointer:int) -> Dict[str,str] :
+        """
+        按照模式返回 JSON 中第一个错误位置(通常是输入的末尾)可以使用的补全\n
+        出错位置已经输入的部分用于过滤补全，JSON 完整时返回空字典
+        """
+        end = self._scan(s, s_pointer, [])
+        if not isinstance(end, Json_Error) : return {}
+        return {i:j for i,j in end.expect.items() if i.startswith(end.word)}
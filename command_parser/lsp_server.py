@@ -0,0 +1,320 @@
+"""
+.mcfunction 语言服务器
+------------------------------
+Language_Server : 基于 Command_Parser 的语言服务器(LSP)，通过标准输入输出通信\n
+Text_Document : 文档存储，按行保存文本与每行的诊断信息\n
+编辑时只重新分析文本发生变化的行，每行的诊断结果以命令文本为键缓存，相同的行只分析一次\n
+诊断来自分析错误的 pos 与 word，自动补全来自 Command_Parser._get_auto_complete\n
+python -m command_parser 模块:对象\n
+对象为 Command_Root、Command_Parser 或者返回两者之一的函数，例如 benchmark.grammar:build_parser
+"""
+
+from . import base_match_class as BaseMatch
+from . import special_match as SpecialMatch
+from . import parser_system as ParserSystem
+
+from typing import Dict,Union,List,Tuple,BinaryIO
+import collections,importlib,json,re,sys
+
+__all__ = ["Text_Document","Language_Server","main"]
+
+LINE_BREAK = re.compile("\r\n|\r|\n")
+
+#LSP 错误码与枚举值
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+SEVERITY_ERROR = 1
+COMPLETION_KIND_KEYWORD = 14
+SYNC_INCREMENTAL = 2
+
+
+def _to_utf16(text:str, index:int) -> int :
+    #LSP 的列以 UTF-16 编码单元计算，BMP 以外的字符占两个单元
+    if text.isascii() : return index
+    return index + sum(1 for i in text[0:index] if i > "\uffff")
+
+def _from_utf16(text:str, column:int) -> int :
+    if text.isascii() : return min(column, len(text))
+    units = 0
+    for index, char in enumerate(text) :
+        if units >= column : return index
+        units += 2 if char > "\uffff" else 1
+    return len(text)
+
+
+def _position(lines:List[str], position:dict) -> Tuple[int,int] :
+    #LSP 位置转换为 (行号, 字符序号)，超出文档末尾时视为文档末尾
+    if position["line"] >= len(lines) : return len(lines) - 1, len(lines[-1])
+    return position["line"], _from_utf16(lines[position["line"]], position["character"])
+
+
+class Text_Document :
+    """
+    文档存储
+    ------------------------
+    uri : 文档标识\n
+    version : 客户端提供的版本号\n
+    lines : 每行的文本(不包含换行符)\n
+    diagnostics : 每行的诊断元组，每项为 (开始位置, 结束位置, 消息, 异常类名)，位置为行中的字符序号
+    """
+
+    __slots__ = ("uri","version","lines","diagnostics","_published")
+
+    def __init__(self, uri:str, version:int, lines:List[str], diagnostics:List[tuple]) -> None :
+        self.uri = uri
+        self.version = version
+        self.lines = lines
+        self.diagnostics = diagnostics
+        #每行转换后的 LSP Diagnostic 列表，None为需要重新生成
+        self._published : List[Union[List[dict],None]] = [None] * len(lines)
+
+    def __repr__(self) -> str :
+        return "<Text_Document %s version=%s lines=%s>" % (self.uri, self.version, len(self.lines))
+
+    def text(self) -> str :
+        return "\n".join(self.lines)
+
+
+class Language_Server :
+    """
+    .mcfunction 语言服务器
+    ------------------------
+    实例化参数\n
+    parser : 使用的 ParserSystem.Command_Parser\n
+    recover : 为True时使用 recover 分析，每行报告所有错误\n
+    cache_size : 以命令文本为键缓存的诊断结果数量\n
+    ------------------------
+    handle 处理一条已经解码的 JSON-RPC 消息，serve 从输入流中读取消息直到收到 exit\n
+    支持 initialize、shutdown、exit、textDocument/didOpen、didChange(增量与全量)、didClose、completion\n
+    parsed_lines 与 cache_hits 记录实际分析的行数与命中缓存的行数
+    """
+
+    def __init__(self, parser:ParserSystem.Command_Parser, recover:bool=True, cache_size:int=65536) -> None :
+        if not isinstance(parser, ParserSystem.Command_Parser) : raise TypeError("parser 参数只能为 Command_Parser 类")
+        if not isinstance(cache_size,int) or cache_size < 1 : raise Exception("cache_size 参数应该为正整数")
+        self.parser = parser
+        self.recover = recover
+        self.cache_size = cache_size
+        self.documents : Dict[str,Text_Document] = {}
+        self._cache : Dict[str,tuple] = collections.OrderedDict()
+        self._output : BinaryIO = None
+        self._shutdown = False
+        self.parsed_lines = 0
+        self.cache_hits = 0
+
+    #------------------------ 分析 ------------------------
+
+    def _analyze_command(self, command:str) -> tuple :
+        cache = self._cache
+        diagnostics = cache.get(command)
+        if diagnostics is not None :
+            cache.move_to_end(command)
+            self.cache_hits += 1
+            return diagnostics
+        self.parsed_lines += 1
+        result = self.parser.parse(command, recover=self.recover)
+        diagnostics = []
+        for e in result.errors :
+            start, end = getattr(e, "pos", (0, len(command)))
+            diagnostics.append((start, max(end, start), str(e), e.__class__.__name__))
+        diagnostics = tuple(diagnostics)
+        cache[command] = diagnostics
+        if len(cache) > self.cache_size : cache.popitem(last=False)
+        return diagnostics
+
+    def analyze_line(self, line:str) -> tuple :
+        """返回一行的诊断元组，空行与 # 开头的注释行没有诊断，位置为行中的字符序号"""
+        command = line.lstrip(" \t")
+        if not command or command.startswith("#") : return ()
+        diagnostics = self._analyze_command(command)
+        column = len(line) - len(command)
+        if not column or not diagnostics : return diagnostics
+        return tuple((start + column, end + column, message, code) for start, end, message, code in diagnostics)
+
+    def open_document(self, uri:str, text:str, version:int=0) -> Text_Document :
+        lines = LINE_BREAK.split(text)
+        document = Text_Document(uri, version, lines, [self.analyze_line(i) for i in lines])
+        self.documents[uri] = document
+        return document
+
+    def change_document(self, uri:str, changes:List[dict], version:int=None) -> Text_Document :
+        """
+        应用 textDocument/didChange 的 contentChanges\n
+        带有 range 的修改只重新分析被替换的行，全量修改时未改变的行直接使用缓存
+        """
+        document = self.documents[uri]
+        lines, diagnostics = document.lines, document.diagnostics
+        for change in changes :
+            if "range" not in change :
+                document.lines = lines = LINE_BREAK.split(change["text"])
+                document.diagnostics = diagnostics = [self.analyze_line(i) for i in lines]
+                document._published = [None] * len(lines)
+                continue
+            start_line, start_index = _position(lines, change["range"]["start"])
+            end_line, end_index = _position(lines, change["range"]["end"])
+            head, tail = lines[start_line][0:start_index], lines[end_line][end_index:]
+            new_lines = LINE_BREAK.split(change["text"])
+            new_lines[0] = head + new_lines[0]
+            new_lines[-1] = new_lines[-1] + tail
+            lines[start_line:end_line+1] = new_lines
+            diagnostics[start_line:end_line+1] = [self.analyze_line(i) for i in new_lines]
+            #行数改变时之后所有行的行号都改变了
+            if len(new_lines) == end_line - start_line + 1 : document._published[start_line:end_line+1] = [None] * len(new_lines)
+            else : document._published[start_line:] = [None] * (len(lines) - start_line)
+        if version is not None : document.version = version
+        return document
+
+    def document_diagnostics(self, document:Text_Document) -> List[dict] :
+        """将文档中所有行的诊断转换为 LSP 的 Diagnostic 列表，没有修改的行使用上一次转换的结果"""
+        result = []
+        lines, published = document.lines, document._published
+        for line, diagnostics in enumerate(document.diagnostics) :
+            if not diagnostics : continue
+            items = published[line]
+            if items is None :
+                text = lines[line]
+                items = published[line] = [{
+                    "range" : {"start":{"line":line, "character":_to_utf16(text, start)}, "end":{"line":line, "character":_to_utf16(text, end)}},
+                    "severity" : SEVERITY_ERROR, "source" : "command_parser", "code" : code, "message" : message,
+                } for start, end, message, code in diagnostics]
+            result.extend(items)
+        return result
+
+    def completion(self, uri:str, line:int, character:int) -> List[dict] :
+        """
+        返回光标位置的补全项，只分析光标之前的部分\n
+        分析失败时使用出错位置的补全候选并替换出错的单词，
+        分析成功且光标前是分隔符时使用最后一个 token 之后的补全候选
+        """
+        document = self.documents[uri]
+        line, cursor = _position(document.lines, {"line":line, "character":character})
+        text = document.lines[line]
+        command = text[0:cursor].lstrip(" \t")
+        if command.startswith("#") : return []
+        column = cursor - len(command)
+        parser = self.parser
+        checkpoints = [(parser.Tree, 0, 0)]
+        node, _, error = parser._parse(command, parser.Tree, 0, [], checkpoints)
+        if error is None :
+            if not command.endswith(parser.separator) : return []
+            #结束标志不会记录检查点，最后一个检查点为最后一个 token 的匹配对象
+            node, error = checkpoints[-1][0], BaseMatch.Not_Match("", pos=(len(command), len(command)), word="")
+        candidates = parser._get_auto_complete(error, node)
+        start, end = getattr(error, "pos", (len(command), len(command)))
+        edit_range = {"start":{"line":line, "character":_to_utf16(text, start + column)},
+            "end":{"line":line, "character":_to_utf16(text, max(end, start) + column)}}
+        return [{"label":label, "kind":COMPLETION_KIND_KEYWORD, "detail":detail, "textEdit":{"range":edit_range, "newText":label}}
+            for label, detail in candidates.items()]
+
+    #------------------------ JSON-RPC ------------------------
+
+    def _send(self, message:dict) :
+        if self._output is None : return
+        body = json.dumps(message, ensure_ascii=False).encode("utf-8")
+        self._output.write(b"Content-Length: %d\r\n\r\n" % len(body) + body)
+        self._output.flush()
+
+    def _publish(self, document:Text_Document) :
+        self._send({"jsonrpc":"2.0", "method":"textDocument/publishDiagnostics",
+            "params":{"uri":document.uri, "version":document.version, "diagnostics":self.document_diagnostics(document)}})
+
+    def handle(self, message:dict) -> Union[dict,None] :
+        """
+        处理一条 JSON-RPC 消息\n
+        请求返回响应字典，通知返回None，诊断通过 publishDiagnostics 通知发送到输出流\n
+        处理过程中的其他异常对请求返回 InternalError，对通知忽略，服务器继续运行
+        """
+        if not isinstance(message, dict) : 
+            return {"jsonrpc":"2.0", "id":None, "error":{"code":INVALID_REQUEST, "message":"消息不是 JSON 对象"}}
+        method, params, request_id = message.get("method"), message.get("params") or {}, message.get("id")
+        try : result = self._dispatch(method, params)
+        except KeyError as e :
+            if request_id is None : return None
+            return {"jsonrpc":"2.0", "id":request_id, "error":{"code":INVALID_PARAMS, "message":"缺少参数或未打开的文档 %s" % e}}
+        except NotImplementedError :
+            if request_id is None : return None
+            return {"jsonrpc":"2.0", "id":request_id, "error":{"code":METHOD_NOT_FOUND, "message":"不支持的方法 %s" % method}}
+        except Exception as e :
+            if request_id is None : return None
+            return {"jsonrpc":"2.0", "id":request_id, "error":{"code":INTERNAL_ERROR, "message":"%s 处理失败 %s: %s" % (method, e.__class__.__name__, e)}}
+        if request_id is None : return None
+        return {"jsonrpc":"2.0", "id":request_id, "result":result}
+
+    def _dispatch(self, method:str, params:dict) :
+        if method == "initialize" :
+            return {"capabilities":{
+                "textDocumentSync" : {"openClose":True, "change":SYNC_INCREMENTAL},
+                "completionProvider" : {"triggerCharacters":[" ", "@", "[", ",", "=", "{"]},
+            }, "serverInfo":{"name":"command_parser"}}
+        if method == "shutdown" :
+            self._shutdown = True
+            return None
+        if method in ("initialized", "exit", "textDocument/didSave", "$/cancelRequest", "$/setTrace") : return None
+        if method == "textDocument/didOpen" :
+            item = params["textDocument"]
+            self._publish(self.open_document(item["uri"], item["text"], item.get("version", 0)))
+            return None
+        if method == "textDocument/didChange" :
+            item = params["textDocument"]
+            self._publish(self.change_document(item["uri"], params["contentChanges"], item.get("version")))
+            return None
+        if method == "textDocument/didClose" :
+            uri = params["textDocument"]["uri"]
+            self.documents.pop(uri, None)
+            self._send({"jsonrpc":"2.0", "method":"textDocument/publishDiagnostics", "params":{"uri":uri, "diagnostics":[]}})
+            return None
+        if method == "textDocument/completion" :
+            position = params["position"]
+            return self.completion(params["textDocument"]["uri"], position["line"], position["character"])
+        raise NotImplementedError(method)
+
+    def _read_message(self, stream:BinaryIO) -> Union[dict,None] :
+        length = None
+        while 1 :
+            header = stream.readline()
+            if not header : return None
+            header = header.strip()
+            if not header : break
+            name, _, value = header.partition(b":")
+            if name.strip().lower() == b"content-length" : length = int(value.strip())
+        if length is None : return {}
+        body = stream.read(length)
+        try : return json.loads(body.decode("utf-8"))
+        except ValueError : return {}
+
+    def serve(self, stdin:BinaryIO=None, stdout:BinaryIO=None) -> int :
+        """
+        从 stdin 读取消息并将响应写入 stdout(默认为进程的标准输入输出)，直到收到 exit 或输入结束\n
+        返回进程退出码，exit 之前收到过 shutdown 时为0
+        """
+        stdin = sys.stdin.buffer if stdin is None else stdin
+        self._output = sys.stdout.buffer if stdout is None else stdout
+        while 1 :
+            message = self._read_message(stdin)
+            if message is None : return 1
+            if not message :
+                self._send({"jsonrpc":"2.0", "id":None, "error":{"code":PARSE_ERROR, "message":"无法解析的消息"}})
+                continue
+            response = self.handle(message)
+            if response is not None : self._send(response)
+            if isinstance(message, dict) and message.get("method") == "exit" : return 0 if self._shutdown else 1
+
+
+def _load_parser(target:str) -> ParserSystem.Command_Parser :
+    module, _, name = target.partition(":")
+    obj = importlib.import_module(module)
+    for i in name.split(".") : obj = getattr(obj, i)
+    if callable(obj) and not isinstance(obj, BaseMatch.Match_Base) : obj = obj()
+    if isinstance(obj, SpecialMatch.Command_Root) : obj = ParserSystem.Command_Parser(obj)
+    if not isinstance(obj, ParserSystem.Command_Parser) : raise TypeError("%s 不是 Command_Root 或 Command_Parser" % target)
+    return obj
+
+def main(argv:List[str]=None) -> int :
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1 or ":" not in argv[0] :
+        sys.stderr.write("python -m command_parser 模块:对象\n")
+        return 2
+    return Language_Server(_load_parser(argv[0])).serve()
@@ -0,0 +1,115 @@
+"""
+.mcfunction 文件分析
+------------------------------
+iter_function_lines : 逐行读取 .mcfunction 文件\n
+parse_functions : 使用 Command_Parser 逐行分析 .mcfunction 文件或目录\n
+文件通过内存映射读取，每次只解码当前行，内存占用与文件大小无关
+"""
+
+from . import parser_system as ParserSystem
+from . import token_stream as TokenStream
+
+from typing import Dict,Union,List,Tuple,Iterator
+import os,mmap
+
+__all__ = ["Function_Line","iter_function_lines","parse_functions"]
+
+
+class Function_Line :
+    """
+    .mcfunction 中一行命令的分析结果
+    ------------------------
+    file : 文件路径\n
+    line : 行号(从1开始)\n
+    column : 命令在行中开始的列(字符序号，从0开始)\n
+    offset : 命令开始位置在文件中的字节偏移\n
+    command : 命令字符串(已去除行首空白与行尾换行)\n
+    result : ParserSystem.Parse_Result
+    """
+
+    __slots__ = ("file","line","column","offset","command","result","_ascii")
+
+    def __init__(self, file:str, line:int, column:int, offset:int, command:str, result:ParserSystem.Parse_Result, is_ascii:bool) -> None :
+        self.file = file
+        self.line = line
+        self.column = column
+        self.offset = offset
+        self.command = command
+        self.result = result
+        self._ascii = is_ascii
+
+    def __repr__(self) -> str :
+        return "<Function_Line %s:%s:%s %r>" % (self.file, self.line, self.column, self.result)
+
+    def file_offset(self, pos:int) -> int :
+        """将命令字符串中的位置转换为文件中的字节偏移"""
+        if self._ascii : return self.offset + pos
+        return self.offset + len(self.command[0:pos].encode("utf-8"))
+
+    def token_offset(self, index:int) -> Tuple[int,int] :
+        """返回第 index 个 token 在文件中的字节范围 (start, end)"""
+        start, end = TokenStream.token_span(self.result.tokens[index])
+        return self.file_offset(start), self.file_offset(end)
+
+    def token_column(self, index:int) -> Tuple[int,int] :
+        """返回第 index 个 token 在行中的列范围 (start, end)"""
+        start, end = TokenStream.token_span(self.result.tokens[index])
+        return self.column + start, self.column + end
+
+    def error_offset(self) -> Union[Tuple[int,int],None] :
+        """返回错误在文件中的字节范围 (start, end)，分析成功时返回None"""
+        if self.result.error is None : return None
+        return self.file_offset(self.result.error.pos[0]), self.file_offset(self.result.error.pos[1])
+
+    def error_offsets(self) -> List[Tuple[int,int]] :
+        """返回所有错误在文件中的字节范围列表，recover 分析时可能有多个"""
+        return [(self.file_offset(i.pos[0]), self.file_offset(i.pos[1])) for i in self.result.errors]
+
+
+def _iter_files(path:str) -> Iterator[str] :
+    if not os.path.isdir(path) :
+        yield path
+        return
+    for root, dirs, files in os.walk(path) :
+        dirs.sort()
+        for i in sorted(files) :
+            if i.endswith(".mcfunction") : yield os.path.join(root, i)
+
+def iter_function_lines(path:str) -> Iterator[Tuple[str,int,int,int,str,bool]] :
+    """
+    逐行读取 .mcfunction 文件
+    ------------------------
+    path : 文件路径，或者包含 .mcfunction 文件的目录(递归查找)\n
+    跳过空行与 # 开头的注释行\n
+    返回 (文件路径, 行号, 列, 字节偏移, 命令字符串, 是否为纯ASCII) 的生成器
+    """
+    for file in _iter_files(path) :
+        with open(file, "rb") as f :
+            size = os.fstat(f.fileno()).st_size
+            if size == 0 : continue
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm :
+                start = 3 if mm[0:3] == b"\xef\xbb\xbf" else 0
+                line = 0
+                while start < size :
+                    line += 1
+                    end = mm.find(b"\n", start)
+                    if end == -1 : end = size
+                    raw = mm[start:end]
+                    if raw.endswith(b"\r") : raw = raw[:-1]
+                    command = raw.lstrip(b" \t")
+                    if command and not command.startswith(b"#") :
+                        column = len(raw) - len(command)
+                        yield file, line, column, start + column, command.decode("utf-8", errors="replace"), command.isascii()
+                    start = end + 1
+
+def parse_functions(parser:ParserSystem.Command_Parser, path:str, compact:bool=False, recover:bool=False) -> Iterator[Function_Line] :
+    """
+    逐行分析 .mcfunction 文件
+    ------------------------
+    parser : 使用的词法器\n
+    path : 文件路径，或者包含 .mcfunction 文件的目录(递归查找)\n
+    compact、recover : 与 Command_Parser.parse 的同名参数含义相同，检查整个行为包时使用 recover 可以一次得到每行的所有错误\n
+    返回 Function_Line 的生成器
+    """
+    for file, line, column, offset, command, is_ascii in iter_function_lines(path) :
+        yield Function_Line(file, line, column, offset, command, parser.parse(command, compact, recover=recover), is_ascii)
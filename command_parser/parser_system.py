@@ -1,13 +1,367 @@
 """
 命令词法器系统
 class Command_Parser
+class Parse_Result
+class Parse_Record
+class Parse_Cache
+class Incremental_Parser
+class Parse_Cancelled
 """
 
 from . import base_match_class as BaseMatch
 from . import special_match as SpecialMatch
+from . import json_paser as JsonParser
+from . import token_stream as TokenStream
+from . import completion as Completion
+from . import profiler as Profiler
+from . import tree_cache as TreeCache
 
-from typing import Dict,Union,List,Tuple
-import re,traceback
+from typing import Dict,Union,List,Tuple,Iterable,Iterator,FrozenSet
+import re,traceback,os,sys,multiprocessing,threading,copy,collections,time,contextvars,itertools,tempfile
+
+
+class Parse_Cancelled(Exception) : 
+    """分析过程中检查到取消标志时抛出，见 Command_Parser.parse 的 cancel 参数"""
+
+#当前上下文(线程)中正在进行的分析的取消标志
+_PARSE_CANCEL = contextvars.ContextVar("Parse_Cancel", default=None)
+#为True时当前上下文中的分析不计入性能统计
+_PROFILE_PAUSED = contextvars.ContextVar("Profile_Paused", default=False)
+
+def _failure_name(leaf:BaseMatch.Match_Base, command_str:str, command_str_pointer:int) -> str :
+    #性能统计使用，匹配失败后再调用一次 _match_string 得到异常类名，这一次调用不计时，内层命令的分析也不计入统计
+    token = _PROFILE_PAUSED.set(True)
+    try : leaf._match_string(command_str, command_str_pointer)
+    except Exception as e : return e.__class__.__name__
+    finally : _PROFILE_PAUSED.reset(token)
+    return BaseMatch.Not_Match.__name__
+
+class _Profiled_Leaf :
+    """
+    性能统计期间代替匹配对象被 Command_Parser._parse 尝试\n
+    记录 _try_match 与 _try_word 的耗时，匹配失败时由 _failure_name 得到失败原因(不计时)
+    """
+
+    __slots__ = ("stats","leaf","_word_scan","re_match","command_str","command_str_pointer")
+
+    def __init__(self, stats:Dict[int,list], leaf:BaseMatch.Match_Base, command_str:str, command_str_pointer:int) -> None :
+        self.stats, self.leaf = stats, leaf
+        self.command_str, self.command_str_pointer = command_str, command_str_pointer
+        self._word_scan = leaf._word_scan
+        self.re_match = getattr(leaf, "re_match", None)
+
+    def _record(self, a, cost:int) :
+        #id(匹配对象) -> [匹配对象, 尝试次数, 成功次数, 累计耗时, {异常类名:次数}]
+        stat = self.stats.get(id(self.leaf))
+        if stat is None : stat = self.stats[id(self.leaf)] = [self.leaf, 0, 0, 0, {}]
+        stat[1] += 1
+        stat[3] += cost
+        if a is not BaseMatch.MATCH_FAIL : stat[2] += 1
+        else :
+            name = _failure_name(self.leaf, self.command_str, self.command_str_pointer)
+            stat[4][name] = stat[4].get(name, 0) + 1
+        return a
+
+    def _try_match(self, s:str, s_pointer:int) :
+        t1 = time.perf_counter_ns()
+        a = self.leaf._try_match(s, s_pointer)
+        return self._record(a, time.perf_counter_ns() - t1)
+
+    def _try_word(self, word:re.Match) :
+        t1 = time.perf_counter_ns()
+        a = self.leaf._try_word(word)
+        return self._record(a, time.perf_counter_ns() - t1)
+
+
+class Parse_Result :
+    """
+    词法分析结果
+    ------------------------
+    由 Command_Parser.parse 返回，每次分析都会生成独立的结果对象\n
+    command : 被分析的源字符串\n
+    tokens : 匹配成功的 token 列表，compact 分析时为 TokenStream.Token_Stream\n
+    node : 分析停止时所在的匹配对象\n
+    pointer : 分析停止时源字符串的指针位置\n
+    error : 分析失败时的异常，分析成功时为None\n
+    errors : 所有错误的列表，只有 recover 分析时才可能多于一个\n
+    matchers : 与 tokens 一一对应的匹配对象列表，分析时记录，TokenValue 直接用它转换 token 的值\n
+    auto_complete : 分析失败时的自动补全字典(首次访问时生成)，分析成功时为None
+    """
+
+    __slots__ = ("command","tokens","node","pointer","error","errors","matchers","_parser","_auto_complete")
+
+    def __init__(self, parser:"Command_Parser", command:str, tokens:Union[list,TokenStream.Token_Stream], node:BaseMatch.Match_Base, pointer:int, error:Union[BaseMatch.Command_Match_Exception,None],
+        errors:List[BaseMatch.Command_Match_Exception]=None, matchers:List[BaseMatch.Match_Base]=None) -> None :
+        self.command = command
+        self.tokens = tokens
+        self.matchers = matchers
+        self.node = node
+        self.pointer = pointer
+        self.error = error
+        if errors is None : errors = [] if error is None else [error]
+        self.errors = errors
+        self._parser = parser
+        self._auto_complete = None
+
+    def __repr__(self) -> str :
+        if self.error is None : return "<Parse_Result tokens=%s>" % len(self.tokens)
+        if len(self.errors) > 1 : return "<Parse_Result tokens=%s errors=%s first=%r>" % (len(self.tokens), len(self.errors), self.error)
+        return "<Parse_Result tokens=%s error=%r>" % (len(self.tokens), self.error)
+
+    @property
+    def success(self) -> bool :
+        return self.error is None
+
+    @property
+    def auto_complete(self) -> Union[Dict[str,str],None] :
+        if self.error is None : return None
+        if self._auto_complete is None : self._auto_complete = self._parser._get_auto_complete(self.error, self.node)
+        return self._auto_complete
+
+    def complete(self, mode:str="match", limit:int=None) -> Union[Dict[str,str],None] :
+        """
+        使用停止位置的补全索引查询出错的单词\n
+        mode : "match" 子串查询(与 auto_complete 相同)，"prefix" 前缀查询，"fuzzy" 模糊查询\n
+        limit : 返回结果的最大数量，None代表不限制\n
+        分析成功时返回None
+        """
+        if self.error is None : return None
+        index = _completion_index(self.error, self.node)
+        if mode == "match" : return index.match(self.error.word, limit)
+        if mode == "prefix" : return index.prefix(self.error.word, limit)
+        if mode == "fuzzy" : return index.fuzzy(self.error.word, limit)
+        raise ValueError("mode 参数只能为 match、prefix 或 fuzzy")
+
+
+class Parse_Record :
+    """
+    可序列化的词法分析结果
+    ------------------------
+    由 Command_Parser.parse_many 返回，不包含 re.Match 与命令树对象，可以在进程间传递\n
+    index : 命令在输入序列中的序号\n
+    command : 被分析的源字符串\n
+    tokens : token 列表，每项为 (type, start, end)\n
+    pointer : 分析停止时源字符串的指针位置\n
+    error : 分析失败时的异常，分析成功时为None\n
+    auto_complete : 分析失败时的自动补全字典，分析成功时为None
+    """
+
+    __slots__ = ("index","command","tokens","pointer","error","auto_complete")
+
+    def __init__(self, index:int, result:Parse_Result) -> None :
+        self.index = index
+        self.command = result.command
+        self.tokens = [(i["type"], i["token"].start(), i["token"].end()) for i in result.tokens]
+        self.pointer = result.pointer
+        self.error = result.error
+        self.auto_complete = result.auto_complete
+
+    def __getstate__(self) :
+        return tuple(getattr(self, i) for i in self.__slots__)
+
+    def __setstate__(self, state) :
+        for i,j in zip(self.__slots__, state) : setattr(self, i, j)
+
+    def __repr__(self) -> str :
+        if self.error is None : return "<Parse_Record index=%s tokens=%s>" % (self.index, len(self.tokens))
+        return "<Parse_Record index=%s tokens=%s error=%r>" % (self.index, len(self.tokens), self.error)
+
+    @property
+    def success(self) -> bool :
+        return self.error is None
+
+    def token_string(self, index:int) -> str :
+        """返回第 index 个 token 对应的源字符串"""
+        return self.command[self.tokens[index][1]:self.tokens[index][2]]
+
+
+class Parse_Cache :
+    """
+    词法分析结果的 LRU 缓存
+    ------------------------
+    实例化参数\n
+    maxsize : 最多缓存的结果数量\n
+    maxbytes : 所有缓存结果估计占用的字节数上限，None为不限制\n
+    ------------------------
+    缓存中只保存不可变的快照，每次命中都会生成新的 Parse_Result，调用者修改结果不会影响缓存\n
+    info 返回命中、未命中、淘汰次数等统计信息
+    """
+
+    #估计缓存占用时使用的近似大小
+    ENTRY_BYTES = 200
+    TOKEN_BYTES = 260
+    COMPACT_TOKEN_BYTES = 12
+
+    def __init__(self, maxsize:int, maxbytes:int=None) -> None :
+        if not isinstance(maxsize,int) or maxsize < 1 : raise Exception("maxsize 参数应该为正整数")
+        if not isinstance(maxbytes,(type(None), int)) : raise TypeError("maxbytes 参数只能为None或者整数")
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self._lock = threading.Lock()
+        self.clear()
+
+    def __getstate__(self) :
+        return self.maxsize, self.maxbytes
+
+    def __setstate__(self, state) :
+        self.__init__(*state)
+
+    def clear(self) :
+        with self._lock :
+            self._entries = collections.OrderedDict()
+            self.bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self) -> Dict[str,int] :
+        return {"hits":self.hits, "misses":self.misses, "evictions":self.evictions,
+            "size":len(self._entries), "maxsize":self.maxsize, "bytes":self.bytes, "maxbytes":self.maxbytes}
+
+    def _snapshot(self, result:Parse_Result) :
+        if isinstance(result.tokens, TokenStream.Token_Stream) :
+            tokens = result.tokens._data.tobytes()
+            size = len(tokens)
+        else :
+            tokens = tuple(tuple(i.items()) for i in result.tokens)
+            size = len(tokens) * self.TOKEN_BYTES
+        auto_complete = None if result.error is None else tuple(result.auto_complete.items())
+        if auto_complete : size += sum(len(i) + len(j) + 100 for i,j in auto_complete)
+        size += self.ENTRY_BYTES + len(result.command) * 2 + (len(result.errors) - 1) * self.ENTRY_BYTES
+        return (tokens, tuple(result.matchers), result.node, result.pointer, tuple(result.errors), auto_complete), size
+
+    def get(self, parser:"Command_Parser", key:Tuple[str,bool,bool,bool]) -> Union[Parse_Result,None] :
+        with self._lock :
+            entry = self._entries.get(key)
+            if entry is None :
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        (tokens, matchers, node, pointer, errors, auto_complete), size = entry
+        command_str, compact = key[0], key[1]
+        if compact :
+            Token_list = TokenStream.Token_Stream(command_str)
+            Token_list._data.frombytes(tokens)
+        else : Token_list = [dict(i) for i in tokens]
+        errors = [copy.copy(i) for i in errors]
+        result = Parse_Result(parser, command_str, Token_list, node, pointer, errors[0] if errors else None, errors, list(matchers))
+        if auto_complete is not None : result._auto_complete = dict(auto_complete)
+        return result
+
+    def put(self, key:Tuple[str,bool,bool,bool], result:Parse_Result) :
+        snapshot, size = self._snapshot(result)
+        if self.maxbytes is not None and size > self.maxbytes : return
+        with self._lock :
+            if key in self._entries : self.bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (snapshot, size)
+            self.bytes += size
+            while len(self._entries) > self.maxsize or (self.maxbytes is not None and self.bytes > self.maxbytes) :
+                self.bytes -= self._entries.popitem(last=False)[1][1]
+                self.evictions += 1
+
+
+def _completion_index(e:Exception, node:BaseMatch.Match_Base) -> Completion.Completion_Index :
+    #带有 expect 的异常(JsonParser.Json_Error)使用出错位置可以使用的补全，其他异常使用停止时的匹配对象的补全索引
+    expect = getattr(e, "expect", None)
+    if expect is not None : return Completion.Completion_Index(expect)
+    index = node._completion
+    if index is None : index = node._build_completion()
+    return index
+
+def _shift_result(result:Parse_Result, command_str:str, offset:int) -> Parse_Result :
+    #将以内层命令文本分析得到的结果平移到外层源字符串中
+    Token_list = TokenStream.Token_Stream(command_str)
+    data = Token_list._data
+    data.extend(result.tokens._data)
+    for i in range(1, len(data), 3) :
+        data[i] += offset
+        data[i+1] += offset
+    errors = [copy.copy(i) for i in result.errors]
+    for i in errors :
+        if hasattr(i, "pos") : i.pos = (i.pos[0] + offset, i.pos[1] + offset)
+    shifted = Parse_Result(result._parser, command_str, Token_list, result.node, result.pointer + offset, errors[0] if errors else None, errors, list(result.matchers))
+    shifted._auto_complete = result._auto_complete
+    return shifted
+
+
+def _common_prefix(s1:str, s2:str) -> int :
+    length = min(len(s1), len(s2))
+    if s1[0:length] == s2[0:length] : return length
+    low, high = 0, length
+    while low < high :
+        middle = (low + high + 1) // 2
+        if s1[0:middle] == s2[0:middle] : low = middle
+        else : high = middle - 1
+    return low
+
+class Incremental_Parser :
+    """
+    增量词法器
+    ------------------------
+    实例化参数\n
+    parser : 使用的 Command_Parser\n
+    compact : 与 Command_Parser.parse 的同名参数含义相同\n
+    ------------------------
+    适用于逐字输入时反复分析同一条命令，每个实例只对应一条正在编辑的命令，不能在多个线程中同时使用\n
+    每匹配一个 token 记录一个检查点，下一次分析时找到与上一次输入的最长公共前缀，\n
+    从已检查字符全部位于该前缀内的最后一个检查点继续分析，得到的结果与完整分析相同\n
+    compact 为False时，复用的 token 中的 re.Match 仍然属于上一次的源字符串(位置与文本相同)
+    """
+
+    def __init__(self, parser:"Command_Parser", compact:bool=False) -> None :
+        if not isinstance(parser, Command_Parser) : raise TypeError("parser 参数只能为 Command_Parser 类")
+        self.parser = parser
+        self.compact = compact
+        self.reset()
+
+    def reset(self) :
+        """清除所有检查点"""
+        self.command = None
+        self.tokens = None
+        self.matchers = None
+        self.checkpoints = [(self.parser.Tree, 0, 0)]
+        self.reused_tokens = 0
+
+    def parse(self, command_str:str) -> Parse_Result :
+        checkpoints = self.checkpoints
+        if self.command is None : index = 0
+        else :
+            prefix = _common_prefix(self.command, command_str)
+            index = len(checkpoints) - 1
+            while checkpoints[index][2] > prefix : index -= 1
+        del checkpoints[index+1:]
+
+        if self.compact :
+            Token_list = TokenStream.Token_Stream(command_str)
+            if index : Token_list._data.extend(self.tokens._data[0:index*3])
+        else : Token_list = self.tokens[0:index] if index else []
+        matchers = self.matchers[0:index] if index else []
+
+        profile = self.parser.profile
+        if profile is not None : start = time.perf_counter_ns()
+        node, pointer, error = self.parser._parse(command_str, checkpoints[index][0], checkpoints[index][1], Token_list, checkpoints, matchers)
+        if profile is not None : profile._add_parse(time.perf_counter_ns() - start, error is not None)
+        self.command, self.tokens, self.matchers, self.reused_tokens = command_str, Token_list, matchers, index
+        return Parse_Result(self.parser, command_str, Token_list, node, pointer, error, None, list(matchers))
+
+
+#parse_many 工作进程使用的词法器
+_worker_parser : "Command_Parser" = None
+_worker_lock = threading.Lock()
+
+def _use_fork() -> bool :
+    #fork 只在启动方式被设置为 fork，或者没有设置且平台为 Linux 时使用，macOS 等平台上 fork 不安全
+    method = multiprocessing.get_start_method(allow_none=True)
+    if method is None : return sys.platform == "linux" and "fork" in multiprocessing.get_all_start_methods()
+    return method == "fork"
+
+def _worker_init(path:str, options:dict) :
+    #不支持 fork 时从 TreeCache 文件读取命令树，避免递归序列化很深的命令树
+    global _worker_parser
+    _worker_parser = Command_Parser(TreeCache.load_tree(path), **options)
+
+def _worker_parse(chunk:Tuple[int,List[str]]) -> List[Parse_Record] :
+    start, commands = chunk
+    return [Parse_Record(start + i, _worker_parser.parse(command_str)) for i,command_str in enumerate(commands)]
 
 
 class Command_Parser :
@@ -18,9 +372,16 @@ class Command_Parser :
     Tree : SpecialMatch.Command_Root类开始嵌套的命令树
     separator : 一个分隔字符
     separator_count : 每段匹配机构之间需要需要相隔多少分隔符
+    cache_size : 缓存的分析结果数量，0为不使用缓存
+    cache_bytes : 缓存结果估计占用的字节数上限，None为不限制
+    completion_limit : 自动补全结果的最大数量，None为不限制
+    ------------------------
+    parse 不修改实例状态，同一个实例可以在多个线程中同时使用\n
+    parser 为旧接口，会将结果写入 current_leaves 与 Token_list
     """
 
-    def __init__(self,Tree:SpecialMatch.Command_Root,separator:str=" ", separator_count:int=None) -> None:
+    def __init__(self,Tree:SpecialMatch.Command_Root,separator:str=" ", separator_count:int=None,
+        cache_size:int=0, cache_bytes:int=None, completion_limit:int=None) -> None:
         if not isinstance(Tree,SpecialMatch.Command_Root) : raise TypeError("Tree 参数只能为 SpecialMatch.Command_Root 类")
 
         if not isinstance(separator,str) : raise TypeError("separator 参数只能为字符串")
@@ -28,16 +389,43 @@ class Command_Parser :
 
         if not isinstance(separator_count,(type(None), int)) : raise TypeError("separator_count 参数只能为None或者整数")
         if isinstance(separator_count,int) and separator_count < 1 : raise Exception("separator_count 参数应该为正整数")
+
+        if not isinstance(cache_size,int) : raise TypeError("cache_size 参数只能为整数")
+        if not isinstance(completion_limit,(type(None), int)) : raise TypeError("completion_limit 参数只能为None或者整数")
         
         self.Tree = Tree
         self.separator = separator
         self.separator_count = separator_count
-        if separator_count == None : self.separator_re_match = re.compile("[%s]{0,}" % BaseMatch.string_to_rematch(separator))
-        else : self.separator_re_match = re.compile("[%s]{%s,%s}" % (BaseMatch.string_to_rematch(separator), separator_count, separator_count))
-        self.no_match_error1 = re.compile("[^%s]{1,}" % BaseMatch.TERMINATOR_RE)
-        self.no_match_error2 = re.compile(".{0,1}")
+        if separator_count == None : self.separator_re_match = BaseMatch.re_compile("[%s]{0,}" % BaseMatch.string_to_rematch(separator))
+        else : self.separator_re_match = BaseMatch.re_compile("[%s]{%s,%s}" % (BaseMatch.string_to_rematch(separator), separator_count, separator_count))
+        self.no_match_error1 = BaseMatch.re_compile("[^%s]{1,}" % BaseMatch.TERMINATOR_RE)
+        self.no_match_error2 = BaseMatch.re_compile(".{0,1}")
+        #recover 分析的同步点 : 逗号、右方括号、右花括号与单独的 run
+        self.recover_sync_re = BaseMatch.re_compile("[,\\]}]|(?<![^%s])run(?![^%s])" % ((BaseMatch.string_to_rematch(separator),) * 2))
+
+        self.cache = Parse_Cache(cache_size, cache_bytes) if cache_size > 0 else None
+        self.completion_limit = completion_limit
+        self.profile = None
+        self._recover_memo = {}
 
         self.current_leaves = Tree
+        #绑定命令树(以及嵌套命令使用的命令树)中的所有 Sub_Command
+        roots = [Tree]
+        for root in roots :
+            for node in BaseMatch.walk_tree(root) :
+                if not isinstance(node, SpecialMatch.Sub_Command) : continue
+                node._parser = self
+                if node.Tree is not None and node.Tree not in roots : roots.append(node.Tree)
+        for root in roots : BaseMatch.finalize_tree(root)
+
+    def __getstate__(self) :
+        #旧接口遗留的 re.Match 无法序列化
+        state = self.__dict__.copy()
+        state.pop("Token_list", None)
+        state["current_leaves"] = self.Tree
+        #以 id 为键的缓存在其他进程中无效
+        state["_recover_memo"] = {}
+        return state
 
     def reset_parser_tree(self) :
         self.current_leaves = self.Tree
@@ -45,45 +433,390 @@ class Command_Parser :
     def _jump_space(self,s:str,s_pointer:int) :
         return self.separator_re_match.match(s,s_pointer)
 
-    def _get_auto_complete(self,e:Exception) :
-        _str = {}
-        for i in self.current_leaves.tree_leaves : _str.update(i._auto_complete())
+    def enable_profile(self) -> Profiler.Parse_Profile :
+        """
+        开启性能统计，返回 Profiler.Parse_Profile\n
+        已经开启时返回原有的统计对象，缓存命中的分析不会被统计\n
+        backtrack 分析只统计分析次数与耗时
+        """
+        if self.profile is None : self.profile = Profiler.Parse_Profile(self.Tree)
+        return self.profile
 
-        re_match = re.compile(BaseMatch.string_to_rematch(e.word))
-        for i in list(_str.keys()) :
-            a = re_match.search(i)
-            if a == None : del _str[i]
-        return _str
+    def disable_profile(self) -> Union[Profiler.Parse_Profile,None] :
+        """关闭性能统计，返回关闭前的统计对象"""
+        profile, self.profile = self.profile, None
+        return profile
 
-    def _parser(self,command_str:str) -> List[re.Match] :
-        command_str_pointer = 0 ; self.Token_list = Token_list = []
+    def _get_auto_complete(self,e:Exception,node:BaseMatch.Match_Base=None) :
+        if self.profile is not None : self.profile._add_auto_complete()
+        if node is None : node = self.current_leaves
+        return _completion_index(e, node).match(e.word, self.completion_limit)
+
+    def _no_match(self,command_str:str,command_str_pointer:int) -> BaseMatch.Not_Match :
+        _m_ = self.no_match_error1.match(command_str,command_str_pointer)
+        if _m_ == None : _m_ = self.no_match_error2.match(command_str,command_str_pointer)
+        return BaseMatch.Not_Match(">>%s<< 非期望的参数" % _m_.group(), pos=(_m_.start(),_m_.end()), word=_m_.group())
+
+    def _fail(self,command_str:str,current_leaves:BaseMatch.Match_Base,command_str_pointer:int,leaves:Iterable[BaseMatch.Match_Base]) :
+        """
+        所有分支匹配失败时的返回值 (停止时的匹配对象, 停止时的指针, 异常)\n
+        分支中存在 Sub_Command 时报告内层命令中的错误，停止位置也在内层命令树中\n
+        分支中存在 JsonParser.Json_Match 时报告 JSON 内部的 Json_Error，自动补全使用它的 expect
+        """
+        for i in leaves :
+            if isinstance(i, SpecialMatch.Sub_Command) :
+                result = i._sub_parse(command_str,command_str_pointer)
+                if isinstance(result, Exception) : return current_leaves, command_str_pointer, result
+                return result.node, result.pointer, result.error
+            if isinstance(i, JsonParser.Json_Match) :
+                error = i._scan(command_str,command_str_pointer,[])
+                if isinstance(error, JsonParser.Json_Error) : return current_leaves, command_str_pointer, error
+        return current_leaves, command_str_pointer, self._no_match(command_str,command_str_pointer)
+
+    def _sub_parse(self,command_str:str,Tree:SpecialMatch.Command_Root,command_str_pointer:int,depth:int) -> Parse_Result :
+        """
+        Sub_Command 使用的内层命令分析，从 command_str_pointer 开始将剩余的字符作为一条命令分析\n
+        depth 为内层命令外面的嵌套层数，可以继续嵌套的层数与它有关，因此也是缓存键的一部分\n
+        所有位置都是 command_str 中的位置，tokens 为 token 列表，开启缓存时为 TokenStream.Token_Stream
+        """
+        if self.cache is None :
+            Token_list, matchers = [], []
+            node, pointer, error = self._parse(command_str, Tree, command_str_pointer, Token_list, None, matchers)
+            return Parse_Result(self, command_str, Token_list, node, pointer, error, None, matchers)
+
+        #大量命令以相同的内层命令结尾，缓存以内层命令的文本为键，命中后平移到当前位置
+        payload = command_str[command_str_pointer:]
+        key = (payload, True, False, False, id(Tree), depth)
+        result = self.cache.get(self, key)
+        if result is None :
+            Token_list, matchers = TokenStream.Token_Stream(payload), []
+            node, pointer, error = self._parse(payload, Tree, 0, Token_list, None, matchers)
+            result = Parse_Result(self, payload, Token_list, node, pointer, error, None, matchers)
+            self.cache.put(key, result)
+        return _shift_result(result, command_str, command_str_pointer)
+
+    def _parse(self,command_str:str,current_leaves:BaseMatch.Match_Base,command_str_pointer:int,Token_list:list,checkpoints:list=None,matchers:list=None) :
+        """
+        从 current_leaves 与 command_str_pointer 开始分析，匹配到的 token 添加至 Token_list\n
+        checkpoints 不为None时，每匹配一个 token 添加一个检查点 (匹配对象, 指针, 已检查字符的结束位置)\n
+        matchers 不为None时，每匹配一个 token 添加匹配到它的匹配对象\n
+        开启性能统计时记录每个匹配对象的尝试次数、成功次数与耗时，结束后合并到 self.profile\n
+        返回 (停止时的匹配对象, 停止时的指针, 失败时的异常或None)
+        """
+        profile = self.profile
+        #性能统计中每个匹配对象的记录，见 _Profiled_Leaf，未开启时为None
+        stats = None if (profile is None or _PROFILE_PAUSED.get()) else {}
+        steps = 0
+
+        cancel = _PARSE_CANCEL.get()
+        MATCH_FAIL = BaseMatch.MATCH_FAIL
+        try :
+            while 1 :
+                if not len(current_leaves.tree_leaves) : break
+                if cancel is not None and cancel.is_set() : raise Parse_Cancelled("分析已取消")
+                steps += 1
+                step_pointer = command_str_pointer
 
+                dispatch = current_leaves._dispatch
+                if dispatch is None : dispatch = current_leaves._build_dispatch()
+                leaves = dispatch[0].get(command_str[command_str_pointer:command_str_pointer+1], dispatch[1])
+
+                #开启性能统计时依次尝试的是记录耗时的包装对象，匹配过程不变
+                tried = leaves if stats is None else [_Profiled_Leaf(stats, i, command_str, command_str_pointer) for i in leaves]
+                a = MATCH_FAIL
+                if dispatch[2] :
+                    #当前位置的单词，re_match -> 匹配结果，同级的匹配对象共用
+                    words = {}
+                    for i in tried :
+                        if i._word_scan :
+                            word = words.get(i.re_match)
+                            if word is None : word = words[i.re_match] = i.re_match.match(command_str,command_str_pointer)
+                            a = i._try_word(word)
+                        else : a = i._try_match(command_str,command_str_pointer)
+                        if a is not MATCH_FAIL : break
+                else :
+                    for i in tried :
+                        a = i._try_match(command_str,command_str_pointer)
+                        if a is not MATCH_FAIL : break
+
+                if a is MATCH_FAIL : return self._fail(command_str,current_leaves,command_str_pointer,leaves)
+                if stats is not None : i = i.leaf
+                current_leaves = i
+                if isinstance(i,BaseMatch.End_Tag) : break
+                command_str_pointer = a["token"].end()
+                Token_list.append(a)
+                if matchers is not None : matchers.append(i)
+                command_str_pointer = self._jump_space(command_str,command_str_pointer).end()
+
+                if checkpoints is not None :
+                    tried = leaves[0:leaves.index(current_leaves)+1]
+                    frontier = max(checkpoints[-1][2], command_str_pointer + 1, *[i._scan_end(command_str,step_pointer) for i in tried])
+                    checkpoints.append((current_leaves, command_str_pointer, frontier))
+        finally :
+            if stats is not None : profile._merge(stats, steps)
+
+        return current_leaves, command_str_pointer, None
+
+    def _parse_backtrack(self,command_str:str,current_leaves:BaseMatch.Match_Base,command_str_pointer:int,Token_list:list,matchers:list=None) :
+        """
+        带记忆的回溯分析，参数与返回值与 _parse 相同\n
+        按照与 _parse 相同的顺序深度优先尝试所有匹配成功的分支，某个分支之后无法完成分析时回退并尝试下一个分支\n
+        已经确定无法完成分析的 (匹配对象, 指针) 会被记录，每个组合最多展开一次，最坏情况为多项式时间\n
+        _parse 能够完成分析时两者的结果相同，全部失败时报告指针最远的错误
+        """
+        def leaves_at(node, pointer) :
+            dispatch = node._dispatch
+            if dispatch is None : dispatch = node._build_dispatch()
+            return iter(dispatch[0].get(command_str[pointer:pointer+1], dispatch[1]))
+
+        def accept(path) :
+            for a, i in path :
+                Token_list.append(a)
+                if matchers is not None : matchers.append(i)
+
+        if not len(current_leaves.tree_leaves) : return current_leaves, command_str_pointer, None
+
+        failed = set()
+        active = {(id(current_leaves), command_str_pointer)}
+        #每一帧为 [匹配对象, 指针, 剩余分支, 是否有分支匹配成功]，path 为到达每一帧时接受的 (token, 匹配对象)
+        stack = [[current_leaves, command_str_pointer, leaves_at(current_leaves, command_str_pointer), False]]
+        path = []
+        furthest = None
+
+        cancel = _PARSE_CANCEL.get()
+        #(re_match, 指针) -> 单词的匹配结果，回退之后再次到达同一位置时不需要重新扫描
+        words = {}
+        while stack :
+            if cancel is not None and cancel.is_set() : raise Parse_Cancelled("分析已取消")
+            frame = stack[-1]
+            node, pointer = frame[0], frame[1]
+            for i in frame[2] :
+                if i._word_scan :
+                    word = words.get((i.re_match, pointer))
+                    if word is None : word = words[(i.re_match, pointer)] = i.re_match.match(command_str,pointer)
+                    a = i._try_word(word)
+                else : a = i._try_match(command_str,pointer)
+                if a is BaseMatch.MATCH_FAIL : continue
+                frame[3] = True
+                if isinstance(i,BaseMatch.End_Tag) :
+                    accept(path)
+                    return i, pointer, None
+                _jump = self._jump_space(command_str,a["token"].end())
+                if _jump is None : continue
+                key = (id(i), _jump.end())
+                if key in failed or key in active : continue
+                if not len(i.tree_leaves) :
+                    accept(path)
+                    accept(((a, i),))
+                    return i, key[1], None
+                active.add(key)
+                stack.append([i, key[1], leaves_at(i, key[1]), False])
+                path.append((a, i))
+                break
+            else :
+                if (not frame[3]) and (furthest is None or pointer > furthest[1]) : furthest = (node, pointer, list(path))
+                key = (id(node), pointer)
+                active.discard(key)
+                failed.add(key)
+                stack.pop()
+                if path : path.pop()
+
+        node, pointer, tokens = furthest
+        accept(tokens)
+        return self._fail(command_str,node,pointer,leaves_at(node, pointer))
+
+    #同步点，以及寻找能够匹配同步点的分支时从经过的匹配对象向下搜索的最大深度
+    RECOVER_SYNC_WORDS = (",", "]", "}", "run")
+    RECOVER_DEPTH = 4
+
+    def _sync_leaves(self,node:BaseMatch.Match_Base,command_str:str,sync_pointer:int) -> Iterator[BaseMatch.Match_Base] :
+        dispatch = node._dispatch
+        if dispatch is None : dispatch = node._build_dispatch()
+        for i in dispatch[0].get(command_str[sync_pointer:sync_pointer+1], dispatch[1]) :
+            if isinstance(i, (BaseMatch.KeyWord, BaseMatch.Char, BaseMatch.Enum)) : yield i
+
+    def _sync_candidates(self,node:BaseMatch.Match_Base) -> List[Tuple[BaseMatch.Match_Base,FrozenSet[str]]] :
+        """
+        返回 node 向下 RECOVER_DEPTH 层内(广度优先顺序)分支能够匹配同步点的匹配对象，以及能够匹配的同步点\n
+        结果按匹配对象缓存，命令树修改后需要清空 _recover_memo
+        """
+        entry = self._recover_memo.get(id(node))
+        if entry is not None and entry[0] is node : return entry[1]
+        candidates = []
+        visited = {id(node)}
+        layer = [node]
+        for _ in range(self.RECOVER_DEPTH) :
+            next_layer = []
+            for i in layer :
+                words = frozenset(j for j in self.RECOVER_SYNC_WORDS if any(
+                    (a := k._try_match(j + self.separator, 0)) is not BaseMatch.MATCH_FAIL and a["token"].end() == len(j)
+                    for k in self._sync_leaves(i, j, 0)))
+                if words : candidates.append((i, words))
+                for j in i.tree_leaves :
+                    if id(j) in visited : continue
+                    visited.add(id(j))
+                    next_layer.append(j)
+            layer = next_layer
+        self._recover_memo[id(node)] = (node, candidates)
+        return candidates
+
+    def _sync_parent(self,command_str:str,node:BaseMatch.Match_Base,sync_pointer:int,sync_end:int) -> Union[BaseMatch.Match_Base,None] :
+        #从 node 开始广度优先查找分支中存在结构关键字且恰好匹配同步点的匹配对象
+        word = command_str[sync_pointer:sync_end]
+        for i, words in self._sync_candidates(node) :
+            if word not in words : continue
+            for j in self._sync_leaves(i, command_str, sync_pointer) :
+                a = j._try_match(command_str,sync_pointer)
+                if a is not BaseMatch.MATCH_FAIL and a["token"].end() == sync_end : return i
+        return None
+
+    def _parse_recover(self,command_str:str,current_leaves:BaseMatch.Match_Base,command_str_pointer:int,Token_list:list,matchers:list=None) :
+        """
+        出错后恢复并继续分析，参数与 _parse 相同\n
+        返回 (第一次出错时的匹配对象, 第一次出错时的指针, 所有错误的列表)，全部成功时与 _parse 的停止位置相同\n
+        出错后从错误位置向后查找同步点，再从最近经过的匹配对象开始向下查找能够匹配该同步点的分支，\n
+        从该分支的上一级匹配对象继续分析，跳过的字符不会生成 token
+        """
+        errors = []
+        first = None
+        path = [current_leaves]
+        sync_from = command_str_pointer
         while 1 :
-            if not len(self.current_leaves.tree_leaves) : break
-
-            is_not_successs = True
-            for i in self.current_leaves.tree_leaves :
-                try : a = i._match_string(command_str,command_str_pointer)
-                except Exception as e : continue
-                else : 
-                    is_not_successs = False
-                    self.current_leaves = i
-                    if isinstance(i,BaseMatch.End_Tag) : break
-                    command_str_pointer = a["token"].end()
-                    Token_list.append(a)
-                    break
-
-            if is_not_successs : 
-                _m_ = self.no_match_error1.match(command_str,command_str_pointer)
-                if _m_ == None : _m_ = self.no_match_error2.match(command_str,command_str_pointer)
-                raise BaseMatch.Not_Match(">>%s<< 非期望的参数" % _m_.group(), pos=(_m_.start(),_m_.end()), word=_m_.group())
-            
-            if isinstance(self.current_leaves,BaseMatch.End_Tag) : break
-            command_str_pointer = self._jump_space(command_str,command_str_pointer).end()
+            checkpoints = [(current_leaves, command_str_pointer, command_str_pointer)]
+            node, pointer, error = self._parse(command_str, current_leaves, command_str_pointer, Token_list, checkpoints, matchers)
+            if first is None : first = (node, pointer)
+            if error is None : break
+            errors.append(error)
+            path.extend(i[0] for i in checkpoints[1:])
+            #错误位于嵌套命令中时，停止位置在内层命令树中
+            if node is not path[-1] : path.append(node)
+
+            resume = None
+            for sync in self.recover_sync_re.finditer(command_str, max(error.pos[0], sync_from)) :
+                searched = set()
+                for i in reversed(path) :
+                    if id(i) in searched : continue
+                    searched.add(id(i))
+                    resume = self._sync_parent(command_str, i, sync.start(), sync.end())
+                    if resume is not None : break
+                if resume is not None : break
+            if resume is None : break
+            current_leaves, command_str_pointer = resume, sync.start()
+            path.append(resume)
+            #同一个同步点只使用一次，避免在同一位置反复出错
+            sync_from = sync.start() + 1
 
+        return first[0], first[1], errors
+
+    def _parser(self,command_str:str) -> List[re.Match] :
+        self.Token_list = Token_list = []
+        profile = self.profile
+        if profile is not None : start = time.perf_counter_ns()
+        self.current_leaves, _, error = self._parse(command_str, self.current_leaves, 0, Token_list)
+        if profile is not None : profile._add_parse(time.perf_counter_ns() - start, error is not None)
+        if error is not None : raise error
         return Token_list
 
+    def parse(self,command_str:str,compact:bool=False,backtrack:bool=False,recover:bool=False,cancel:threading.Event=None) -> Parse_Result :
+        """
+        分析命令字符串
+        ------------------------
+        不修改实例状态，返回独立的 Parse_Result\n
+        compact : 为True时 tokens 为 TokenStream.Token_Stream，不保留 re.Match 对象\n
+        backtrack : 为True时使用带记忆的回溯分析，靠前的分支匹配成功但之后无法完成分析时会尝试其他分支\n
+        recover : 为True时出错后跳到下一个同步点(, ] } run)继续分析，errors 中为一次分析发现的所有错误，\n
+        tokens 中为所有能够匹配的 token，node、pointer、error 与普通分析相同，不能与 backtrack 同时使用\n
+        cancel : 取消标志(threading.Event 或任何带有 is_set 方法的对象)，每匹配一步检查一次，
+        被设置后抛出 Parse_Cancelled，取消的分析不会写入缓存
+        """
+        if cancel is not None :
+            token = _PARSE_CANCEL.set(cancel)
+            try : return self.parse(command_str, compact, backtrack, recover)
+            finally : _PARSE_CANCEL.reset(token)
+        if backtrack and recover : raise ValueError("backtrack 与 recover 参数不能同时为True")
+        key = (command_str, compact, backtrack, recover)
+        if self.cache is not None :
+            result = self.cache.get(self, key)
+            if result is not None : return result
+
+        profile = self.profile
+        if profile is not None : start = time.perf_counter_ns()
+        Token_list = TokenStream.Token_Stream(command_str) if compact else []
+        matchers = []
+        if recover :
+            node, pointer, errors = self._parse_recover(command_str, self.Tree, 0, Token_list, matchers)
+            result = Parse_Result(self, command_str, Token_list, node, pointer, errors[0] if errors else None, errors, matchers)
+        else :
+            if backtrack : node, pointer, error = self._parse_backtrack(command_str, self.Tree, 0, Token_list, matchers)
+            else : node, pointer, error = self._parse(command_str, self.Tree, 0, Token_list, None, matchers)
+            result = Parse_Result(self, command_str, Token_list, node, pointer, error, None, matchers)
+
+        if profile is not None : profile._add_parse(time.perf_counter_ns() - start, result.error is not None)
+        if self.cache is not None : self.cache.put(key, result)
+        return result
+
+    def incremental(self, compact:bool=False) -> Incremental_Parser :
+        """返回使用此词法器的 Incremental_Parser"""
+        return Incremental_Parser(self, compact)
+
+    def parse_many(self, command_iter:Iterable[str], workers:int=None, chunksize:int=256) -> Iterator[Parse_Record] :
+        """
+        批量分析命令字符串
+        ------------------------
+        command_iter : 命令字符串的可迭代对象\n
+        workers : 工作进程数量，None为CPU核心数，小于等于1时在当前进程中分析\n
+        chunksize : 每次发送给工作进程的命令数量\n
+        按输入顺序逐个返回 Parse_Record，每个工作进程最多预先读取两批命令，不会一次读取全部输入\n
+        使用 fork 时(Linux，或者启动方式被设置为 fork)工作进程直接继承命令树，\n
+        否则命令树通过 TreeCache 保存到临时文件，由每个工作进程读取
+        """
+        if workers is None : workers = os.cpu_count() or 1
+        if not isinstance(workers,int) : raise TypeError("workers 参数只能为None或者整数")
+        if not isinstance(chunksize,int) or chunksize < 1 : raise Exception("chunksize 参数应该为正整数")
+
+        if workers <= 1 :
+            for index,command_str in enumerate(command_iter) : yield Parse_Record(index, self.parse(command_str))
+            return
+
+        global _worker_parser
+        path = None
+        try :
+            if _use_fork() :
+                with _worker_lock :
+                    _worker_parser = self
+                    try : pool = multiprocessing.get_context("fork").Pool(workers)
+                    finally : _worker_parser = None
+            else :
+                fd, path = tempfile.mkstemp(suffix=".mctree")
+                os.close(fd)
+                TreeCache.save_tree(self.Tree, path)
+                options = {"separator":self.separator, "separator_count":self.separator_count, "completion_limit":self.completion_limit,
+                    "cache_size":0 if self.cache is None else self.cache.maxsize, "cache_bytes":None if self.cache is None else self.cache.maxbytes}
+                pool = multiprocessing.Pool(workers, initializer=_worker_init, initargs=(path, options))
+
+            with pool :
+                #按顺序等待已经提交的批次，等待中的批次数量有上限
+                commands = iter(command_iter)
+                pending = collections.deque()
+                index = 0
+                while 1 :
+                    while len(pending) < workers * 2 :
+                        chunk = list(itertools.islice(commands, chunksize))
+                        if not chunk : break
+                        pending.append(pool.apply_async(_worker_parse, ((index, chunk),)))
+                        index += len(chunk)
+                    if not pending : break
+                    yield from pending.popleft().get()
+        finally :
+            if path is not None and os.path.exists(path) : os.remove(path)
+
     def parser(self,command_str:str) -> Union[List[re.Match],BaseMatch.Command_Match_Exception] :
+        if self.cache is not None :
+            result = self.parse(command_str)
+            self.current_leaves, self.Token_list = result.node, result.tokens
+            if result.error is not None : return (result.error, result.auto_complete)
+            return result.tokens
+
         self.reset_parser_tree()
         try : a = self._parser(command_str)
         except Exception as e : return (e,self._get_auto_complete(e))
@@ -0,0 +1,128 @@
+"""
+词法分析性能统计
+------------------------------
+Parse_Profile : 记录每个匹配对象的尝试次数、成功次数、按异常类型分类的失败次数与累计耗时\n
+同时记录分析次数、失败的分析次数、分析步数与自动补全次数\n
+通过 Command_Parser.enable_profile() 开启，关闭时词法器只多一次属性判断
+"""
+
+from . import base_match_class as BaseMatch
+
+from typing import Dict,Union,List,Tuple
+import json,threading
+
+__all__ = ["Parse_Profile"]
+
+
+def _built_tree(root:BaseMatch.Match_Base) -> List[Tuple[BaseMatch.Match_Base,str]] :
+    #按广度优先顺序返回已经生成的匹配对象与 token_type 路径，不读取尚未生成的延迟分支
+    paths = {id(root):""}
+    result = [(root, "")]
+    for node, path in result :
+        if type(node.tree_leaves) is BaseMatch.Lazy_Leaves : continue
+        for i in node.tree_leaves :
+            if id(i) in paths : continue
+            paths[id(i)] = (path + " > " if path else "") + i.token_type
+            result.append((i, paths[id(i)]))
+    return result
+
+class Parse_Profile :
+    """
+    词法分析性能统计
+    ------------------------
+    实例化参数\n
+    Tree : 统计的命令树，生成快照时用于给匹配对象编号\n
+    ------------------------
+    统计期间与关闭时使用相同的分析过程，匹配失败后另外调用一次 _match_string 得到异常类型，这一次调用不计时\n
+    嵌套命令的分析只合并匹配对象的统计与分析步数，不计入分析次数\n
+    每次分析结束后才合并到统计结果中，可以在多个线程中同时使用\n
+    parse_many 的工作进程中的统计不会合并到当前进程
+    """
+
+    def __init__(self, Tree:BaseMatch.Match_Base) -> None :
+        self.Tree = Tree
+        self._lock = threading.Lock()
+        self.reset()
+
+    def __getstate__(self) :
+        return self.Tree
+
+    def __setstate__(self, state) :
+        self.__init__(state)
+
+    def reset(self) :
+        """清空所有统计"""
+        with self._lock :
+            self.parses = 0
+            self.failed_parses = 0
+            self.steps = 0
+            self.auto_complete = 0
+            self.time_ns = 0
+            #id(匹配对象) -> [匹配对象, 尝试次数, 成功次数, 累计耗时, {异常类名:次数}]
+            self._nodes : Dict[int,list] = {}
+
+    def _add_parse(self, time_ns:int, failed:bool) :
+        with self._lock :
+            self.parses += 1
+            self.failed_parses += failed
+            self.time_ns += time_ns
+
+    def _merge(self, nodes:Dict[int,list], steps:int) :
+        with self._lock :
+            self.steps += steps
+            for key, (node, attempts, successes, cost, failures) in nodes.items() :
+                total = self._nodes.get(key)
+                if total is None : total = self._nodes[key] = [node, 0, 0, 0, {}]
+                total[1] += attempts
+                total[2] += successes
+                total[3] += cost
+                for name, count in failures.items() : total[4][name] = total[4].get(name, 0) + count
+
+    def _add_auto_complete(self) :
+        with self._lock : self.auto_complete += 1
+
+    def snapshot(self) -> Dict[str,Union[int,List[dict]]] :
+        """
+        返回当前统计结果的副本
+        ------------------------
+        nodes 按照累计耗时从高到低排列，每项包含\n
+        index : 匹配对象在命令树广度优先遍历中的序号(命令树之外的对象为-1)\n
+        path : 从根节点到该匹配对象的 token_type 路径\n
+        class、token_type、attempts、successes、failures(异常类名 -> 次数)、time_ns\n
+        只遍历已经生成的分支，延迟分支不会因为生成快照而被生成，因此序号只在命令树生成的部分不变时有效
+        """
+        paths = {id(node):(index, path) for index, (node, path) in enumerate(_built_tree(self.Tree))}
+        with self._lock :
+            nodes = [list(i) for i in self._nodes.values()]
+            result = {"parses":self.parses, "failed_parses":self.failed_parses, "steps":self.steps,
+                "auto_complete":self.auto_complete, "time_ns":self.time_ns}
+        result["nodes"] = [{
+            "index" : paths.get(id(node), (-1, ""))[0],
+            "path" : paths.get(id(node), (-1, node.token_type))[1],
+            "class" : node.__class__.__name__,
+            "token_type" : node.token_type,
+            "attempts" : attempts,
+            "successes" : successes,
+            "failures" : dict(failures),
+            "time_ns" : cost,
+        } for node, attempts, successes, cost, failures in sorted(nodes, key=lambda i:i[3], reverse=True)]
+        return result
+
+    def to_json(self, indent:int=None) -> str :
+        """以 JSON 格式导出快照"""
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=indent)
+
+    def to_text(self, limit:int=20) -> str :
+        """以文本表格导出快照，只列出累计耗时最高的 limit 个匹配对象"""
+        snapshot = self.snapshot()
+        lines = [
+            "parses %s  failed %s  steps %s  auto_complete %s  time %.3fms" % (snapshot["parses"], snapshot["failed_parses"],
+                snapshot["steps"], snapshot["auto_complete"], snapshot["time_ns"] / 1e6),
+            "%6s %-22s %10s %10s %10s %12s  %s" % ("index", "class", "attempts", "successes", "failures", "time(ms)", "path"),
+        ]
+        for i in snapshot["nodes"][0:limit] :
+            lines.append("%6s %-22s %10s %10s %10s %12.3f  %s" % (i["index"], i["class"], i["attempts"], i["successes"],
+                sum(i["failures"].values()), i["time_ns"] / 1e6, i["path"]))
+            for name, count in sorted(i["failures"].items(), key=lambda j:j[1], reverse=True) :
+                lines.append("%6s %-22s %10s %10s %10s" % ("", "  " + name, "", "", count))
+        return "\n".join(lines)
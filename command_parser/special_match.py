@@ -4,11 +4,12 @@
 
 from . import base_match_class as BaseMatch
 from typing import Dict,Union,List,Tuple
-import re
+import re,contextvars,collections
 
-__all__ = ["BE_String","BE_Quotation_String","Relative_Offset_Float","Local_Offset_Float"]
+__all__ = ["BE_String","BE_Quotation_String","Relative_Offset_Float","Local_Offset_Float","Sub_Command","Sub_Result"]
 
 class Illegal_Match(BaseMatch.Command_Match_Exception) : pass
+class Nesting_Too_Deep(BaseMatch.Command_Match_Exception) : pass
 
 
 class Command_Root(BaseMatch.Match_Base) :
@@ -48,7 +49,7 @@ class BE_Range_Int(BaseMatch.Int) :
     def __init__(self, token_type:str, terminator:str=BaseMatch.TERMINATOR_RE) -> None :
         if not isinstance(terminator,str) : raise TypeError("terminator 提供字符串以外的参数")
         super().__init__(token_type)
-        self.re_match = re.compile("[^%s\\.]{0,}" % terminator)
+        self.re_match = BaseMatch.re_compile("[^%s\\.]{0,}" % terminator)
 
 class BE_String(BaseMatch.Match_Base) :
     """
@@ -65,8 +66,8 @@ class BE_String(BaseMatch.Match_Base) :
     def __init__(self, token_type:str, terminator:str=BaseMatch.TERMINATOR_RE) -> None :
         if not isinstance(terminator,str) : raise TypeError("terminator 提供字符串以外的参数")
         super().__init__(token_type)
-        self.re_match = re.compile("[^%s]{0,}" % terminator)
-        self.re_test  = re.compile("^[-+]?([0-9]{0,}\\.[0-9]{1,}|[0-9]{1,}\\.[0-9]{0,}|[0-9]{1,})$") 
+        self.re_match = BaseMatch.re_compile("[^%s]{0,}" % terminator)
+        self.re_test  = BaseMatch.re_compile("^[-+]?([0-9]{0,}\\.[0-9]{1,}|[0-9]{1,}\\.[0-9]{0,}|[0-9]{1,})$") 
 
     def _match_string(self,s:str,s_pointer:int) :
         _match = self.re_match.match(s,pos=s_pointer)
@@ -74,9 +75,21 @@ class BE_String(BaseMatch.Match_Base) :
             raise Illegal_Match(">>%s<< 并不是有效字符串" % _match.group(), pos=(_match.start(),_match.end()), word=_match.group())
         return {"type":self.token_type, "token":_match}
 
+    _word_scan = True
+
+    def _try_match(self,s:str,s_pointer:int) :
+        return self._try_word(self.re_match.match(s,pos=s_pointer))
+
+    def _try_word(self,_match:re.Match) :
+        if (not _match.group()) or (self.re_test.search(_match.group())) : return BaseMatch.MATCH_FAIL
+        return {"type":self.token_type, "token":_match}
+
     def _auto_complete(self) -> Dict[str,str]: 
         return {"string":""}
 
+    def _scan_end(self,s:str,s_pointer:int) -> int : 
+        return self.re_match.match(s,s_pointer).end() + 1
+
 class BE_Quotation_String(BaseMatch.Match_Base) :
     """
     MCBE版引号字符串匹配
@@ -90,7 +103,7 @@ class BE_Quotation_String(BaseMatch.Match_Base) :
 
     def __init__(self, token_type: str) -> None :
         super().__init__(token_type)
-        self.re_match = re.compile('"(\\\\.|[^\\\\"]){0,}"')
+        self.re_match = BaseMatch.re_compile('"(\\\\.|[^\\\\"]){0,}"')
 
     def _match_string(self,s:str,s_pointer:int) : 
         len_s = len(s)
@@ -103,9 +116,24 @@ class BE_Quotation_String(BaseMatch.Match_Base) :
 
         return {"type":self.token_type, "token":_match}
 
+    def _try_match(self,s:str,s_pointer:int) : 
+        if s[s_pointer:s_pointer+1] != "\"" : return BaseMatch.MATCH_FAIL
+        _match = self.re_match.match(s,s_pointer)
+        if not _match : return BaseMatch.MATCH_FAIL
+        return {"type":self.token_type, "token":_match}
+
     def _auto_complete(self) -> Dict[str,str] : 
         return {'"string"':""}
 
+    def _first_char_set(self) : 
+        return frozenset('"')
+
+    def _scan_end(self,s:str,s_pointer:int) -> int : 
+        if s[s_pointer:s_pointer+1] != "\"" : return s_pointer + 1
+        _match = self.re_match.match(s,s_pointer)
+        #未闭合的引号字符串会一直检查到字符串结束
+        return _match.end() + 1 if _match else len(s) + 1
+
 class Relative_Offset_Float(BaseMatch.Match_Base) :
     """
     相对坐标
@@ -119,8 +147,8 @@ class Relative_Offset_Float(BaseMatch.Match_Base) :
     
     def __init__(self, token_type:str) -> None :
         super().__init__(token_type)
-        self.re_match = re.compile("~[-\\+]?[0-9\\.]{0,}")
-        self.re_test  = re.compile("^[-+]?([0-9]{0,}\\.[0-9]{1,}|[0-9]{1,}\\.[0-9]{0,}|[0-9]{1,})$")
+        self.re_match = BaseMatch.re_compile("~[-\\+]?[0-9\\.]{0,}")
+        self.re_test  = BaseMatch.re_compile("^[-+]?([0-9]{0,}\\.[0-9]{1,}|[0-9]{1,}\\.[0-9]{0,}|[0-9]{1,})$")
 
     def _match_string(self,s:str,s_pointer:int): 
         _match = self.re_match.match(s,pos=s_pointer)
@@ -130,10 +158,23 @@ class Relative_Offset_Float(BaseMatch.Match_Base) :
                 raise Illegal_Match(">>%s<< 并不是有效的浮点数" % _match.group()[1:], pos=(_match.start()+1,_match.end()), word=_match.group()[1:])
         return {"type":self.token_type, "token":_match}
 
+    def _try_match(self,s:str,s_pointer:int): 
+        _match = self.re_match.match(s,pos=s_pointer)
+        if not _match : return BaseMatch.MATCH_FAIL
+        if (_match.group().__len__() > 1) and (not self.re_test.search(_match.group()[1:])) : return BaseMatch.MATCH_FAIL
+        return {"type":self.token_type, "token":_match}
+
     def _auto_complete(self) -> Dict[str,str] : 
         if len(self.argument_dimension) : return {"~":self.argument_dimension[0]}
         return {"~":""}
 
+    def _first_char_set(self) : 
+        return frozenset("~")
+
+    def _scan_end(self,s:str,s_pointer:int) -> int : 
+        _match = self.re_match.match(s,s_pointer)
+        return _match.end() + 1 if _match else s_pointer + 1
+
 class Local_Offset_Float(BaseMatch.Match_Base) :
     """
     局部坐标
@@ -147,8 +188,8 @@ class Local_Offset_Float(BaseMatch.Match_Base) :
     
     def __init__(self,token_type:str) -> None :
         super().__init__(token_type)
-        self.re_match = re.compile("(\\^)[-\\+]?[0-9\\.]{0,}")
-        self.re_test  = re.compile("^[-+]?([0-9]{0,}\\.[0-9]{1,}|[0-9]{1,}\\.[0-9]{0,}|[0-9]{1,})$")
+        self.re_match = BaseMatch.re_compile("(\\^)[-\\+]?[0-9\\.]{0,}")
+        self.re_test  = BaseMatch.re_compile("^[-+]?([0-9]{0,}\\.[0-9]{1,}|[0-9]{1,}\\.[0-9]{0,}|[0-9]{1,})$")
 
     def _match_string(self,s:str,s_pointer:int): 
         _match = self.re_match.match(s,pos=s_pointer)
@@ -158,10 +199,108 @@ class Local_Offset_Float(BaseMatch.Match_Base) :
                 raise Illegal_Match(">>%s<< 并不是有效的浮点数" % _match.group()[1:], pos=(_match.start()+1,_match.end()), word=_match.group()[1:])
         return {"type":self.token_type, "token":_match}
 
+    def _try_match(self,s:str,s_pointer:int): 
+        _match = self.re_match.match(s,pos=s_pointer)
+        if not _match : return BaseMatch.MATCH_FAIL
+        if (_match.group().__len__() > 1) and (not self.re_test.search(_match.group()[1:])) : return BaseMatch.MATCH_FAIL
+        return {"type":self.token_type, "token":_match}
+
     def _auto_complete(self) -> Dict[str,str] : 
         if len(self.argument_dimension) : return {"^":self.argument_dimension[0]}
         return {"^":""}
 
+    def _first_char_set(self) : 
+        return frozenset("^")
+
+    def _scan_end(self,s:str,s_pointer:int) -> int : 
+        _match = self.re_match.match(s,s_pointer)
+        return _match.end() + 1 if _match else s_pointer + 1
+
+
+#当前上下文(线程)中正在分析的嵌套命令层数
+_SUB_COMMAND_DEPTH = contextvars.ContextVar("Sub_Command_Depth", default=0)
+
+class Sub_Result(collections.namedtuple("Sub_Result", ("tokens","error","matchers"), defaults=(None,))) :
+    """
+    内层命令的分析结果快照
+    ------------------------------
+    Sub_Command 匹配成功时保存在 token 的 "result" 中，不可修改，词法器缓存命中时可以安全地共享\n
+    tokens : 内层命令的 token 元组，每项为 (type, start, end)，位置为源字符串中的位置，与 Parse_Record 相同\n
+    error : 内层命令的异常，匹配成功的 token 中总是None\n
+    matchers : 与 tokens 一一对应的匹配对象元组，编译后的词法器生成的结果中为None
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_parse_result(cls, result) -> "Sub_Result" :
+        #Parse_Result 的 tokens 可能是字典列表或者 TokenStream.Token_Stream
+        tokens = result.tokens
+        if isinstance(tokens, list) : tokens = tuple([(i["type"], i["token"].start(), i["token"].end()) for i in tokens])
+        else : tokens = tuple(tokens.to_list())
+        return cls(tokens, result.error, None if result.matchers is None else tuple(result.matchers))
+
+
+class Sub_Command(BaseMatch.Match_Base) :
+    """
+    嵌套命令
+    ------------------------------
+    在下一次匹配中，从当前位置开始将剩余的字符作为一条完整的命令分析\n
+    适用于 execute ... run 之后的命令，内层命令直接在源字符串上分析，不需要截取字符串\n
+    匹配成功时 token 的 "result" 为内层命令的 Sub_Result，其中的位置都是源字符串中的位置\n
+    Command_Parser 实例化时将自身绑定到命令树中的所有 Sub_Command，
+    词法器开启缓存时以内层命令的文本为键复用缓存结果\n
+    ------------------------------
+    实例化参数\n
+    token_type : 定义该匹配的参数含义\n
+    Tree : 内层命令使用的命令树，None为所在词法器的命令树\n
+    max_depth : 最多嵌套的层数，超过时抛出 Nesting_Too_Deep\n
+    >>> Sub_Command("Run_Command")
+    """
+
+    def __init__(self, token_type:str, Tree:Command_Root=None, max_depth:int=8) -> None :
+        if not isinstance(Tree,(type(None), Command_Root)) : raise TypeError("Tree 参数只能为None或者 Command_Root 类")
+        if not isinstance(max_depth,int) or max_depth < 1 : raise Exception("max_depth 参数应该为正整数")
+        super().__init__(token_type)
+        self.Tree = Tree
+        self.max_depth = max_depth
+        self.re_match = BaseMatch.re_compile(".{0,}", re.S)
+        self.word_match = BaseMatch.re_compile("[^%s]{0,}" % BaseMatch.TERMINATOR_RE)
+        self._parser = None
+
+    def _sub_parse(self, s:str, s_pointer:int) :
+        #返回内层命令的 Parse_Result，未绑定词法器或嵌套过深时返回异常
+        parser = self._parser
+        if parser is None : 
+            return BaseMatch.Not_Match("%s 没有绑定词法器" % self.token_type, pos=(s_pointer,s_pointer), word="")
+        depth = _SUB_COMMAND_DEPTH.get()
+        if depth >= self.max_depth :
+            _match = self.word_match.match(s,s_pointer)
+            return Nesting_Too_Deep(">>%s<< 命令嵌套超过 %s 层" % (_match.group(), self.max_depth), pos=(_match.start(),_match.end()), word=_match.group())
+        token = _SUB_COMMAND_DEPTH.set(depth + 1)
+        try : return parser._sub_parse(s, parser.Tree if self.Tree is None else self.Tree, s_pointer, depth)
+        finally : _SUB_COMMAND_DEPTH.reset(token)
+
+    def _token(self, s:str, s_pointer:int, result) -> dict :
+        return {"type":self.token_type, "token":self.re_match.match(s,s_pointer,result.pointer), "result":Sub_Result.from_parse_result(result)}
+
+    def _match_string(self, s:str, s_pointer:int): 
+        result = self._sub_parse(s,s_pointer)
+        if isinstance(result, Exception) : raise result
+        if result.error is not None : raise result.error
+        return self._token(s,s_pointer,result)
+
+    def _try_match(self, s:str, s_pointer:int): 
+        result = self._sub_parse(s,s_pointer)
+        if isinstance(result, Exception) or result.error is not None : return BaseMatch.MATCH_FAIL
+        return self._token(s,s_pointer,result)
+
+    def _auto_complete(self) -> Dict[str,str] : 
+        Tree = self.Tree
+        if Tree is None and self._parser is not None : Tree = self._parser.Tree
+        if Tree is None : return {}
+        return Tree._completion_candidates()
+
 
 def Pos_Tree(*end_node:BaseMatch.Match_Base) -> List[BaseMatch.Match_Base] :
     """
@@ -230,96 +369,97 @@ def Range_Tree(*end_node:BaseMatch.Match_Base) -> List[BaseMatch.Match_Base] :
         )
     ]
 
-def BE_Selector_Tree(*end_node:BaseMatch.Match_Base) :
-    """
-    自动生成一个目标选择器选择器匹配树\n
-    *end_node : 添加下一级匹配类\n
-    -------------------------------
-    返回匹配列表，请将该列表传入add_leaves时添加解包操作
-    """
-
-    def middle_scores_loop(*end_node:BaseMatch.Match_Base) :
-        scores : List[BaseMatch.Match_Base] = [
-            BE_String("Scoreboard_Name"),
-            BE_Quotation_String("Scoreboard_Name")
-        ]
-        scores[0].add_leaves( BaseMatch.KeyWord("Equal","=").add_leaves( *Range_Tree(
-            BaseMatch.KeyWord("Next_Score_Argument:下一个分数条件",",").add_leaves(*scores),
-            BaseMatch.KeyWord("End_Score_Argument:条件结束","}").add_leaves(*end_node)
-        )))
-        scores[1].add_leaves( BaseMatch.KeyWord("Equal","=").add_leaves( *Range_Tree(
-            BaseMatch.KeyWord("Next_Score_Argument:下一个分数条件",",").add_leaves(*scores),
-            BaseMatch.KeyWord("End_Score_Argument:条件结束","}").add_leaves(*end_node)
-        )))
-        return BaseMatch.KeyWord("Start_Score_Argument:条件开始","{").add_leaves(*scores)
-
-    def middle_haspermission_loop(*end_node:BaseMatch.Match_Base) :
-        haspermission1 = BaseMatch.KeyWord("Start_Permission_Argument:条件开始","{")
-        haspermission2 = BaseMatch.Enum("Permission_Argument:头部转动权限;人物移动权限","camera","movement")
-        haspermission2.add_leaves( 
-            BaseMatch.KeyWord("Equal","=").add_leaves( 
-                BaseMatch.Enum("Value:启用;禁用","enabled","disabled").add_leaves( 
-                    BaseMatch.KeyWord("Next_Permission_Argument:下一个权限条件",",").add_leaves(haspermission2),
-                    BaseMatch.KeyWord("End_Permission_Argument:条件结束","}").add_leaves(*end_node)
-                )
+def _middle_scores_loop(*end_node:BaseMatch.Match_Base) :
+    scores : List[BaseMatch.Match_Base] = [
+        BE_String("Scoreboard_Name"),
+        BE_Quotation_String("Scoreboard_Name")
+    ]
+    scores[0].add_leaves( BaseMatch.KeyWord("Equal","=").add_leaves( *Range_Tree(
+        BaseMatch.KeyWord("Next_Score_Argument:下一个分数条件",",").add_leaves(*scores),
+        BaseMatch.KeyWord("End_Score_Argument:条件结束","}").add_leaves(*end_node)
+    )))
+    scores[1].add_leaves( BaseMatch.KeyWord("Equal","=").add_leaves( *Range_Tree(
+        BaseMatch.KeyWord("Next_Score_Argument:下一个分数条件",",").add_leaves(*scores),
+        BaseMatch.KeyWord("End_Score_Argument:条件结束","}").add_leaves(*end_node)
+    )))
+    return BaseMatch.KeyWord("Start_Score_Argument:条件开始","{").add_leaves(*scores)
+
+def _middle_haspermission_loop(*end_node:BaseMatch.Match_Base) :
+    haspermission1 = BaseMatch.KeyWord("Start_Permission_Argument:条件开始","{")
+    haspermission2 = BaseMatch.Enum("Permission_Argument:头部转动权限;人物移动权限","camera","movement")
+    haspermission2.add_leaves( 
+        BaseMatch.KeyWord("Equal","=").add_leaves( 
+            BaseMatch.Enum("Value:启用;禁用","enabled","disabled").add_leaves( 
+                BaseMatch.KeyWord("Next_Permission_Argument:下一个权限条件",",").add_leaves(haspermission2),
+                BaseMatch.KeyWord("End_Permission_Argument:条件结束","}").add_leaves(*end_node)
             )
         )
-        return haspermission1.add_leaves(haspermission2)
-
-    def middle_hasitem_single_args_loop(*end_node:BaseMatch.Match_Base) :
-        hasitem : List[BaseMatch.Match_Base] = [
-            BaseMatch.Char("Item_Argument:物品","item"),
-            BaseMatch.Char("Item_Argument:物品数据值","data"),
-            BaseMatch.Char("Item_Argument:物品数量","quantity"),
-            BaseMatch.Char("Item_Argument:槽位","location"),
-            BaseMatch.Char("Item_Argument:槽位编号","slot")
-        ]
-        hasitem[0].add_leaves( BaseMatch.KeyWord("Equal","=").add_leaves( 
-            BaseMatch.AnyString("Item_ID").add_leaves( 
-                BaseMatch.KeyWord("Next_Item_Argument:下一个参数条件",",").add_leaves(*hasitem),
-                BaseMatch.KeyWord("End_Item_Argument:条件结束","}").add_leaves(*end_node)
-            )
-        ))
-        hasitem[1].add_leaves( BaseMatch.KeyWord("Equal","=").add_leaves( 
-            BaseMatch.Int("Data_Value").add_leaves( 
-                BaseMatch.KeyWord("Next_Item_Argument:下一个参数条件",",").add_leaves(*hasitem),
-                BaseMatch.KeyWord("End_Item_Argument:条件结束","}").add_leaves(*end_node)
-            )
-        ))
-        hasitem[2].add_leaves( BaseMatch.KeyWord("Equal","=").add_leaves( 
-            *Range_Tree( 
-                BaseMatch.KeyWord("Next_Item_Argument:下一个参数条件",",").add_leaves(*hasitem),
-                BaseMatch.KeyWord("End_Item_Argument:条件结束","}").add_leaves(*end_node)
-            )
-        ))
-        hasitem[3].add_leaves( BaseMatch.KeyWord("Equal","=").add_leaves( 
-            BaseMatch.Enum("Slot_ID").add_leaves( 
-                BaseMatch.KeyWord("Next_Item_Argument:下一个参数条件",",").add_leaves(*hasitem),
-                BaseMatch.KeyWord("End_Item_Argument:条件结束","}").add_leaves(*end_node)
-            )
-            #"slot.weapon.mainhand","slot.weapon.offhand",
-            #"slot.armor.head","slot.armor.chest","slot.armor.legs","slot.armor.feet",
-            #"slot.enderchest","slot.hotbar","slot.inventory","slot.saddle","slot.armor",
-            #"slot.armor","slot.chest","slot.equippable"
-        ))
-        hasitem[4].add_leaves( BaseMatch.KeyWord("Equal","=").add_leaves( 
-            *Range_Tree( 
-                BaseMatch.KeyWord("Next_Item_Argument:下一个参数条件",",").add_leaves(*hasitem),
-                BaseMatch.KeyWord("End_Item_Argument:条件结束","}").add_leaves(*end_node)
-            )
-        ))
-        return BaseMatch.KeyWord("Start_Item_Argument:条件开始","{").add_leaves(*hasitem)
-
-    def middle_hasitem_multiple_args_loop(*end_node:BaseMatch.Match_Base) :
-        hasitem1 = BaseMatch.KeyWord("Start_Item_Condition:条件开始","[")
-        m1 = BaseMatch.KeyWord("Next_Item_Condition:下一个物品条件",",")
-        hasitem2 = middle_hasitem_single_args_loop( 
-            m1, BaseMatch.KeyWord("End_Item_Condition:条件结束","]").add_leaves(*end_node)
+    )
+    return haspermission1.add_leaves(haspermission2)
+
+def _middle_hasitem_single_args_loop(*end_node:BaseMatch.Match_Base) :
+    hasitem : List[BaseMatch.Match_Base] = [
+        BaseMatch.Char("Item_Argument:物品","item"),
+        BaseMatch.Char("Item_Argument:物品数据值","data"),
+        BaseMatch.Char("Item_Argument:物品数量","quantity"),
+        BaseMatch.Char("Item_Argument:槽位","location"),
+        BaseMatch.Char("Item_Argument:槽位编号","slot")
+    ]
+    hasitem[0].add_leaves( BaseMatch.KeyWord("Equal","=").add_leaves( 
+        BaseMatch.AnyString("Item_ID").add_leaves( 
+            BaseMatch.KeyWord("Next_Item_Argument:下一个参数条件",",").add_leaves(*hasitem),
+            BaseMatch.KeyWord("End_Item_Argument:条件结束","}").add_leaves(*end_node)
+        )
+    ))
+    hasitem[1].add_leaves( BaseMatch.KeyWord("Equal","=").add_leaves( 
+        BaseMatch.Int("Data_Value").add_leaves( 
+            BaseMatch.KeyWord("Next_Item_Argument:下一个参数条件",",").add_leaves(*hasitem),
+            BaseMatch.KeyWord("End_Item_Argument:条件结束","}").add_leaves(*end_node)
+        )
+    ))
+    hasitem[2].add_leaves( BaseMatch.KeyWord("Equal","=").add_leaves( 
+        *Range_Tree( 
+            BaseMatch.KeyWord("Next_Item_Argument:下一个参数条件",",").add_leaves(*hasitem),
+            BaseMatch.KeyWord("End_Item_Argument:条件结束","}").add_leaves(*end_node)
+        )
+    ))
+    hasitem[3].add_leaves( BaseMatch.KeyWord("Equal","=").add_leaves( 
+        BaseMatch.Enum("Slot_ID").add_leaves( 
+            BaseMatch.KeyWord("Next_Item_Argument:下一个参数条件",",").add_leaves(*hasitem),
+            BaseMatch.KeyWord("End_Item_Argument:条件结束","}").add_leaves(*end_node)
+        )
+        #"slot.weapon.mainhand","slot.weapon.offhand",
+        #"slot.armor.head","slot.armor.chest","slot.armor.legs","slot.armor.feet",
+        #"slot.enderchest","slot.hotbar","slot.inventory","slot.saddle","slot.armor",
+        #"slot.armor","slot.chest","slot.equippable"
+    ))
+    hasitem[4].add_leaves( BaseMatch.KeyWord("Equal","=").add_leaves( 
+        *Range_Tree( 
+            BaseMatch.KeyWord("Next_Item_Argument:下一个参数条件",",").add_leaves(*hasitem),
+            BaseMatch.KeyWord("End_Item_Argument:条件结束","}").add_leaves(*end_node)
         )
-        m1.add_leaves(hasitem2)
-        return hasitem1.add_leaves(hasitem2)
+    ))
+    return BaseMatch.KeyWord("Start_Item_Argument:条件开始","{").add_leaves(*hasitem)
+
+def _middle_hasitem_multiple_args_loop(*end_node:BaseMatch.Match_Base) :
+    hasitem1 = BaseMatch.KeyWord("Start_Item_Condition:条件开始","[")
+    m1 = BaseMatch.KeyWord("Next_Item_Condition:下一个物品条件",",")
+    hasitem2 = _middle_hasitem_single_args_loop( 
+        m1, BaseMatch.KeyWord("End_Item_Condition:条件结束","]").add_leaves(*end_node)
+    )
+    m1.add_leaves(hasitem2)
+    return hasitem1.add_leaves(hasitem2)
 
+def _selector_scores(*end_node:BaseMatch.Match_Base) -> List[BaseMatch.Match_Base] :
+    return [_middle_scores_loop(*end_node)]
 
+def _selector_haspermission(*end_node:BaseMatch.Match_Base) -> List[BaseMatch.Match_Base] :
+    return [_middle_haspermission_loop(*end_node)]
+
+def _selector_hasitem(*end_node:BaseMatch.Match_Base) -> List[BaseMatch.Match_Base] :
+    return [_middle_hasitem_multiple_args_loop(*end_node), _middle_hasitem_single_args_loop(*end_node)]
+
+def _selector_arguments(lazy:bool, *end_node:BaseMatch.Match_Base) -> List[BaseMatch.Match_Base] :
     Selector_Var2 : List[BaseMatch.Match_Base] = [
         BaseMatch.Enum("Selector_Argument:x坐标值;y坐标值;z坐标值","x","y","z"),    # 0
         BaseMatch.Enum("Selector_Argument:体积x长度;体积y长度;体积z长度;距离上限;距离下限;垂直视角上限;垂直视角下限;水平视角上限;水平视角下限","dx","dy","dz","r","rm","rx","rxm","ry","rym"), # 1
@@ -394,29 +534,33 @@ def BE_Selector_Tree(*end_node:BaseMatch.Match_Base) :
             BaseMatch.KeyWord("End_Selector_Argument:选择器条件结束","]").add_leaves(*end_node)
         )
     ))
-    Selector_Var2[6].add_leaves( BaseMatch.KeyWord("Equal","=").add_leaves( middle_scores_loop(
-        BaseMatch.KeyWord("Next_Selector_Argument:下一个选择器条件",",").add_leaves(*Selector_Var2),
-        BaseMatch.KeyWord("End_Selector_Argument:选择器条件结束","]").add_leaves(*end_node)
-    )))
-    Selector_Var2[7].add_leaves( BaseMatch.KeyWord("Equal","=").add_leaves( middle_haspermission_loop(
-        BaseMatch.KeyWord("Next_Selector_Argument:下一个选择器条件",",").add_leaves(*Selector_Var2),
-        BaseMatch.KeyWord("End_Selector_Argument:选择器条件结束","]").add_leaves(*end_node)
-    )))
-    Selector_Var2[8].add_leaves( BaseMatch.KeyWord("Equal","=").add_leaves( 
-        middle_hasitem_multiple_args_loop(
-            BaseMatch.KeyWord("Next_Selector_Argument:下一个选择器条件",",").add_leaves(*Selector_Var2),
-            BaseMatch.KeyWord("End_Selector_Argument:选择器条件结束","]").add_leaves(*end_node)
-        ),
-        middle_hasitem_single_args_loop(
+    #分数、权限与物品条件的结构最大，lazy 为True时在第一次用到时才生成
+    for index, builder in ((6,_selector_scores), (7,_selector_haspermission), (8,_selector_hasitem)) :
+        next_and_end = (
             BaseMatch.KeyWord("Next_Selector_Argument:下一个选择器条件",",").add_leaves(*Selector_Var2),
             BaseMatch.KeyWord("End_Selector_Argument:选择器条件结束","]").add_leaves(*end_node)
         )
-    ))
+        if lazy : Selector_Var2[index].add_leaves( BaseMatch.KeyWord("Equal","=").add_lazy_leaves(builder, *next_and_end) )
+        else : Selector_Var2[index].add_leaves( BaseMatch.KeyWord("Equal","=").add_leaves(*builder(*next_and_end)) )
+    return Selector_Var2
+
 
+def BE_Selector_Tree(*end_node:BaseMatch.Match_Base, lazy:bool=False) :
+    """
+    自动生成一个目标选择器选择器匹配树\n
+    *end_node : 添加下一级匹配类\n
+    lazy : 为True时选择器参数部分(方括号内)在词法器第一次到达时才生成，
+    只使用玩家名与不带参数的选择器时不会生成，分数、权限与物品条件也各自在第一次用到时生成\n
+    -------------------------------
+    返回匹配列表，请将该列表传入add_leaves时添加解包操作
+    """
+    Start_Argument = BaseMatch.KeyWord("Start_Selector_Argument:选择器条件开始","[")
+    if lazy : Start_Argument.add_lazy_leaves(_selector_arguments, True, *end_node)
+    else : Start_Argument.add_leaves(*_selector_arguments(False, *end_node))
 
     Selector : List[BaseMatch.Match_Base] = [
         BaseMatch.KeyWord("Selector:最近的玩家;所有在线玩家;随机玩家或实体;命令的执行者;所有存活的实体","@p","@a","@r","@s","@e","@initiator").add_leaves(
-            BaseMatch.KeyWord("Start_Selector_Argument:选择器条件开始","[").add_leaves(*Selector_Var2),
+            Start_Argument,
             *end_node
         ),
         BE_String("Player_Name").add_leaves(*end_node),
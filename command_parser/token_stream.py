@@ -0,0 +1,135 @@
+"""
+紧凑的 token 表示
+------------------------------
+Token : 只保存类型编号与起止位置的 token\n
+Token_Stream : 使用 array 保存所有 token 的 token 流，需要时才从源字符串中取出文本\n
+Command_Parser.parse(command_str, compact=True) 直接生成 Token_Stream
+"""
+
+from typing import Dict,Union,List,Tuple,Iterator
+from array import array
+
+__all__ = ["Token","Token_Stream","token_type_id","token_type_name","token_span"]
+
+
+_TYPE_ID : Dict[str,int] = {}
+_TYPE_NAME : List[str] = []
+
+def token_type_id(name:str) -> int :
+    """返回 token 类型名称对应的编号，同一进程内相同的名称总是得到相同的编号"""
+    if name not in _TYPE_ID :
+        _TYPE_ID[name] = len(_TYPE_NAME)
+        _TYPE_NAME.append(name)
+    return _TYPE_ID[name]
+
+def token_type_name(type_id:int) -> str :
+    """返回 token 类型编号对应的名称"""
+    return _TYPE_NAME[type_id]
+
+def token_span(token:Union[dict,"Token"]) -> Tuple[int,int] :
+    """返回 token 的起止位置，同时支持字典格式与 Token"""
+    if isinstance(token, Token) : return token.start, token.end
+    return token["token"].span()
+
+
+class Token :
+    """
+    紧凑 token
+    ------------------------
+    type_id : token 类型编号(token_type_id)\n
+    start : 在源字符串中的开始位置\n
+    end : 在源字符串中的结束位置
+    """
+
+    __slots__ = ("type_id","start","end")
+
+    def __init__(self, type_id:int, start:int, end:int) -> None :
+        self.type_id = type_id
+        self.start = start
+        self.end = end
+
+    def __repr__(self) -> str :
+        return "<Token %s %s:%s>" % (self.type, self.start, self.end)
+
+    def __eq__(self, other) -> bool :
+        if not isinstance(other, Token) : return NotImplemented
+        return (self.type_id, self.start, self.end) == (other.type_id, other.start, other.end)
+
+    def __hash__(self) -> int :
+        return hash((self.type_id, self.start, self.end))
+
+    @property
+    def type(self) -> str :
+        return _TYPE_NAME[self.type_id]
+
+    def span(self) -> Tuple[int,int] :
+        return self.start, self.end
+
+    def text(self, command:str) -> str :
+        return command[self.start:self.end]
+
+
+class Token_Stream :
+    """
+    紧凑 token 流
+    ------------------------
+    每个 token 在 array('i') 中占用三个整数 (类型编号, 开始位置, 结束位置)\n
+    command : 源字符串\n
+    可以像列表一样使用 len、下标与迭代，得到的元素为 Token
+    """
+
+    __slots__ = ("command","_data")
+
+    def __init__(self, command:str) -> None :
+        self.command = command
+        self._data = array("i")
+
+    def __repr__(self) -> str :
+        return "<Token_Stream tokens=%s>" % len(self)
+
+    def __len__(self) -> int :
+        return len(self._data) // 3
+
+    def __getitem__(self, index:int) -> Token :
+        if index < 0 : index += len(self)
+        if not 0 <= index < len(self) : raise IndexError("token 下标越界")
+        i = index * 3
+        return Token(self._data[i], self._data[i+1], self._data[i+2])
+
+    def __iter__(self) -> Iterator[Token] :
+        data = self._data
+        for i in range(0, len(data), 3) : yield Token(data[i], data[i+1], data[i+2])
+
+    def __getstate__(self) :
+        #类型编号只在当前进程内有效，序列化时保存类型名称
+        data = self._data
+        return self.command, data, [_TYPE_NAME[data[i]] for i in range(0, len(data), 3)]
+
+    def __setstate__(self, state) :
+        self.command, self._data, names = state
+        for i,j in enumerate(names) : self._data[i*3] = token_type_id(j)
+
+    def append(self, token:Union[dict,Token]) :
+        """添加一个 token，同时支持匹配类返回的字典格式与 Token"""
+        if isinstance(token, Token) : self._data.extend((token.type_id, token.start, token.end))
+        else :
+            _match = token["token"]
+            self._data.extend((token_type_id(token["type"]), _match.start(), _match.end()))
+
+    def add(self, type_id:int, start:int, end:int) :
+        """直接添加一个 token"""
+        self._data.extend((type_id, start, end))
+
+    def type(self, index:int) -> str :
+        return _TYPE_NAME[self._data[index*3]]
+
+    def span(self, index:int) -> Tuple[int,int] :
+        return self._data[index*3+1], self._data[index*3+2]
+
+    def text(self, index:int) -> str :
+        return self.command[self._data[index*3+1]:self._data[index*3+2]]
+
+    def to_list(self) -> List[Tuple[str,int,int]] :
+        """转换为 (type, start, end) 列表"""
+        data = self._data
+        return [(_TYPE_NAME[data[i]], data[i+1], data[i+2]) for i in range(0, len(data), 3)]
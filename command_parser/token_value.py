@@ -0,0 +1,294 @@
+"""
+token 的类型化取值
+------------------------------
+Token_Values : 一次分析结果的类型化取值，第一次访问某个 token 时才转换，结果保存在 Token_Values 中\n
+values : 为 ParserSystem.Parse_Result 生成 Token_Values\n
+转换函数由匹配对象的类决定(见 CONVERTERS 与 register_converter)，token 本身只保存 "type" 与 "token"，\n
+匹配对象来自分析时记录的 Parse_Result.matchers，字典格式、TokenStream.Token_Stream 与 (type, start, end) 格式的 token 都可以取值\n
+没有转换函数的 token 取值为匹配到的文本，SpecialMatch.Sub_Command 的 token 取值为内层命令的 Token_Values
+"""
+
+from . import base_match_class as BaseMatch
+from . import special_match as SpecialMatch
+from . import token_stream as TokenStream
+
+from typing import Dict,Union,List,Tuple,Callable,Any
+import re,itertools
+
+__all__ = ["Unit_Value","Offset_Value","Range_Value","Token_Values","values","register_converter","int_value","float_value","offset_value","quoted_value","CONVERTERS"]
+
+
+class Unit_Value :
+    """
+    带有单位的数值
+    ------------------------
+    number : 单位之前的整数或浮点数\n
+    unit : 单位字符串
+    """
+
+    __slots__ = ("number","unit")
+
+    def __init__(self, number:Union[int,float], unit:str) -> None :
+        self.number = number
+        self.unit = unit
+
+    def __repr__(self) -> str :
+        return "<Unit_Value %r%s>" % (self.number, self.unit)
+
+    def __eq__(self, other) -> bool :
+        if not isinstance(other, Unit_Value) : return NotImplemented
+        return (self.number, self.unit) == (other.number, other.unit)
+
+    def __hash__(self) -> int :
+        return hash((self.number, self.unit))
+
+class Offset_Value :
+    """
+    相对坐标或局部坐标
+    ------------------------
+    kind : "~" 相对坐标，"^" 局部坐标\n
+    offset : 偏移量，省略时为0.0
+    """
+
+    __slots__ = ("kind","offset")
+
+    def __init__(self, kind:str, offset:float) -> None :
+        self.kind = kind
+        self.offset = offset
+
+    def __repr__(self) -> str :
+        return "<Offset_Value %s%r>" % (self.kind, self.offset)
+
+    def __eq__(self, other) -> bool :
+        if not isinstance(other, Offset_Value) : return NotImplemented
+        return (self.kind, self.offset) == (other.kind, other.offset)
+
+    def __hash__(self) -> int :
+        return hash((self.kind, self.offset))
+
+class Range_Value :
+    """
+    范围值
+    ------------------------
+    min : 下限，省略时为None\n
+    max : 上限，省略时为None，没有 ".." 时与下限相同\n
+    negated : 是否使用 "!" 取反
+    """
+
+    __slots__ = ("min","max","negated")
+
+    def __init__(self, min:Union[int,None], max:Union[int,None], negated:bool=False) -> None :
+        self.min = min
+        self.max = max
+        self.negated = negated
+
+    def __repr__(self) -> str :
+        return "<Range_Value %s%s..%s>" % ("!" if self.negated else "", "" if self.min is None else self.min, "" if self.max is None else self.max)
+
+    def __eq__(self, other) -> bool :
+        if not isinstance(other, Range_Value) : return NotImplemented
+        return (self.min, self.max, self.negated) == (other.min, other.max, other.negated)
+
+    def __hash__(self) -> int :
+        return hash((self.min, self.max, self.negated))
+
+    def __contains__(self, number:Union[int,float]) -> bool :
+        inside = (self.min is None or number >= self.min) and (self.max is None or number <= self.max)
+        return inside != self.negated
+
+
+def int_value(text:str, matcher:BaseMatch.Int) -> Union[int,Unit_Value] :
+    """整数 token 的转换函数，多个负号与连续取负相同；匹配对象有单位字符串时返回 Unit_Value"""
+    split = _unit_split(text, matcher)
+    number = text[0:split]
+    if number[0:2] == "--" :
+        digits = number.lstrip("-")
+        result = int(digits) if (len(number) - len(digits)) % 2 == 0 else -int(digits)
+    else : result = int(number)
+    return result if split == len(text) else Unit_Value(result, text[split:])
+
+def float_value(text:str, matcher:BaseMatch.Float) -> Union[float,Unit_Value] :
+    """浮点数 token 的转换函数，匹配对象有单位字符串时返回 Unit_Value"""
+    if not matcher.unit_word : return float(text)
+    split = _unit_split(text, matcher)
+    if split == len(text) : return float(text)
+    return Unit_Value(float(text[0:split]), text[split:])
+
+def offset_value(text:str, matcher:BaseMatch.Match_Base) -> Offset_Value :
+    """相对坐标与局部坐标 token 的转换函数"""
+    return Offset_Value(text[0], float(text[1:]) if len(text) > 1 else 0.0)
+
+_ESCAPE = re.compile("\\\\(.)")
+
+def quoted_value(text:str, matcher:BaseMatch.Match_Base) -> str :
+    """引号字符串 token 的转换函数，去掉两侧引号并还原反斜杠转义的字符"""
+    body = text[1:-1]
+    return _ESCAPE.sub("\\1", body) if "\\" in body else body
+
+def _unit_split(text:str, matcher:Union[BaseMatch.Int,BaseMatch.Float]) -> int :
+    #单位字符串的开始位置，没有单位时为文本长度，与 unit_word_test 的结果相同(位置最靠前，即最长的结尾单位)
+    if not matcher.unit_word : return len(text)
+    return len(text) - max([len(i) for i in matcher.unit_word if text.endswith(i)], default=0)
+
+#匹配类 -> 转换函数 (text, matcher)，按照匹配对象的类的 MRO 查找，请使用 register_converter 修改
+CONVERTERS : Dict[type,Callable[[str,BaseMatch.Match_Base],Any]] = {
+    BaseMatch.Int : int_value,
+    BaseMatch.Float : float_value,
+    SpecialMatch.Relative_Offset_Float : offset_value,
+    SpecialMatch.Local_Offset_Float : offset_value,
+    SpecialMatch.BE_Quotation_String : quoted_value,
+}
+
+_SUB_COMMAND = object()
+
+class _Converter_Cache(dict) :
+    #匹配类 -> 查找 CONVERTERS 的结果，Sub_Command 及其子类为 _SUB_COMMAND，没有的类在第一次查找时计算
+    def __missing__(self, cls:type) -> Union[Callable,None] :
+        result = None
+        if issubclass(cls, SpecialMatch.Sub_Command) : result = _SUB_COMMAND
+        else :
+            for i in cls.__mro__ :
+                if i in CONVERTERS : 
+                    result = CONVERTERS[i]
+                    break
+        self[cls] = result
+        return result
+
+_CLASS_CONVERTER = _Converter_Cache()
+
+def register_converter(cls:type, convert:Union[Callable[[str,BaseMatch.Match_Base],Any],None]) :
+    """
+    注册匹配类的转换函数\n
+    convert(text, matcher) 返回 token 的值，为None时删除该匹配类的转换函数(仍然会使用父类的转换函数)
+    """
+    if convert is None : CONVERTERS.pop(cls, None)
+    else : CONVERTERS[cls] = convert
+    _CLASS_CONVERTER.clear()
+
+#尚未转换的值
+_UNSET = object()
+
+
+class Token_Values :
+    """
+    一次分析结果的类型化取值
+    ------------------------
+    实例化参数\n
+    command : 被分析的源字符串\n
+    tokens : 分析得到的 token 列表，可以是字典格式、TokenStream.Token_Stream 或者 (type, start, end) 列表\n
+    matchers : 与 tokens 一一对应的匹配对象，即 Parse_Result.matchers 或 SpecialMatch.Sub_Result.matchers\n
+    ------------------------
+    取值时直接使用分析时记录的匹配对象的转换函数，不需要重新匹配，转换结果保存在实例中，不会修改 token\n
+    tv[index] 返回第 index 个 token 的值，tv.matcher(index) 返回它的匹配对象，tv.range(index) 读取范围值
+    """
+
+    __slots__ = ("command","tokens","matchers","_values","_complete")
+
+    def __init__(self, command:str, tokens, matchers:List[BaseMatch.Match_Base]) -> None :
+        self.command = command
+        self.tokens = tokens
+        self.matchers = matchers
+        #已经转换的值，第一次使用下标取值时才生成，_complete 为True时全部转换完成
+        self._values = None
+        self._complete = False
+
+    def __repr__(self) -> str :
+        return "<Token_Values tokens=%s>" % len(self.matchers)
+
+    def __len__(self) -> int :
+        return len(self.matchers)
+
+    def __iter__(self) :
+        if not self._complete : self._convert_all()
+        return iter(self._values)
+
+    def type(self, index:int) -> str :
+        tokens = self.tokens
+        if isinstance(tokens, TokenStream.Token_Stream) : return tokens.type(index)
+        token = tokens[index]
+        return token["type"] if type(token) is dict else token[0]
+
+    def span(self, index:int) -> Tuple[int,int] :
+        tokens = self.tokens
+        if isinstance(tokens, TokenStream.Token_Stream) : return tokens.span(index)
+        token = tokens[index]
+        return token["token"].span() if type(token) is dict else (token[1], token[2])
+
+    def text(self, index:int) -> str :
+        tokens = self.tokens
+        if isinstance(tokens, TokenStream.Token_Stream) : return tokens.text(index)
+        token = tokens[index]
+        return token["token"].group() if type(token) is dict else self.command[token[1]:token[2]]
+
+    def matcher(self, index:int) -> BaseMatch.Match_Base :
+        """返回第 index 个 token 的匹配对象"""
+        return self.matchers[index]
+
+    def __getitem__(self, index:int) -> Any :
+        values = self._values
+        if values is None : values = self._values = [_UNSET] * len(self.matchers)
+        value = values[index]
+        if value is not _UNSET : return value
+        if index < 0 : index += len(values)
+        value = values[index] = self._convert(index, self.text(index))
+        return value
+
+    def _convert(self, index:int, text:str) -> Any :
+        matcher = self.matchers[index]
+        convert = _CLASS_CONVERTER[matcher.__class__]
+        if convert is None : return text
+        if convert is _SUB_COMMAND : return self._sub_values(index, matcher)
+        return convert(text, matcher)
+
+    def _convert_all(self) :
+        #已经有值时逐个补全，否则一次取出全部 token 的文本与转换函数，只对有转换函数的 token 调用转换函数
+        if self._values is not None :
+            for i in range(len(self._values)) : self[i]
+            self._complete = True
+            return
+        tokens, matchers, command = self.tokens, self.matchers, self.command
+        if isinstance(tokens, TokenStream.Token_Stream) : texts = [command[start:end] for _, start, end in tokens.to_list()]
+        elif len(tokens) and type(tokens[0]) is dict : texts = [i["token"].group() for i in tokens]
+        else : texts = [command[i[1]:i[2]] for i in tokens]
+        get = _CLASS_CONVERTER.__getitem__
+        converts = [get(i.__class__) for i in matchers]
+        for index in itertools.compress(range(len(converts)), converts) :
+            convert = converts[index]
+            if convert is _SUB_COMMAND : texts[index] = self._sub_values(index, matchers[index])
+            else : texts[index] = convert(texts[index], matchers[index])
+        self._values = texts
+        self._complete = True
+
+    def _sub_values(self, index:int, matcher:SpecialMatch.Sub_Command) -> "Token_Values" :
+        #字典格式的 token 带有内层命令的 Sub_Result，其他格式没有保存内层结果，需要重新分析内层命令
+        token = self.tokens[index]
+        sub = token.get("result") if type(token) is dict else None
+        if sub is None : sub = matcher._try_match(self.command, self.span(index)[0])["result"]
+        return Token_Values(self.command, sub.tokens, sub.matchers)
+
+    def range(self, index:int=0) -> Tuple[Range_Value,int] :
+        """
+        从第 index 个 token 开始读取 SpecialMatch.Range_Tree 生成的范围值\n
+        依次读取可选的 Not、Range_Min、Range_Sign、Range_Max，返回 (Range_Value, 范围之后的 token 下标)\n
+        index 处不是范围值时抛出 ValueError
+        """
+        start, count = index, len(self.matchers)
+        negated = index < count and self.type(index) == "Not"
+        if negated : index += 1
+        low = high = None
+        if index < count and self.type(index) == "Range_Min" :
+            low = high = self[index]
+            index += 1
+        if index < count and self.type(index) == "Range_Sign" :
+            high = None
+            index += 1
+            if index < count and self.type(index) == "Range_Max" :
+                high = self[index]
+                index += 1
+        if index == start + negated : raise ValueError("tokens[%s] 不是范围值" % start)
+        return Range_Value(low, high, negated), index
+
+
+def values(result) -> Token_Values :
+    """为 ParserSystem.Parse_Result 生成 Token_Values，使用分析时记录的 matchers"""
+    return Token_Values(result.command, result.tokens, result.matchers)
@@ -0,0 +1,192 @@
+"""
+命令树缓存
+------------------------------
+将构建完成的命令树保存为紧凑的二进制文件，之后直接读取而不需要重新构建\n
+文件中保存匹配对象的类、属性、正则表达式源码表与分支引用(序号)，命令树中的环与共享的分支保持不变\n
+首字符分派表与自动补全索引也会一起保存，读取后 Command_Parser 实例化时不需要重新生成\n
+尚未生成的延迟分支保存为 builder 的模块与名称以及参数，读取后仍然是延迟分支\n
+文件头记录构建代码的内容哈希，构建代码修改后缓存自动失效\n
+save_tree : 保存命令树\n
+load_tree : 读取命令树，缓存不存在或已失效时返回None\n
+cached_tree : 读取缓存，失效时调用构建函数并重新保存\n
+source_hash : 计算构建代码的内容哈希
+"""
+
+from . import base_match_class as BaseMatch
+
+from typing import Dict,Union,List,Tuple,Callable,Iterable
+import hashlib,importlib,inspect,os,pickle,re,types
+
+__all__ = ["save_tree","load_tree","cached_tree","source_hash"]
+
+FORMAT_VERSION = 3
+MAGIC = b"MCTREE"
+
+#完成构建时生成的属性，单独编码保存
+FINALIZED_ATTRIBUTE = ("_dispatch","_completion")
+#运行时绑定的属性(Sub_Command 绑定的词法器)，保存为None
+RUNTIME_ATTRIBUTE = ("_parser",)
+
+
+def _source_file(source:Union[str,types.ModuleType]) -> str :
+    if isinstance(source, types.ModuleType) : return inspect.getsourcefile(source)
+    return source
+
+def source_hash(sources:Iterable[Union[str,types.ModuleType]]=()) -> str :
+    """
+    计算构建代码的内容哈希
+    ------------------------------
+    sources : 构建命令树的模块或源文件路径\n
+    command_parser 包自身的所有源文件总是包含在内
+    """
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    files = sorted(os.path.join(package_dir, i) for i in os.listdir(package_dir) if i.endswith(".py"))
+    files += [_source_file(i) for i in sources]
+    sha = hashlib.sha256(b"%s:%d\n" % (MAGIC, FORMAT_VERSION))
+    for file in files :
+        with open(file, "rb") as f : sha.update(f.read())
+    return sha.hexdigest()
+
+
+def _import_object(module:str, qualname:str) :
+    obj = importlib.import_module(module)
+    for i in qualname.split(".") : obj = getattr(obj, i)
+    return obj
+
+def _encode(root:BaseMatch.Match_Base) -> dict :
+    BaseMatch.finalize_tree(root)
+    nodes = list(BaseMatch.walk_tree(root))
+    node_index = {id(node):i for i,node in enumerate(nodes)}
+    #属性引用的另一棵命令树(例如 Sub_Command 的内层命令树)同样保存
+    for node in nodes :
+        for value in vars(node).values() :
+            if not isinstance(value, BaseMatch.Match_Base) or id(value) in node_index : continue
+            BaseMatch.finalize_tree(value)
+            for i in BaseMatch.walk_tree(value) :
+                if id(i) in node_index : continue
+                node_index[id(i)] = len(nodes)
+                nodes.append(i)
+    pattern_index : Dict[Tuple[str,int],int] = {}
+    class_index : Dict[type,int] = {}
+    #共享的分派表只保存一次，补全索引由 pickle 自动共享
+    dispatch_index : Dict[int,int] = {}
+    dispatch_list = []
+    builder_index : Dict[Tuple[str,str],int] = {}
+
+    def pattern(p:re.Pattern) -> int :
+        return pattern_index.setdefault((p.pattern, p.flags), len(pattern_index))
+
+    #相同的不可变值只保存一次，可变的列表与字典仍然每个匹配对象一份
+    constant = {}
+    def share(value) :
+        if isinstance(value, str) or (isinstance(value, tuple) and all(isinstance(i, str) for i in value)) :
+            return constant.setdefault((type(value), value), value)
+        return value
+
+    encoded = []
+    for node in nodes :
+        cls = class_index.setdefault(type(node), len(class_index))
+        plain, patterns, refs = {}, [], []
+        for name, value in vars(node).items() :
+            if name == "tree_leaves" or name in FINALIZED_ATTRIBUTE : continue
+            if name in RUNTIME_ATTRIBUTE : 
+                plain[name] = None
+                continue
+            #正则表达式与匹配对象引用单独保存，读取时分别从正则表达式表与匹配对象表中取回
+            if isinstance(value, re.Pattern) : patterns.append((name, None, pattern(value)))
+            elif isinstance(value, (list, tuple)) and value and all(isinstance(i, re.Pattern) for i in value) :
+                patterns.append((name, type(value) is tuple, [pattern(i) for i in value]))
+            elif isinstance(value, BaseMatch.Match_Base) : refs.append((name, None, node_index[id(value)]))
+            elif isinstance(value, (list, tuple)) and value and all(isinstance(i, BaseMatch.Match_Base) for i in value) :
+                refs.append((name, type(value) is tuple, [node_index[id(i)] for i in value]))
+            else : plain[name] = share(value)
+        if type(node.tree_leaves) is BaseMatch.Lazy_Leaves :
+            #延迟分支保存为 (builder序号, 参数)，参数中的匹配对象保存为序号
+            lazy = node.tree_leaves
+            name = (lazy.builder.__module__, lazy.builder.__qualname__)
+            if "<locals>" in name[1] or _import_object(*name) is not lazy.builder : 
+                raise ValueError("延迟分支的 builder %s 不是模块级函数，无法保存" % name[1])
+            args = [(True, node_index[id(i)]) if isinstance(i, BaseMatch.Match_Base) else (False, i) for i in lazy.args]
+            encoded.append((cls, plain, patterns, refs, (builder_index.setdefault(name, len(builder_index)), args), None, None))
+            continue
+        if id(node._dispatch) not in dispatch_index :
+            table, fallback, shared_word = node._dispatch
+            dispatch_index[id(node._dispatch)] = len(dispatch_list)
+            dispatch_list.append(({i:[node_index[id(k)] for k in j] for i,j in table.items()}, [node_index[id(i)] for i in fallback], shared_word))
+        leaves = [node_index[id(i)] for i in node.tree_leaves]
+        encoded.append((cls, plain, patterns, refs, leaves, dispatch_index[id(node._dispatch)], node._completion))
+
+    return {
+        "classes" : [(i.__module__, i.__qualname__) for i in class_index],
+        "patterns" : list(pattern_index),
+        "dispatch" : dispatch_list,
+        "builders" : list(builder_index),
+        "nodes" : encoded,
+    }
+
+def _decode(data:dict) -> BaseMatch.Match_Base :
+    classes = [_import_object(i, j) for i,j in data["classes"]]
+    builders = [_import_object(i, j) for i,j in data["builders"]]
+    patterns = [BaseMatch.re_compile(i, j) for i,j in data["patterns"]]
+    nodes = [classes[i[0]].__new__(classes[i[0]]) for i in data["nodes"]]
+    dispatch_list = [({i:tuple([nodes[k] for k in j]) for i,j in table.items()}, tuple([nodes[i] for i in fallback]), shared_word)
+        for table, fallback, shared_word in data["dispatch"]]
+
+    for node, (_, attr, pattern_attr, ref_attr, leaves, dispatch, completion) in zip(nodes, data["nodes"]) :
+        for name, is_tuple, value in pattern_attr :
+            if is_tuple is None : attr[name] = patterns[value]
+            else : attr[name] = (tuple if is_tuple else list)(patterns[i] for i in value)
+        for name, is_tuple, value in ref_attr :
+            if is_tuple is None : attr[name] = nodes[value]
+            else : attr[name] = (tuple if is_tuple else list)(nodes[i] for i in value)
+        if dispatch is None : 
+            attr["tree_leaves"] = BaseMatch.Lazy_Leaves(node, builders[leaves[0]], [nodes[j] if i else j for i,j in leaves[1]])
+            attr["_dispatch"] = None
+        else :
+            attr["tree_leaves"] = [nodes[i] for i in leaves]
+            attr["_dispatch"] = dispatch_list[dispatch]
+        attr["_completion"] = completion
+        node.__dict__ = attr
+    return nodes[0]
+
+
+def save_tree(root:BaseMatch.Match_Base, path:str, sources:Iterable[Union[str,types.ModuleType]]=()) :
+    """
+    保存命令树
+    ------------------------------
+    root : 命令树的根节点(通常为 SpecialMatch.Command_Root)\n
+    path : 保存的文件路径\n
+    sources : 构建命令树的模块或源文件路径，用于计算内容哈希\n
+    匹配对象的属性除正则表达式与匹配对象引用外使用 pickle 保存，写入临时文件后再替换，不会留下不完整的文件
+    """
+    header = b"%s %d %s\n" % (MAGIC, FORMAT_VERSION, source_hash(sources).encode("ascii"))
+    temp = "%s.%s.tmp" % (path, os.getpid())
+    with open(temp, "wb") as f :
+        f.write(header)
+        pickle.dump(_encode(root), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp, path)
+
+def load_tree(path:str, sources:Iterable[Union[str,types.ModuleType]]=()) -> Union[BaseMatch.Match_Base,None] :
+    """
+    读取命令树
+    ------------------------------
+    sources 必须与保存时相同\n
+    文件不存在、格式版本不同或内容哈希不一致时返回None\n
+    缓存文件会被 pickle 读取，只应该读取自己生成的文件
+    """
+    if not os.path.isfile(path) : return None
+    header = b"%s %d %s\n" % (MAGIC, FORMAT_VERSION, source_hash(sources).encode("ascii"))
+    with open(path, "rb") as f :
+        if f.readline() != header : return None
+        return _decode(pickle.load(f))
+
+def cached_tree(path:str, builder:Callable[[],BaseMatch.Match_Base], sources:Iterable[Union[str,types.ModuleType]]=()) -> BaseMatch.Match_Base :
+    """
+    读取命令树缓存，缓存无效时调用 builder() 构建命令树并保存\n
+    sources 中应该包含 builder 所在的模块
+    """
+    root = load_tree(path, sources)
+    if root is None :
+        root = builder()
+        save_tree(root, path, sources)
+    return root
@@ -0,0 +1,311 @@
+"""
+命令树编译器
+------------------------------
+将 SpecialMatch.Command_Root 开始的命令树编译为 Python 词法器模块源码\n
+每个节点对应一个状态函数，分支的匹配逻辑被展开到状态函数中，正则表达式提升为模块级常量\n
+命令树中的环(例如选择器参数的回边、execute 的循环)成为状态函数之间的跳转\n
+SpecialMatch.Sub_Command 编译为从内层命令树的状态函数开始的分析，\n
+其他匹配类(例如 JsonParser.Json_Match)的副本序列化到模块中，匹配时调用它的 _try_match\n
+生成的模块需要能够导入 command_parser 包，导入时不需要重新构建命令树
+"""
+
+from . import base_match_class as BaseMatch
+from . import special_match as SpecialMatch
+from . import json_paser as JsonParser
+
+from typing import Dict,Union,List,Tuple
+import re,types,copy,pickle
+
+__all__ = ["compile_tree","load_compiled_tree"]
+
+class Not_Compile_Object(Exception) : pass
+
+#_leaf_code 可以展开的匹配类，其他匹配类调用副本的 _try_match，也不参与同级分支之间的单词共享
+_COMPILE_CLASS = frozenset((BaseMatch.End_Tag, BaseMatch.Enum, BaseMatch.Char, BaseMatch.KeyWord, BaseMatch.Int, BaseMatch.Float,
+    SpecialMatch.BE_Range_Int, BaseMatch.AnyString, BaseMatch.AnyMsg, SpecialMatch.BE_String, SpecialMatch.BE_Quotation_String,
+    SpecialMatch.Relative_Offset_Float, SpecialMatch.Local_Offset_Float))
+
+
+class _Code_Builder :
+
+    def __init__(self) -> None :
+        self.constant_lines : List[str] = []
+        self.pattern_name : Dict[Tuple[str,int],str] = {}
+        self.char_set_name : Dict[frozenset,str] = {}
+        self.word_set_name : Dict[frozenset,str] = {}
+        self.leaf_name : Dict[int,str] = {}
+
+    def pattern(self, p:re.Pattern) -> str :
+        key = (p.pattern, p.flags)
+        if key not in self.pattern_name :
+            name = "RE_%s" % len(self.pattern_name)
+            self.pattern_name[key] = name
+            self.constant_lines.append("%s = re.compile(%r, %s)" % (name, p.pattern, p.flags))
+        return self.pattern_name[key]
+
+    def char_set(self, f:frozenset) -> str :
+        if f not in self.char_set_name :
+            name = "FIRST_CHAR_%s" % len(self.char_set_name)
+            self.char_set_name[f] = name
+            self.constant_lines.append("%s = frozenset(%r)" % (name, tuple(sorted(f))))
+        return self.char_set_name[f]
+
+    def word_set(self, f:frozenset) -> str :
+        if f not in self.word_set_name :
+            name = "WORDS_%s" % len(self.word_set_name)
+            self.word_set_name[f] = name
+            self.constant_lines.append("%s = frozenset(%r)" % (name, tuple(sorted(f))))
+        return self.word_set_name[f]
+
+    def leaf(self, leaf:BaseMatch.Match_Base) -> str :
+        #不含分支的副本，分支由状态函数之间的跳转表示
+        if id(leaf) not in self.leaf_name :
+            name = "LEAF_%s" % len(self.leaf_name)
+            self.leaf_name[id(leaf)] = name
+            leaf_copy = copy.copy(leaf)
+            leaf_copy.tree_leaves, leaf_copy._dispatch, leaf_copy._completion = [], None, None
+            try : data = pickle.dumps(leaf_copy, protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception as e : raise Not_Compile_Object("%s 无法序列化 : %s" % (type(leaf).__name__, e))
+            self.constant_lines.append("%s = pickle.loads(%r)" % (name, data))
+        return self.leaf_name[id(leaf)]
+
+
+def _leaf_code(code:_Code_Builder, leaf:BaseMatch.Match_Base) -> Union[Tuple[List[str],str,List[str]],None] :
+    """
+    返回 (前置语句, 匹配成功条件, 成功后语句)\n
+    前置语句执行后，匹配成功时变量 m 为 token 使用的 re.Match\n
+    返回None代表该分支永远不会匹配成功
+    """
+    leaf_type = type(leaf)
+
+    if leaf_type is BaseMatch.End_Tag :
+        return ["m = %s.match(s, p)" % code.pattern(leaf.re_match)], "not (m and len(m.group()) > 0)", []
+
+    if leaf_type in (BaseMatch.Enum, BaseMatch.Char) :
+        return ["m = %s.match(s, p)" % code.pattern(leaf.re_match)], "%s.search(m.group())" % code.pattern(leaf.re_test), []
+
+    if leaf_type is BaseMatch.KeyWord :
+        if not leaf.re_match : return None
+        if leaf.words is not None :
+            return ([], "s[p:p+%s] in %s" % (leaf.lengths[0], code.word_set(leaf.words)),
+                ["m = %s.match(s, p)" % code.pattern(leaf.re_match[0])])
+        if len(leaf.re_match) == 1 :
+            return (["m = %s.match(s, p)" % code.pattern(leaf.re_match[0])],
+                "m is not None and %s.search(m.group())" % code.pattern(leaf.re_test), [])
+        return (["ms = [%s]" % ", ".join("%s.match(s, p)" % code.pattern(i) for i in leaf.re_match)],
+            "ms[0] is not None and any(a := [%s.search(i.group()) for i in ms])" % code.pattern(leaf.re_test),
+            ["b = [len(i.group()) for i in a if i]", "m = ms[b.index(max(b))]"])
+
+    if leaf_type in (BaseMatch.Int, BaseMatch.Float, SpecialMatch.BE_Range_Int) :
+        pre = ["m = %s.match(s, p)" % code.pattern(leaf.re_match)]
+        if not leaf.unit_word_test : return pre, "%s.search(m.group())" % code.pattern(leaf.re_test), []
+        pre += ["g = m.group()", "b = %s.search(g)" % code.pattern(leaf.unit_word_test)]
+        return pre, "b and %s.search(g[0:b.start()])" % code.pattern(leaf.re_test), []
+
+    if leaf_type in (BaseMatch.AnyString, BaseMatch.AnyMsg) :
+        return ["m = %s.match(s, p)" % code.pattern(leaf.re_match)], "True", []
+
+    if leaf_type is SpecialMatch.BE_String :
+        return (["m = %s.match(s, p)" % code.pattern(leaf.re_match), "g = m.group()"],
+            "g and not %s.search(g)" % code.pattern(leaf.re_test), [])
+
+    if leaf_type is SpecialMatch.BE_Quotation_String :
+        return [], "c == '\"' and (m := %s.match(s, p))" % code.pattern(leaf.re_match), []
+
+    if leaf_type in (SpecialMatch.Relative_Offset_Float, SpecialMatch.Local_Offset_Float) :
+        return (["m = %s.match(s, p)" % code.pattern(leaf.re_match)],
+            "m and (len(m.group()) <= 1 or %s.search(m.group()[1:]))" % code.pattern(leaf.re_test), [])
+
+    raise Not_Compile_Object("%s 为不支持编译的匹配类" % leaf_type.__name__)
+
+def _branch_code(code:_Code_Builder, leaf:BaseMatch.Match_Base, state_name:Dict[int,str], Tree:SpecialMatch.Command_Root) :
+    """
+    返回 (前置语句, 匹配成功条件, 成功后语句, token 表达式)\n
+    Sub_Command 从内层命令树的状态函数开始分析，_leaf_code 不支持的匹配类调用副本的 _try_match
+    """
+    if isinstance(leaf, SpecialMatch.Sub_Command) :
+        root = state_name[id(Tree if leaf.Tree is None else leaf.Tree)]
+        return (["r = _sub(s, p, d, %s, %s, %s)" % (root, leaf.max_depth, code.pattern(leaf.word_match))], "r[3] is None",
+            ["m = %s.match(s, p, r[2])" % code.pattern(leaf.re_match)],
+            "{\"type\":%r, \"token\":m, \"result\":_sub_result(r[0])}" % leaf.token_type)
+    if type(leaf) not in _COMPILE_CLASS :
+        pre, cond = ["a = %s._try_match(s, p)" % code.leaf(leaf)], "a is not MATCH_FAIL"
+        if isinstance(leaf, BaseMatch.End_Tag) : return pre, cond, [], None
+        return pre, cond, ["m = a[\"token\"]"], "a"
+    leaf_code = _leaf_code(code, leaf)
+    if leaf_code is None : return None
+    return (*leaf_code, "{\"type\":%r, \"token\":m}" % leaf.token_type)
+
+def _fail_code(code:_Code_Builder, node:BaseMatch.Match_Base, state_name:Dict[int,str], Tree:SpecialMatch.Command_Root) -> Union[List[str],None] :
+    """
+    与 Command_Parser._fail 相同，报告 Sub_Command 内层命令中的错误或 Json_Match 内部的 Json_Error\n
+    返回失败处理函数的函数体，不存在这两种分支时返回None
+    """
+    lines = []
+    for leaf in node.tree_leaves :
+        if isinstance(leaf, SpecialMatch.Sub_Command) :
+            root = state_name[id(Tree if leaf.Tree is None else leaf.Tree)]
+            body = ["r = _sub(s, p, d, %s, %s, %s)" % (root, leaf.max_depth, code.pattern(leaf.word_match)),
+                "if r[1] is None : return %s, p, r[3]" % state_name[id(node)], "return r[1], r[2], r[3]"]
+        elif isinstance(leaf, JsonParser.Json_Match) :
+            body = ["e = %s._scan(s, p, [])" % code.leaf(leaf), "if isinstance(e, Json_Error) : return %s, p, e" % state_name[id(node)]]
+        else : continue
+        first_char = leaf._first_char_set()
+        if first_char is None : lines.extend("    " + i for i in body)
+        else :
+            lines.append("    if s[p:p+1] in %s :" % code.char_set(first_char))
+            lines.extend("        " + i for i in body)
+    if not lines : return None
+    return lines + ["    return None"]
+
+
+def compile_tree(Tree:SpecialMatch.Command_Root, separator:str=" ", separator_count:int=None) -> str :
+    """
+    编译命令树
+    ------------------------------
+    Tree : SpecialMatch.Command_Root类开始嵌套的命令树\n
+    separator 与 separator_count 与 ParserSystem.Command_Parser 的同名参数含义相同\n
+    返回生成的模块源码，模块中的 parser(command_str) 与 Command_Parser.parser 返回相同的结果\n
+    不是内建匹配类的分支需要能够被 pickle 序列化，否则抛出 Not_Compile_Object
+    """
+    if not isinstance(Tree,SpecialMatch.Command_Root) : raise TypeError("Tree 参数只能为 SpecialMatch.Command_Root 类")
+    code = _Code_Builder()
+
+    if separator_count == None : code.pattern(re.compile("[%s]{0,}" % BaseMatch.string_to_rematch(separator)))
+    else : code.pattern(re.compile("[%s]{%s,%s}" % (BaseMatch.string_to_rematch(separator), separator_count, separator_count)))
+    code.pattern(re.compile("[^%s]{1,}" % BaseMatch.TERMINATOR_RE))
+    code.pattern(re.compile(".{0,1}"))
+
+    #编译后的模块不能再调用 builder，延迟分支需要全部生成
+    #Sub_Command 的内层命令树同样编译，第一个状态函数总是 Tree
+    roots = [Tree]
+    node_list = []
+    for root in roots :
+        for node in BaseMatch.walk_tree(root, True) :
+            node_list.append(node)
+            if isinstance(node, SpecialMatch.Sub_Command) and node.Tree is not None and node.Tree not in roots : roots.append(node.Tree)
+    node_list = list({id(i):i for i in node_list}.values())
+    state_name = {id(node):"_state_%s" % index for index,node in enumerate(node_list)}
+    function_lines : List[str] = []
+    auto_complete_lines : List[str] = []
+    fail_lines : List[str] = []
+
+    for node in node_list :
+        lines = ["def %s(s, p, tokens, d) :" % state_name[id(node)]]
+        if node.tree_leaves : lines.append("    c = s[p:p+1]")
+        #多个同级分支使用相同的单词正则表达式时，当前位置的单词只扫描一次
+        word_count = {}
+        for leaf in node.tree_leaves :
+            if leaf._word_scan and type(leaf) in _COMPILE_CLASS : word_count[leaf.re_match] = word_count.get(leaf.re_match, 0) + 1
+        shared_word = {}
+        for pattern,count in word_count.items() :
+            if count < 2 : continue
+            shared_word[pattern] = "w_%s" % len(shared_word)
+            lines.append("    %s = None" % shared_word[pattern])
+        _auto_complete = {}
+        for leaf in node.tree_leaves :
+            #Sub_Command 的补全候选来自内层命令树，编译时不需要绑定词法器
+            if isinstance(leaf, SpecialMatch.Sub_Command) : _auto_complete.update((Tree if leaf.Tree is None else leaf.Tree)._completion_candidates())
+            else : _auto_complete.update(leaf._auto_complete())
+            leaf_code = _branch_code(code, leaf, state_name, Tree)
+            if leaf_code is None : continue
+            pre, cond, post, token = leaf_code
+            if leaf._word_scan and type(leaf) in _COMPILE_CLASS and leaf.re_match in shared_word :
+                word = shared_word[leaf.re_match]
+                pre = ["if %s is None : %s = %s.match(s, p)" % (word, word, code.pattern(leaf.re_match)), "m = %s" % word] + pre[1:]
+
+            indent = "    "
+            first_char = leaf._first_char_set()
+            if first_char is not None :
+                lines.append("%sif c in %s :" % (indent, code.char_set(first_char)))
+                indent += "    "
+            lines.extend(indent + i for i in pre)
+            if cond != "True" :
+                lines.append("%sif %s :" % (indent, cond))
+                indent += "    "
+            lines.extend(indent + i for i in post)
+            if isinstance(leaf, BaseMatch.End_Tag) : lines.append("%sreturn None, p" % indent)
+            else :
+                lines.append("%stokens.append(%s)" % (indent, token))
+                lines.append("%sreturn %s, RE_0.match(s, m.end()).end()" % (indent, state_name[id(leaf)]))
+
+        if node.tree_leaves : lines.append("    return False, p")
+        else : lines.append("    return None, p")
+        function_lines.append("\n".join(lines))
+        auto_complete_lines.append("    %s : %r," % (state_name[id(node)], _auto_complete))
+        fail = _fail_code(code, node, state_name, Tree)
+        if fail is not None :
+            function_lines.append("\n".join(["def _fail%s(s, p, d) :" % state_name[id(node)], *fail]))
+            fail_lines.append("    %s : _fail%s," % (state_name[id(node)], state_name[id(node)]))
+
+    return "\n".join([
+        '"""',
+        "由 command_parser.tree_compiler 生成的命令词法器",
+        "请勿手动修改",
+        '"""',
+        "",
+        "import re,pickle",
+        "from command_parser.base_match_class import Not_Match, MATCH_FAIL, string_to_rematch",
+        "from command_parser.special_match import Nesting_Too_Deep, Sub_Result",
+        "from command_parser.json_paser import Json_Error",
+        "",
+        *code.constant_lines,
+        "",
+        "",
+        *["%s\n\n" % i for i in function_lines],
+        "AUTO_COMPLETE = {",
+        *auto_complete_lines,
+        "}",
+        "",
+        "FAIL = {",
+        *fail_lines,
+        "}",
+        "",
+        "def _get_auto_complete(e, state) :",
+        "    re_match = re.compile(string_to_rematch(e.word))",
+        "    candidates = getattr(e, 'expect', None)",
+        "    if candidates is None : candidates = AUTO_COMPLETE[state]",
+        "    return {i:j for i,j in candidates.items() if re_match.search(i)}",
+        "",
+        "def _run(s, p, state, d) :",
+        "    #返回 (tokens, 停止时的状态, 停止时的指针, 异常或None)",
+        "    tokens = []",
+        "    while 1 :",
+        "        next_state, next_p = state(s, p, tokens, d)",
+        "        if next_state is None : return tokens, state, next_p, None",
+        "        if next_state is False :",
+        "            if state in FAIL :",
+        "                r = FAIL[state](s, p, d)",
+        "                if r is not None : return (tokens,) + r",
+        "            _m_ = RE_1.match(s, p)",
+        "            if _m_ == None : _m_ = RE_2.match(s, p)",
+        "            return tokens, state, p, Not_Match(\">>%s<< 非期望的参数\" % _m_.group(), pos=(_m_.start(),_m_.end()), word=_m_.group())",
+        "        state, p = next_state, next_p",
+        "",
+        "def _sub(s, p, d, state, max_depth, word_match) :",
+        "    #与 Sub_Command 相同，嵌套过深时停止时的状态为None",
+        "    if d >= max_depth :",
+        "        _m_ = word_match.match(s, p)",
+        "        return None, None, p, Nesting_Too_Deep(\">>%s<< 命令嵌套超过 %s 层\" % (_m_.group(), max_depth), pos=(_m_.start(),_m_.end()), word=_m_.group())",
+        "    return _run(s, p, state, d + 1)",
+        "",
+        "def _sub_result(tokens) :",
+        "    return Sub_Result(tuple([(i[\"type\"], i[\"token\"].start(), i[\"token\"].end()) for i in tokens]), None)",
+        "",
+        "def parser(command_str) :",
+        "    tokens, state, p, e = _run(command_str, 0, _state_0, 0)",
+        "    if e is None : return tokens",
+        "    return (e, _get_auto_complete(e, state))",
+        "",
+    ])
+
+
+def load_compiled_tree(source:str, module_name:str="compiled_command_tree") -> types.ModuleType :
+    """
+    将 compile_tree 生成的源码加载为模块
+    ------------------------------
+    也可以直接将源码写入 .py 文件后导入
+    """
+    module = types.ModuleType(module_name)
+    exec(compile(source, module_name, "exec"), module.__dict__)
+    return module
@@ -0,0 +1,197 @@
+"""
+命令树优化工具
+------------------------------
+canonicalize_tree : 合并结构相同的匹配对象，并让所有匹配对象共享正则表达式池\n
+tree_report : 统计命令树中的匹配对象与正则表达式数量\n
+reorder_plan : 根据性能统计生成分支重排方案，apply_reorder_plan 应用方案，reorder_tree 两者同时进行
+"""
+
+from . import base_match_class as BaseMatch
+
+from . import profiler as Profiler
+
+from typing import Dict,Union,List,Tuple
+import re
+
+__all__ = ["tree_report","canonicalize_tree","reorder_plan","apply_reorder_plan","reorder_tree"]
+
+
+def _freeze(value) :
+    #将匹配对象的属性转换为可哈希的比较键
+    if isinstance(value, re.Pattern) : return ("re", value.pattern, value.flags)
+    if isinstance(value, (str, int, float, bool, type(None))) : return value
+    if isinstance(value, (list, tuple)) : return ("list", tuple(_freeze(i) for i in value))
+    if isinstance(value, (set, frozenset)) : return ("set", tuple(sorted(_freeze(i) for i in value)))
+    if isinstance(value, dict) : return ("dict", tuple((_freeze(i), _freeze(j)) for i,j in value.items()))
+    #无法比较的属性只与自身相等
+    return ("id", id(value))
+
+def _node_label(node:BaseMatch.Match_Base) :
+    attr = tuple(sorted((i, _freeze(j)) for i,j in vars(node).items() if i != "tree_leaves" and not i.startswith("_")))
+    return (type(node), attr)
+
+def _intern_pattern(value) :
+    if isinstance(value, re.Pattern) : return BaseMatch.re_compile(value.pattern, value.flags)
+    if isinstance(value, list) and any(isinstance(i, re.Pattern) for i in value) : return [_intern_pattern(i) for i in value]
+    return value
+
+
+def tree_report(root:BaseMatch.Match_Base) -> Dict[str,int] :
+    """
+    统计命令树
+    ------------------------------
+    返回字典\n
+    nodes : 可达的匹配对象数量\n
+    edges : 分支引用数量\n
+    patterns : 不同的正则表达式对象数量\n
+    pattern_sources : 不同的正则表达式源码数量\n
+    延迟分支不会被生成，也不计入统计
+    """
+    nodes = list(BaseMatch.walk_tree(root))
+    patterns = {}
+    for node in nodes :
+        for value in vars(node).values() :
+            for i in (value if isinstance(value, list) else [value]) :
+                if isinstance(i, re.Pattern) : patterns[id(i)] = (i.pattern, i.flags)
+    return {
+        "nodes" : len(nodes),
+        "edges" : sum(len(i.tree_leaves) for i in nodes if type(i.tree_leaves) is not BaseMatch.Lazy_Leaves),
+        "patterns" : len(patterns),
+        "pattern_sources" : len(set(patterns.values())),
+    }
+
+def canonicalize_tree(root:BaseMatch.Match_Base) -> Dict[str,Dict[str,int]] :
+    """
+    规范化命令树
+    ------------------------------
+    类型、token_type、argument_dimension、正则表达式等属性相同，且所有分支也两两等价的匹配对象会被合并为同一个对象\n
+    命令树中存在环时同样适用，合并不会改变词法器的匹配结果\n
+    合并后的匹配对象被多个位置共享，之后不应该再对其调用 add_leaves\n
+    命令树中的延迟分支会全部生成\n
+    返回规范化前后的 tree_report 结果 {"before":..., "after":...}
+    """
+    nodes = list(BaseMatch.walk_tree(root, True))
+    before = tree_report(root)
+
+    #按照属性初始划分，再按照分支所在的划分反复细分，直到划分数量不再变化
+    label_id = {}
+    block = {id(i):label_id.setdefault(_node_label(i), len(label_id)) for i in nodes}
+    block_count = len(label_id)
+    while 1 :
+        sign_id = {}
+        new_block = {id(i):sign_id.setdefault((block[id(i)], tuple(block[id(j)] for j in i.tree_leaves)), len(sign_id)) for i in nodes}
+        block = new_block
+        if len(sign_id) == block_count : break
+        block_count = len(sign_id)
+
+    represent = {}
+    for node in nodes : represent.setdefault(block[id(node)], node)
+    for node in represent.values() :
+        node.tree_leaves = [represent[block[id(i)]] for i in node.tree_leaves]
+        for i,j in list(vars(node).items()) : 
+            if i != "tree_leaves" : setattr(node, i, _intern_pattern(j))
+        node._dispatch = None
+        node._completion = None
+
+    return {"before":before, "after":tree_report(root)}
+
+
+def _accepted_words(leaf:BaseMatch.Match_Base) :
+    #只有内建的定长匹配类可以精确得到能够匹配的字符串集合
+    leaf_type = type(leaf)
+    if leaf_type is BaseMatch.Enum : return ("word", leaf.re_match.pattern, frozenset(leaf.base_input))
+    if leaf_type is BaseMatch.Char : return ("word", leaf.re_match.pattern, frozenset((leaf.base_input,)))
+    if leaf_type is BaseMatch.KeyWord and len(set(len(i) for i in leaf.base_input)) == 1 :
+        return ("prefix", None, frozenset(leaf.base_input))
+    return None
+
+def _disjoint(a:BaseMatch.Match_Base, b:BaseMatch.Match_Base) -> bool :
+    #两个分支不可能在同一位置同时匹配成功时返回True，无法确定时返回False
+    if a is b : return False
+    fa, fb = a._first_char_set(), b._first_char_set()
+    if fa is not None and fb is not None and not (fa & fb) : return True
+    wa, wb = _accepted_words(a), _accepted_words(b)
+    if wa is None or wb is None or wa[0:2] != wb[0:2] : return False
+    if wa[0] == "word" : return not (wa[2] & wb[2])
+    return not any(i.startswith(j) or j.startswith(i) for i in wa[2] for j in wb[2])
+
+def _leaf_order(leaves:List[BaseMatch.Match_Base], hits:List[int]) -> List[int] :
+    #可能同时匹配成功的两个分支保持原有先后顺序，其余分支按照命中次数从高到低排列
+    placed = [False] * len(leaves)
+    order = []
+    for _ in range(len(leaves)) :
+        best = None
+        for i in range(len(leaves)) :
+            if placed[i] : continue
+            if any((not placed[j]) and (not _disjoint(leaves[j], leaves[i])) for j in range(i)) : continue
+            if best is None or hits[i] > hits[best] : best = i
+        placed[best] = True
+        order.append(best)
+    return order
+
+def reorder_plan(root:BaseMatch.Match_Base, profile:Union[Profiler.Parse_Profile,Dict]) -> Dict[str,Union[int,Dict[int,List[int]]]] :
+    """
+    生成分支重排方案
+    ------------------------------
+    profile : 在同一棵命令树上收集的 Profiler.Parse_Profile 或其 snapshot()\n
+    使用 snapshot 时，命令树中已经生成的延迟分支必须与生成快照时相同(快照中的序号只对应已经生成的部分)，\n
+    在其他进程中使用时应该直接传入 Parse_Profile 或先重建相同的命令树状态\n
+    每个匹配对象的分支按照匹配成功次数从高到低排列，但可能在同一位置同时匹配成功的两个分支不会交换先后顺序，\n
+    因此重排不会改变任何命令的分析结果\n
+    返回可以直接保存为 JSON 的方案 {"nodes":匹配对象数量, "order":{匹配对象序号:新的分支顺序}}\n
+    序号为重排前的命令树(生成全部延迟分支后)广度优先遍历中的序号，只包含顺序发生变化的匹配对象
+    """
+    #id(匹配对象) -> 匹配成功次数，快照中的序号需要在生成延迟分支之前换算为匹配对象
+    if isinstance(profile, Profiler.Parse_Profile) :
+        with profile._lock : hits = {i:j[2] for i,j in profile._nodes.items()}
+    else :
+        built = [i[0] for i in Profiler._built_tree(root)]
+        hits = {id(built[i["index"]]):i["successes"] for i in profile["nodes"] if 0 <= i["index"] < len(built)}
+    nodes = list(BaseMatch.walk_tree(root, True))
+
+    plan = {}
+    for i,node in enumerate(nodes) :
+        if len(node.tree_leaves) < 2 : continue
+        order = _leaf_order(node.tree_leaves, [hits.get(id(j), 0) for j in node.tree_leaves])
+        if order != list(range(len(order))) : plan[i] = order
+    return {"nodes":len(nodes), "order":plan}
+
+def apply_reorder_plan(root:BaseMatch.Match_Base, plan:Dict[str,Union[int,Dict[int,List[int]]]]) -> int :
+    """
+    应用分支重排方案
+    ------------------------------
+    plan : reorder_plan 返回的方案(从 JSON 读取时序号为字符串也可以)\n
+    命令树必须与生成方案时重排前的命令树结构相同，不能对已经重排的命令树重复应用\n
+    匹配对象数量不同、顺序不是分支的排列、或者重排可能改变分析结果时抛出 ValueError，此时命令树不会被修改\n
+    返回重排的匹配对象数量
+    """
+    nodes = list(BaseMatch.walk_tree(root, True))
+    if plan["nodes"] != len(nodes) : raise ValueError("方案与命令树的匹配对象数量不同 (%s != %s)" % (plan["nodes"], len(nodes)))
+
+    new_leaves = {}
+    for i, order in plan["order"].items() :
+        node = nodes[int(i)]
+        if sorted(order) != list(range(len(node.tree_leaves))) : raise ValueError("匹配对象 %s 的分支顺序不是有效的排列" % i)
+        leaves = node.tree_leaves
+        for j in range(len(order)) :
+            for k in range(j+1, len(order)) :
+                if order[j] > order[k] and not _disjoint(leaves[order[j]], leaves[order[k]]) :
+                    raise ValueError("匹配对象 %s 的分支 %s 与 %s 可能同时匹配成功，不能交换顺序" % (i, order[k], order[j]))
+        new_leaves[int(i)] = [leaves[j] for j in order]
+
+    for i, leaves in new_leaves.items() :
+        #自动补全索引保持原有分支顺序生成的结果，补全候选的顺序不受重排影响
+        if nodes[i]._completion is None : nodes[i]._build_completion()
+        nodes[i].tree_leaves = leaves
+        nodes[i]._dispatch = None
+    return len(new_leaves)
+
+def reorder_tree(root:BaseMatch.Match_Base, profile:Union[Profiler.Parse_Profile,Dict]) -> Dict[str,Union[int,Dict[int,List[int]]]] :
+    """
+    根据性能统计重排命令树的分支
+    ------------------------------
+    相当于 reorder_plan 后立即 apply_reorder_plan，返回使用的方案
+    """
+    plan = reorder_plan(root, profile)
+    apply_reorder_plan(root, plan)
+    return plan